@@ -0,0 +1,77 @@
+# coding: utf8
+
+"""
+测量被织入的方法每次调用的额外开销：对比没有织入的方法，
++ 以及只有一个前置通知、只有一个环绕通知、五种通知都有的方法
+
+用法：python benchmarks/bench_advice.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summermvc.decorator import *
+from summermvc import BeanFactory
+
+CALLS = 100000
+
+
+@component
+class BenchDao(object):
+    def plain(self, user_id, name=None):
+        return user_id
+
+    def with_before(self, user_id, name=None):
+        return user_id
+
+    def with_around(self, user_id, name=None):
+        return user_id
+
+    def with_all(self, user_id, name=None):
+        return user_id
+
+
+@aspect(1)
+@component
+class BenchAspect(object):
+    @before(r"BenchDao with_(before|all)")
+    def log(self):
+        pass
+
+    @around(r"BenchDao with_(around|all)")
+    def timing(self, joint_point):
+        return self.timing_after
+
+    @staticmethod
+    def timing_after(joint_point, returning, exc_info):
+        pass
+
+    @after_returning(r"BenchDao with_all")
+    def after_returning(self, returning):
+        pass
+
+    @after_throwing(r"BenchDao with_all")
+    def after_throwing(self, exc_info):
+        pass
+
+    @after(r"BenchDao with_all")
+    def after(self, joint_point, returning, exc_info):
+        pass
+
+
+def main():
+    factory = BeanFactory([BenchDao, BenchAspect])
+    dao = factory.get_bean("BenchDao")
+    print("%12s %12s" % ("method", "per call"))
+    for name in ["plain", "with_before", "with_around", "with_all"]:
+        method = getattr(dao, name)
+        elapsed = min(timeit.repeat(
+            lambda: method(1, name="a"), number=CALLS, repeat=5))
+        print("%12s %10.2fus" % (name, elapsed / CALLS * 1e6))
+
+
+if __name__ == "__main__":
+    main()
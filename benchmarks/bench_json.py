@@ -0,0 +1,77 @@
+# coding: utf8
+
+"""
+比较以前基于 json.dumps 和 isinstance 链的序列化方式与 JsonEncoder 后端的性能
+
+用法：python benchmarks/bench_json.py
+"""
+
+import os
+import sys
+import json
+import datetime
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summermvc.mvc import *
+
+MODEL_SIZES = [10, 100, 1000]
+
+
+def legacy_default(obj):
+    if isinstance(obj, Model):
+        return obj.as_map()
+    if isinstance(obj, datetime.date):
+        return obj.strftime("%Y-%m-%d")
+    if isinstance(obj, datetime.time):
+        return obj.strftime("%H:%M:%S")
+    if isinstance(obj, datetime.datetime):
+        return obj.strftime("%Y-%m-%d %H:%M:%S")
+    raise TypeError("%r is not JSON serializable" % obj)
+
+
+def legacy_encode(model):
+    return json.dumps(model, default=legacy_default)
+
+
+def create_model(size):
+    model = Model()
+    rows = []
+    for i in range(size):
+        row = Model()
+        row.add_attribute("id", i)
+        row.add_attribute("name", "user%d" % i)
+        row.add_attribute("score", i * 1.5)
+        row.add_attribute("tags", ["a", "b", "c"])
+        row.add_attribute("created_at", datetime.date(2018, 1, 1 + i % 28))
+        rows.append(row)
+    model.add_attribute("rows", rows)
+    model.add_attribute("total", size)
+    return model
+
+
+def bench(encode, model, number):
+    return min(timeit.repeat(lambda: encode(model),
+                             number=number, repeat=5)) / number
+
+
+def main():
+    encoders = [("legacy", legacy_encode)]
+    for name in ["json", "simplejson", "ujson"]:
+        try:
+            encoders.append((name, get_json_encoder(name).encode))
+        except ValueError:
+            pass
+
+    print("%8s" % "rows" + "".join("%14s" % name for name, _ in encoders))
+    for size in MODEL_SIZES:
+        model = create_model(size)
+        number = max(10, 10000 // size)
+        print("%8d" % size + "".join(
+            "%14s" % ("%.1fus" % (bench(encode, model, number) * 1e6))
+            for _, encode in encoders))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# coding: utf8
+
+"""
+比较 multipart 请求体的几种解析方式在 50MB 表单上的耗时和额外占用的内存：
++ legacy 是以前基于 split/join 的实现，streaming 按块解析并写入临时文件，
++ zero_copy 直接引用原始请求体的切片
+
+每种方式在单独的子进程中运行，解析之前通过 /proc/self/clear_refs 重置
++ 内存峰值，解析之后读取 VmHWM，因此只能在 Linux 上统计内存
+
+用法：python benchmarks/bench_multipart.py
+"""
+
+import os
+import sys
+import time
+import random
+import hashlib
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summermvc.mvc import *
+
+BOUNDARY = "bench_boundary"
+FILE_COUNT = 5
+FILE_SIZE = 10 * 1024 * 1024
+MODES = ["legacy", "streaming", "zero_copy"]
+
+
+def legacy_parse(body, boundary):
+    parts = {}
+    original_parts = body.split("--%s" % boundary)[1:-1]
+    for one_original_part in original_parts:
+        part = {}
+        phrases = one_original_part.split("\r\n")[1:-1]
+        line_no = 0
+        for line_no, line in enumerate(phrases, start=1):
+            if line == "":
+                break
+            pair = line.split(":", 1)
+            if len(pair) != 2:
+                continue
+            part[pair[0].strip()] = pair[1].strip()
+
+        cd = part.pop("Content-Disposition", "")
+        for item in cd.split(";")[1:]:
+            pair = item.split("=", 1)
+            if len(pair) != 2:
+                continue
+            part[pair[0].strip()] = pair[1].strip(" \"")
+
+        if "name" in part:
+            part["content"] = "\r\n".join(phrases[line_no:])
+            parts[part["name"]] = part
+    return parts
+
+
+def create_body():
+    random.seed(0)
+    # 内容中包含大量 CRLF，模拟二进制文件
+    line = "".join(chr(random.randrange(256)) for _ in range(62)) + "\r\n"
+    content = line * (FILE_SIZE // len(line))
+    chunks = []
+    for i in range(FILE_COUNT):
+        chunks.append(
+            "--%s\r\n"
+            "Content-Disposition: form-data; name=\"file%d\"; "
+            "filename=\"file%d.bin\"\r\n"
+            "Content-Type: application/octet-stream\r\n\r\n" % (
+                BOUNDARY, i, i))
+        chunks.append(content)
+        chunks.append("\r\n")
+    chunks.append("--%s--\r\n" % BOUNDARY)
+    return "".join(chunks)
+
+
+def read_status(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def reset_peak():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except (IOError, OSError):
+        return False
+
+
+def run(mode):
+    body = create_body()
+    can_measure = reset_peak()
+    before = read_status("VmRSS")
+
+    start = time.time()
+    if mode == "legacy":
+        digests = [hashlib.md5(part["content"]).hexdigest()
+                   for part in legacy_parse(body, BOUNDARY).itervalues()]
+    else:
+        parser = MultipartParser(body, BOUNDARY,
+                                 zero_copy=(mode == "zero_copy"))
+        if mode == "zero_copy":
+            digests = [hashlib.md5(part.view).hexdigest()
+                       for part in parser.files.itervalues()]
+        else:
+            digests = []
+            for part in parser.files.itervalues():
+                md5 = hashlib.md5()
+                for chunk in iter(lambda: part.file.read(65536), ""):
+                    md5.update(chunk)
+                digests.append(md5.hexdigest())
+        parser.close()
+    elapsed = time.time() - start
+
+    assert len(set(digests)) == 1
+    peak = can_measure and before and read_status("VmHWM")
+    extra = "%.1fMB" % ((peak - before) / 1024.0 / 1024) if peak else "n/a"
+    print("%10s %10.3fs %12s" % (mode, elapsed, extra))
+
+
+def main():
+    print("%d files x %dMB" % (FILE_COUNT, FILE_SIZE // 1024 // 1024))
+    print("%10s %11s %12s" % ("mode", "time", "extra memory"))
+    sys.stdout.flush()
+    for mode in MODES:
+        subprocess.check_call([sys.executable, __file__, mode])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run(sys.argv[1])
+    else:
+        main()
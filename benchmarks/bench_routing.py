@@ -0,0 +1,80 @@
+# coding: utf8
+
+"""
+比较线性扫描、前缀树和合并正则三种路由表的查找性能
+
+用法：python benchmarks/bench_routing.py
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.mvc import *
+
+ROUTE_COUNTS = [10, 100, 1000]
+LOOKUPS = 2000
+METHODS = [None, RequestMethod.GET, RequestMethod.POST]
+
+
+def create_controller(route_count):
+    attrs = {}
+    for i in range(route_count):
+        def page_handler(self):
+            pass
+        page_handler.__name__ = "handler_%d" % i
+        attrs[page_handler.__name__] = request_mapping(
+            r"/api/resource%d/(\d+)/(?P<field>\w+)" % i,
+            method=METHODS[i % len(METHODS)])(page_handler)
+    return rest_controller(type("BenchController%d" % route_count,
+                                (object, ),
+                                attrs))
+
+
+def create_requests(ctx, route_count):
+    requests = []
+    for _ in range(LOOKUPS):
+        i = random.randrange(route_count)
+        request = Request()
+        request.application_context = ctx
+        request.uri = "/api/resource%d/%d/name" % (i, i)
+        request.request_method = METHODS[i % len(METHODS)] or \
+            RequestMethod.GET
+        requests.append(request)
+    return requests
+
+
+def bench(mapping, ctx, requests):
+    route_table = mapping.get_route_table(ctx)
+    for request in requests:
+        assert route_table.find_route(request)[0] is not None
+
+    def lookup():
+        for request in requests:
+            route_table.find_route(request)
+    return min(timeit.repeat(lookup, number=1, repeat=5)) / len(requests)
+
+
+def main():
+    random.seed(0)
+    mappings = [("linear", RequestMappingHandlerMapping()),
+                ("radix", RadixTreeHandlerMapping()),
+                ("combined", CombinedRegexHandlerMapping())]
+    print("%8s %12s %12s %12s" % (
+        ("routes", ) + tuple(name for name, _ in mappings)))
+    for route_count in ROUTE_COUNTS:
+        ctx = ApplicationContext([create_controller(route_count)])
+        requests = create_requests(ctx, route_count)
+        print("%8d %12s %12s %12s" % (
+            (route_count, ) + tuple(
+                "%.2fus" % (bench(mapping, ctx, requests) * 1e6)
+                for _, mapping in mappings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# coding: utf8
+
+"""
+测量启动时织入的耗时与 bean 方法数量的关系：legacy 是以前每个方法、
++ 每种通知类型都 exec 一段模板并逐个 re.match 切点的实现，index 是
++ PointCutIndex 的匹配，factory 是创建 BeanFactory 的总耗时（包含包装方法）
+
+用法：python benchmarks/bench_weave.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from summermvc.decorator import *
+from summermvc.reflect import get_declared_methods
+from summermvc.point_cut import PointCutIndex
+from summermvc import BeanFactory
+
+METHOD_COUNTS = [200, 1000, 2000]
+METHODS_PER_CLASS = 10
+ASPECT_COUNT = 20
+ADVICE_TYPES = ["before_advice", "around_advice", "after_returning_advice",
+                "after_throwing_advice", "after_advice"]
+
+LEGACY_TEMPLATE = """\
+import re
+
+{{ADVICE_TYPE}}s = []
+for point_cut, advices in advice_map.iteritems():
+    if not re.match(
+            point_cut.rstrip("$")+"$",
+            "%s %s" % (class_name, attr_name)):
+        continue
+    for advice in advices:
+        {{ADVICE_TYPE}}s.append(advice)
+"""
+
+
+def create_beans(method_count):
+    bean_classes = []
+    for i in range(method_count // METHODS_PER_CLASS):
+        attrs = {}
+        for j in range(METHODS_PER_CLASS):
+            def method(self):
+                pass
+            method.__name__ = "find_%d" % j if j % 2 else "save_%d" % j
+            attrs[method.__name__] = method
+        bean_classes.append(
+            component(type("Dao%d" % i, (object, ), attrs)))
+
+    # 每个切面针对一个类，另外两个切面作用于所有类的部分方法
+    point_cuts = [r"Dao%d .*" % i for i in range(ASPECT_COUNT - 2)]
+    point_cuts.append(r"Dao.* find_.*")
+    point_cuts.append(r".* save_1?0$")
+    for i, point_cut in enumerate(point_cuts):
+        def advice(self):
+            pass
+        bean_classes.append(component(aspect(1)(type(
+            "BenchAspect%d" % i,
+            (object, ),
+            {"advice": before(point_cut)(advice)}))))
+    return bean_classes, point_cuts
+
+
+def legacy_match(bean_classes, point_cuts):
+    advice_map = dict((point_cut, [point_cut]) for point_cut in point_cuts)
+    matched = 0
+    for bean_class in bean_classes:
+        class_name = bean_class.__name__
+        for attr_name, attr in get_declared_methods(bean_class):
+            _locals = locals()
+            for advice_type in ADVICE_TYPES:
+                exec(LEGACY_TEMPLATE.replace("{{ADVICE_TYPE}}", advice_type),
+                     globals(), _locals)
+            matched = matched + len(_locals["before_advices"])
+    return matched
+
+
+def index_match(bean_classes, point_cuts):
+    index = PointCutIndex()
+    for point_cut in point_cuts:
+        index.add(point_cut, point_cut)
+    matched = 0
+    for bean_class in bean_classes:
+        class_name = bean_class.__name__
+        candidates = index.candidates(class_name)
+        for attr_name, attr in get_declared_methods(bean_class):
+            if candidates:
+                matched = matched + len(
+                    index.match(class_name, attr_name, candidates))
+    return matched
+
+
+def timed(function, *args):
+    start = time.time()
+    result = function(*args)
+    return result, time.time() - start
+
+
+def main():
+    print("%8s %10s %10s %10s" % ("methods", "legacy", "index", "factory"))
+    for method_count in METHOD_COUNTS:
+        bean_classes, point_cuts = create_beans(method_count)
+        legacy_matched, legacy_time = timed(
+            legacy_match, bean_classes, point_cuts)
+        index_matched, index_time = timed(
+            index_match, bean_classes, point_cuts)
+        assert legacy_matched == index_matched
+        _, factory_time = timed(BeanFactory, bean_classes)
+        print("%8d %9.1fms %9.1fms %9.1fms" % (
+            method_count, legacy_time * 1000,
+            index_time * 1000, factory_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ from .bean import *
 from .bean_factory import *
 from .application_context import *
 from .joint_point import *
+from .memoizer import *
+from .profiling import *
 
 
 def return_value(value):
@@ -14,6 +14,9 @@ from .utility import is_tornado_installed
 class ApplicationContext(BeanFactory):
     def __init__(self, bean_classes):
         BeanFactory.__init__(self, bean_classes)
+        # 每注册一个新的 bean，revision 加 1，
+        # + 依赖 bean 集合的缓存（比如路由表）据此判断是否失效
+        self._revision = 0
 
         for name in self._name_to_bean:
             bean = self._name_to_bean[name]
@@ -29,6 +32,11 @@ class ApplicationContext(BeanFactory):
         self._name_to_bean[bean.name] = bean
         if bean.is_singleton:
             self.get_bean(bean.name)
+        self._revision = self._revision + 1
+
+    @property
+    def revision(self):
+        return self._revision
 
     def close(self):
         self.destroy()
@@ -5,25 +5,38 @@ __authors__ = ["Tim Chow"]
 
 import threading
 import logging
+import inspect
 
 from .exception import *
 from .bean import *
 from .decorator import *
 from .reflect import get_declared_methods
+from .memoizer import Memoizer
+from .point_cut import PointCutIndex
 
 LOGGER = logging.getLogger(__name__)
 
+# 通知的类型以及获取切点的函数
+_ADVICE_TYPES = (("before", get_before),
+                 ("around", get_around),
+                 ("after_returning", get_after_returning),
+                 ("after_throwing", get_after_throwing),
+                 ("after", get_after))
+
 
 class BeanFactory(object):
     def __init__(self, bean_classes):
         self._lock = threading.RLock()
         self._name_to_bean = {}
         self._name_to_obj = {}
-        self._before_advice = {}
-        self._around_advice = {}
-        self._after_returning_advice = {}
-        self._after_throwing_advice = {}
-        self._after_advice = {}
+        # 切点 -> [(通知类型, bean 名称, 方法名称, order), ...]
+        self._advices = PointCutIndex()
+        # bean 名称 -> {方法名称 -> Memoizer}
+        self._memoizers = {}
+        # bean 类 -> 织入了通知的子类
+        # + 通知只织入到子类中，不修改原始的类，
+        # + 这样同一个类可以被多个 BeanFactory 各自织入
+        self._woven_classes = {}
 
         for bean_class in bean_classes:
             bean = Bean.from_bean_class(bean_class)
@@ -45,76 +58,111 @@ class BeanFactory(object):
             return
 
         for attr_name, attr_value in get_declared_methods(bean.cls):
-            point_cut = get_before(attr_value)
-            if point_cut is not None:
-                self._before_advice.setdefault(point_cut, []) \
-                    .append((bean.name, attr_name, order))
-
-            point_cut = get_around(attr_value)
-            if point_cut is not None:
-                self._around_advice.setdefault(point_cut, []) \
-                    .append((bean.name, attr_name, order))
-
-            point_cut = get_after_throwing(attr_value)
-            if point_cut is not None:
-                self._after_throwing_advice.setdefault(point_cut, []) \
-                    .append((bean.name, attr_name, order))
-
-            point_cut = get_after_returning(attr_value)
-            if point_cut is not None:
-                self._after_returning_advice.setdefault(point_cut, []) \
-                    .append((bean.name, attr_name, order))
-
-            point_cut = get_after(attr_value)
-            if point_cut is not None:
-                self._after_advice.setdefault(point_cut, []) \
-                    .append((bean.name, attr_name, order))
+            for advice_type, get_point_cut in _ADVICE_TYPES:
+                point_cut = get_point_cut(attr_value)
+                if point_cut is not None:
+                    self._advices.add(
+                        point_cut,
+                        (advice_type, bean.name, attr_name, order))
+
+    def __resolve_advices(self, class_name, attr_name, candidates):
+        """返回每种类型的通知，同一种类型的通知按照 order 从大到小排列"""
+        matched = dict((advice_type, [])
+                       for advice_type, _ in _ADVICE_TYPES)
+        if candidates:
+            for advice_type, bean_name, advice_name, order in \
+                    self._advices.match(class_name, attr_name, candidates):
+                matched[advice_type].append((bean_name, advice_name, order))
+        return [[getattr(self.get_bean(bean_name), advice_name)
+                 for bean_name, advice_name, _ in
+                 sorted(matched[advice_type], key=lambda t: t[2], reverse=True)]
+                for advice_type, _ in _ADVICE_TYPES]
 
     def __weave(self, bean_classes):
-        generate_advices = """\
-import re
-
-{{ADVICE_TYPE}}s = []
-for point_cut, advices in self._{{ADVICE_TYPE}}.iteritems():
-    if not re.match(
-            point_cut.rstrip("$")+"$",
-            "%s %s" % (class_name, attr_name)):
-        continue
-    for advice in advices:
-        {{ADVICE_TYPE}}s.append((getattr(self.get_bean(advice[0]), advice[1]), advice[2]))
-{{ADVICE_TYPE}}s = [advice[0] for advice in sorted({{ADVICE_TYPE}}s, key=lambda t: t[1], reverse=True)]
-"""
+        class_to_name = dict((bean.cls, name)
+                             for name, bean in self._name_to_bean.iteritems())
+        woven_methods = {}
+        for bean_class in bean_classes:
+            woven_methods[bean_class] = self.__weave_methods(
+                bean_class, class_to_name.get(bean_class))
 
         for bean_class in bean_classes:
-            class_name = bean_class.__name__
-            for attr_name, attr in get_declared_methods(bean_class):
-                _locals = locals()
-                for advice_type in ["before_advice",
-                                    "around_advice",
-                                    "after_returning_advice",
-                                    "after_throwing_advice",
-                                    "after_advice"]:
-                    exec(generate_advices.replace("{{ADVICE_TYPE}}", advice_type),
-                         globals(), _locals)
-                before_advices = _locals["before_advices"]
-                around_advices = _locals["around_advices"]
-                after_returning_advices = _locals["after_returning_advices"]
-                after_throwing_advices = _locals["after_throwing_advices"]
-                after_advices = _locals["after_advices"]
-                if before_advices or \
-                        around_advices or \
-                        after_returning_advices or \
-                        after_throwing_advices or \
-                        after_advices:
-                    setattr(
-                        bean_class,
-                        attr_name,
-                        self.wrapper(
-                            before_advices,
-                            around_advices,
-                            after_returning_advices,
-                            after_throwing_advices,
-                            after_advices)(attr))
+            methods = {}
+            # 父类也是 bean 时，继承父类中被织入且没有被覆盖的方法
+            for base in reversed(inspect.getmro(bean_class)):
+                for attr_name, woven in woven_methods.get(base, {}).iteritems():
+                    if getattr(bean_class, attr_name).im_func is \
+                            getattr(base, attr_name).im_func:
+                        methods[attr_name] = woven
+            if not methods:
+                continue
+            methods["__module__"] = bean_class.__module__
+            self._woven_classes[bean_class] = type(bean_class)(
+                bean_class.__name__, (bean_class,), methods)
+
+    def __weave_methods(self, bean_class, bean_name):
+        """返回 {方法名称 -> 织入了通知的方法}"""
+        methods = {}
+        class_name = bean_class.__name__
+        # 先按照类名筛选出可能匹配的切点
+        candidates = self._advices.candidates(class_name)
+        for attr_name, attr in get_declared_methods(bean_class):
+            before_advices, around_advices, after_returning_advices, \
+                after_throwing_advices, after_advices = \
+                self.__resolve_advices(class_name, attr_name, candidates)
+            memoizer = self.__create_memoizer(bean_name, attr_name, attr)
+            if memoizer is not None:
+                # 缓存命中时不再执行其它的环绕通知、连接点、
+                # + 返回通知和最终通知
+                around_advices.insert(0, memoizer.around)
+            if before_advices or \
+                    around_advices or \
+                    after_returning_advices or \
+                    after_throwing_advices or \
+                    after_advices:
+                woven = self.wrapper(
+                    before_advices,
+                    around_advices,
+                    after_returning_advices,
+                    after_throwing_advices,
+                    after_advices)(attr)
+                if memoizer is not None:
+                    woven.invalidate = memoizer.invalidate
+                    woven.invalidate_all = memoizer.invalidate_all
+                    woven.cache_stats = memoizer.stats
+                methods[attr_name] = woven
+        return methods
+
+    def __create_memoizer(self, bean_name, attr_name, attr):
+        options = get_memoize(attr)
+        if options is None or bean_name is None:
+            return None
+        memoizer = Memoizer(
+            attr,
+            options["maxsize"],
+            options["ttl"],
+            options["key"])
+        self._memoizers.setdefault(bean_name, {})[attr_name] = memoizer
+        return memoizer
+
+    def get_memoize_stats(self, bean_name):
+        """返回 bean 中所有被 @memoize 装饰的方法的缓存统计信息"""
+        if bean_name not in self._name_to_bean:
+            raise BeanNotFoundError("bean %s not found" % bean_name)
+        return dict((attr_name, memoizer.stats())
+                    for attr_name, memoizer in
+                    self._memoizers.get(bean_name, {}).iteritems())
+
+    def invalidate_memoized(self, bean_name, attr_name=None):
+        """清空 bean 中某个方法或者所有方法的缓存"""
+        if bean_name not in self._name_to_bean:
+            raise BeanNotFoundError("bean %s not found" % bean_name)
+        memoizers = self._memoizers.get(bean_name, {})
+        if attr_name is not None:
+            memoizers = {attr_name: memoizers[attr_name]} \
+                if attr_name in memoizers else {}
+        for memoizer in memoizers.itervalues():
+            memoizer.invalidate_all()
 
     def get_bean(self, name):
         return self.__get_bean(name, {}, {})
@@ -132,7 +180,7 @@ for point_cut, advices in self._{{ADVICE_TYPE}}.iteritems():
                 if name in self._name_to_obj:
                     return self._name_to_obj[name]
                 # 创建 bean 实例
-                obj = bean.cls()
+                obj = self.__create_instance(bean)
                 # 处理依赖
                 self.__process_dependency(obj, bean, creating, created)
                 # 将单例 bean 缓存起来
@@ -140,11 +188,14 @@ for point_cut, advices in self._{{ADVICE_TYPE}}.iteritems():
                 # 调用 post_construct
                 bean.post_construct(obj)
                 return obj
-        obj = bean.cls()
+        obj = self.__create_instance(bean)
         self.__process_dependency(obj, bean, creating, created)
         bean.post_construct(obj)
         return obj
 
+    def __create_instance(self, bean):
+        return self._woven_classes.get(bean.cls, bean.cls)()
+
     def __process_dependency(self, obj, bean, creating, created):
         creating[bean.name] = obj
         for attr_name, attr_value in bean.properties.iteritems():
@@ -5,7 +5,8 @@ __all__ = ["aspect", "get_aspect", "is_aspect_present",
            "around", "get_around", "is_around_present",
            "after_throwing", "get_after_throwing", "is_after_throwing_present",
            "after_returning", "get_after_returning", "is_after_returning_present",
-           "after", "get_after", "is_after_present"]
+           "after", "get_after", "is_after_present",
+           "memoize", "get_memoize", "is_memoize_present"]
 __authors__ = ["Tim Chow"]
 
 import inspect
@@ -104,3 +105,42 @@ after_throwing, get_after_throwing, \
     is_after_throwing_present = AdviceFactory.create("after_throwing")
 after_returning, get_after_returning, \
     is_after_returning_present = AdviceFactory.create("after_returning")
+
+
+# 按照实参缓存方法的返回值；织入时会被转换成一个最先执行的环绕通知
+def memoize(maxsize=128, ttl=None, key=None):
+    """
+    命中缓存时直接返回缓存的值：只有前置通知会被执行，其它的环绕通知
+    + （包括它们返回的回调）、返回通知和最终通知都会被跳过，
+    + 所以不要依赖这些通知观察被缓存的方法的每一次调用
+    """
+    if not isinstance(maxsize, (int, long)) or maxsize <= 0:
+        raise ValueError("positive maxsize expected")
+    if ttl is not None and \
+            (not isinstance(ttl, (int, long, float)) or ttl <= 0):
+        raise ValueError("positive ttl expected")
+    if key is not None and not callable(key):
+        raise ValueError("callable key expected")
+
+    def _inner(f):
+        if not isinstance(f, types.FunctionType):
+            raise RuntimeError("function expected")
+        setattr(f, "__aop_memoize__",
+                {"maxsize": maxsize, "ttl": ttl, "key": key})
+        return f
+    return _inner
+
+
+def get_memoize(f):
+    if not isinstance(f, types.MethodType):
+        raise RuntimeError("method expected")
+    if "__aop_memoize__" not in get_declared_fields(f, only_names=True):
+        return None
+    attr_value = getattr(f, "__aop_memoize__")
+    if not isinstance(attr_value, dict):
+        return None
+    return attr_value
+
+
+def is_memoize_present(f):
+    return get_memoize(f) is not None
@@ -2,6 +2,7 @@
 
 __all__ = ["request_mapping", "is_request_mapping_present", "get_request_mapping",
            "exception_handler", "is_exception_handler_present", "get_exception_handler",
+           "cacheable", "get_cacheable",
            "rest_controller", "is_rest_controller_present"]
 __authors__ = ["Tim Chow"]
 
@@ -13,10 +14,23 @@ from .component import component
 from ..utility import is_tornado_installed
 
 
-# request_mapping 既可以装饰类，也可以装饰方法
-def request_mapping(uri, method=None, consumes=None, produce=None):
+def _create_binder(arg_spec, converters=None):
+    # 在装饰时编译参数绑定器，不被支持的参数会立即报错
+    from ..mvc.argument_binder import ArgumentBinder
+    return ArgumentBinder(arg_spec, converters)
+
+
+# request_mapping 既可以装饰类，也可以装饰方法；
+# + etag 为 None 时使用全局配置，False 表示不生成，True/"strong"/"weak" 表示
+# + 根据响应体生成强 ETag 或者弱 ETag
+def request_mapping(uri, method=None, consumes=None, produce=None,
+                    converters=None, etag=None):
+    if etag not in (None, False, True, "strong", "weak"):
+        raise RuntimeError("invalid etag mode")
+
     def _inner(f):
         if isinstance(f, types.FunctionType):
+            arg_spec = inspect.getargspec(f)
             setattr(f,
                     "__mvc_args__",
                     {
@@ -24,7 +38,10 @@ def request_mapping(uri, method=None, consumes=None, produce=None):
                         "method": method,
                         "consumes": isinstance(consumes, basestring) and [consumes] or (consumes or []),
                         "produce": produce,
-                        "arg_spec": inspect.getargspec(f)
+                        "arg_spec": arg_spec,
+                        "converters": converters or {},
+                        "etag": etag,
+                        "binder": _create_binder(arg_spec, converters)
                     }
                     )
         elif inspect.isclass(f):
@@ -56,12 +73,14 @@ def exception_handler(uri, *exceptions):
     def _inner(f):
         if not isinstance(f, types.FunctionType):
             raise RuntimeError("function expected")
+        arg_spec = inspect.getargspec(f)
         setattr(
             f,
             "__mvc_exception_handler__",
             {"uri": uri,
              "exceptions": exceptions,
-             "arg_spec": inspect.getargspec(f)
+             "arg_spec": arg_spec,
+             "binder": _create_binder(arg_spec)
             })
         return f
     return _inner
@@ -84,6 +103,38 @@ def is_exception_handler_present(f):
     return get_exception_handler(f, None) is not None
 
 
+# 可以参与缓存键的参数前缀
+_VARY_PREFIXES = ("arg_", "header_", "cookie_")
+
+
+# 缓存 GET handler 渲染之后的响应；vary 中的参数与 handler 参数的命名方式相同，
+# + uri 总是缓存键的一部分。命中缓存时仍然会执行拦截器的 pre_handle
+# + （比如认证和鉴权），但是不会执行 handler 和拦截器的 post_handle
+def cacheable(ttl, vary=None):
+    if not isinstance(ttl, (int, long, float)) or ttl <= 0:
+        raise RuntimeError("positive ttl expected")
+    vary = tuple(vary or ())
+    for name in vary:
+        if not isinstance(name, basestring) or \
+                not name.startswith(_VARY_PREFIXES) or \
+                name in _VARY_PREFIXES:
+            raise RuntimeError("invalid vary argument %r" % (name, ))
+
+    def _inner(f):
+        if not isinstance(f, types.FunctionType):
+            raise RuntimeError("function expected")
+        setattr(f, "__mvc_cacheable__", {"ttl": ttl, "vary": vary})
+        return f
+    return _inner
+
+
+def get_cacheable(f, default=None):
+    annotation = getattr(f, "__mvc_cacheable__", None)
+    if not isinstance(annotation, dict) or "ttl" not in annotation:
+        return default
+    return annotation
+
+
 def _create_rest_controller(key):
     def rest_controller(*outer_args, **outer_kwargs):
         returning = component(*outer_args, **outer_kwargs)
@@ -4,10 +4,87 @@ __all__ = ["JointPoint"]
 __authors__ = ["Tim Chow"]
 
 import inspect
+import weakref
+
+# 目标函数 -> 预先编译好的参数绑定函数
+_BINDERS = weakref.WeakKeyDictionary()
+
+
+def _compile_binder(method):
+    """只解析一次形参、默认值，返回 bind(args, kwargs) 函数"""
+    arg_spec = inspect.getargspec(method)
+    # 形参列表
+    formal_arguments = arg_spec.args
+    formal_count = len(formal_arguments)
+    varargs = arg_spec.varargs
+    keywords = arg_spec.keywords
+    # 默认参数
+    if arg_spec.defaults is not None:
+        defaults = dict(zip(
+            formal_arguments[-1*len(arg_spec.defaults):],
+            arg_spec.defaults))
+    else:
+        defaults = dict()
+
+    def bind(actual_arguments, keyword_arguments):
+        # 复制一份关键字参数，避免影响之后的 proceed
+        keyword_arguments = dict(keyword_arguments)
+        actual_count = len(actual_arguments)
+
+        # 实际参数的数量大于形式参数的数量
+        if actual_count > formal_count:
+            # 如果没定义变长参数，则抛出异常
+            if varargs is None:
+                raise ValueError("too many arguments")
+            bind_result = dict(zip(formal_arguments, actual_arguments))
+            bind_result[varargs] = tuple(actual_arguments[formal_count:])
+            if keywords is not None:
+                for keyword_argument in keyword_arguments:
+                    if keyword_argument in formal_arguments:
+                        raise ValueError("multiple value for argument %s" % keyword_argument)
+                bind_result[keywords] = keyword_arguments
+            elif keyword_arguments:
+                raise ValueError("there are no keyword arguments")
+            return bind_result
+
+        # 实际参数的数量小于等于形式参数的数量
+        bind_result = dict(zip(formal_arguments, actual_arguments))
+        if varargs is not None:
+            bind_result[varargs] = tuple()
+        for formal_argument in formal_arguments[actual_count:]:
+            if formal_argument in keyword_arguments:
+                bind_result[formal_argument] = keyword_arguments.pop(formal_argument)
+                continue
+            if formal_argument not in defaults:
+                raise ValueError("missing argument %s" % formal_argument)
+            bind_result[formal_argument] = defaults[formal_argument]
+        if keywords is not None:
+            for keyword_argument in keyword_arguments:
+                if keyword_argument in formal_arguments[:actual_count]:
+                    raise ValueError("multiple value for argument %s" % keyword_argument)
+            bind_result[keywords] = keyword_arguments
+        elif keyword_arguments:
+            raise ValueError("there are no keyword arguments")
+        return bind_result
+    return bind
+
+
+def get_binder(method):
+    # 方法与其 im_func 的形参相同，以 im_func 作为 key，不会持有实例的引用
+    function = getattr(method, "im_func", method)
+    try:
+        binder = _BINDERS.get(function)
+    except TypeError:
+        return _compile_binder(method)
+    if binder is None:
+        binder = _BINDERS[function] = _compile_binder(method)
+    return binder
 
 
 class JointPoint(object):
     """连接点对象"""
+    __slots__ = ("_method", "_args", "_kwargs")
+
     def __init__(self, method=None, args=None, kwargs=None):
         self._method = method
         self._args = args or tuple()
@@ -47,70 +124,11 @@ class JointPoint(object):
         self._kwargs = kwargs
 
     def get_arguments(self):
-        if self.method is None:
+        if self._method is None:
             raise RuntimeError("no method was specified")
-
-        bind_result = {}
-        arg_spec = inspect.getargspec(self.method)
-        # 形参列表
-        formal_arguments = arg_spec.args
-        # 默认参数
-        if arg_spec.defaults is not None:
-            defaults = dict(zip(
-                formal_arguments[-1*len(arg_spec.defaults):],
-                arg_spec.defaults))
-        else:
-            defaults = dict()
-
-        # 实参列表
-        actual_arguments = list(self.args)
-        # 关键字参数
-        keyword_arguments = self.kwargs
-
-        # 实际参数的数量大于形式参数的数量
-        if len(actual_arguments) > len(formal_arguments):
-            # 如果没定义变长参数，则抛出异常
-            if arg_spec.varargs is None:
-                raise ValueError("too many arguments")
-            bind_result.update(
-                dict(
-                    zip(formal_arguments,
-                        actual_arguments[:len(formal_arguments)]
-                    )
-                )
-            )
-            bind_result[arg_spec.varargs] = tuple(actual_arguments[len(formal_arguments):])
-            if arg_spec.keywords is not None:
-                for keyword_argument in keyword_arguments:
-                    if keyword_argument in formal_arguments:
-                        raise ValueError("multiple value for argument %s" % keyword_argument)
-                bind_result[arg_spec.keywords] = keyword_arguments
-            elif keyword_arguments:
-                raise ValueError("there are no keyword arguments")
-        # 实际参数的数量小于等于形式参数的数量
-        else:
-            if arg_spec.varargs is not None:
-                bind_result[arg_spec.varargs] = tuple()
-            bind_result.update(dict(zip(
-                formal_arguments[:len(actual_arguments)],
-                actual_arguments)))
-            for formal_argument in formal_arguments[len(actual_arguments):]:
-                if formal_argument in keyword_arguments:
-                    bind_result[formal_argument] = keyword_arguments.pop(formal_argument)
-                    continue
-                if formal_argument not in defaults:
-                    raise ValueError("missing argument %s" % formal_argument)
-                bind_result[formal_argument] = defaults[formal_argument]
-            if arg_spec.keywords is not None:
-                for keyword_argument in keyword_arguments:
-                    if keyword_argument in formal_arguments[:len(actual_arguments)]:
-                        raise ValueError("multiple value for argument %s" % keyword_argument)
-                bind_result[arg_spec.keywords] = keyword_arguments
-            elif keyword_arguments:
-                raise ValueError("there are no keyword arguments")
-        return bind_result
+        return get_binder(self._method)(self._args, self._kwargs)
 
     def proceed(self):
-        if self.method is None:
+        if self._method is None:
             raise RuntimeError("no method specified")
-        return self.method(*self.args, **self.kwargs)
+        return self._method(*self._args, **self._kwargs)
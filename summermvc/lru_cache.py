@@ -0,0 +1,104 @@
+# coding: utf8
+
+__all__ = ["LRUCache"]
+__authors__ = ["Tim Chow"]
+
+import time
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    线程安全的、有界的 LRU 缓存；ttl 是默认的过期时间（秒），为 None 时不过期
+    """
+    def __init__(self, maxsize=128, ttl=None, timer=time.time):
+        if not isinstance(maxsize, (int, long)) or maxsize <= 0:
+            raise ValueError("positive maxsize expected")
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._timer = timer
+        self._lock = threading.Lock()
+        # key -> (value, 过期时间或者 None)
+        self._data = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def maxsize(self):
+        return self._maxsize
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def evictions(self):
+        return self._evictions
+
+    @property
+    def expirations(self):
+        return self._expirations
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                entry = self._data.pop(key)
+            except KeyError:
+                self._misses = self._misses + 1
+                return default
+            if entry[1] is not None and entry[1] <= self._timer():
+                self._expirations = self._expirations + 1
+                self._misses = self._misses + 1
+                return default
+            # 移动到队尾，表示最近被使用过
+            self._data[key] = entry
+            self._hits = self._hits + 1
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self._ttl
+        expires_at = None
+        if ttl is not None:
+            expires_at = self._timer() + ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires_at)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions = self._evictions + 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        entry = self._data.get(key)
+        return entry is not None and \
+            (entry[1] is None or entry[1] > self._timer())
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "size": len(self._data),
+                "maxsize": self._maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": total and float(self._hits) / total or 0.0}
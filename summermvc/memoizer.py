@@ -0,0 +1,87 @@
+# coding: utf8
+
+__all__ = ["Memoizer"]
+__authors__ = ["Tim Chow"]
+
+import inspect
+import functools
+
+from .joint_point import JointPoint
+from .exception import Return
+from .lru_cache import LRUCache
+
+# 表示缓存中没有对应的值，返回值本身可能是 None
+_MISSING = object()
+
+
+class Memoizer(object):
+    """
+    @memoize 对应的环绕通知：命中缓存时通过 Return 直接返回缓存的值，
+    + 否则在连接点正常返回之后把返回值放入缓存；抛出的异常不会被缓存。
+    + 缓存属于被织入的方法，同一个类的多个实例（比如原型 bean）共享缓存
+    """
+    def __init__(self, method, maxsize=128, ttl=None, key=None):
+        self._method = method
+        self._key = key
+        self._cache = LRUCache(maxsize, ttl)
+        arg_spec = inspect.getargspec(method)
+        # 第一个形参是 self，不参与计算 key
+        self._arg_names = tuple(arg_spec.args[1:])
+        self._varargs = arg_spec.varargs
+        self._keywords = arg_spec.keywords
+
+    @property
+    def method(self):
+        return self._method
+
+    @property
+    def cache(self):
+        return self._cache
+
+    def make_key(self, args, kwargs):
+        """args 和 kwargs 不包含 self；默认值会被填充，f(1) 与 f(1, b=2) 的 key 相同"""
+        if self._key is not None:
+            return self._key(*args, **kwargs)
+        bind_result = JointPoint(
+            self._method, (None,) + tuple(args), dict(kwargs)).get_arguments()
+        key = tuple(bind_result[arg_name] for arg_name in self._arg_names)
+        if self._varargs is not None:
+            key = key + (bind_result[self._varargs], )
+        if self._keywords is not None:
+            key = key + (tuple(sorted(bind_result[self._keywords].items())), )
+        return key
+
+    def _safe_make_key(self, args, kwargs):
+        # 参数不合法或者 key 不可哈希时不使用缓存，由方法本身报告错误
+        try:
+            key = self.make_key(args, kwargs)
+            hash(key)
+        except (TypeError, ValueError):
+            return _MISSING
+        return key
+
+    def around(self, joint_point):
+        key = self._safe_make_key(joint_point.args[1:], joint_point.kwargs)
+        if key is _MISSING:
+            return None
+        value = self._cache.get(key, _MISSING)
+        if value is not _MISSING:
+            raise Return(value)
+        return functools.partial(self._store, key)
+
+    def _store(self, key, joint_point, returning, exc_info):
+        if exc_info is None:
+            self._cache.set(key, returning)
+
+    def invalidate(self, *args, **kwargs):
+        """使用与调用方法时相同的实参（不包含 self）删除对应的缓存"""
+        key = self._safe_make_key(args, kwargs)
+        if key is _MISSING:
+            return False
+        return self._cache.delete(key)
+
+    def invalidate_all(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
@@ -1,4 +1,6 @@
 from .interface import *
+from .argument_binder import *
+from .compression import *
 from .constant import *
 from .dispatcher_application import *
 from .dispatcher_configurer import *
@@ -6,10 +8,15 @@ from .exception import *
 from .handler import *
 from .handler_execution_chain import *
 from .http_utility import *
+from .interceptor_registry import *
+from .json_encoder import *
 from .json_view_resolver import *
 from .model_and_view import *
 from .multipart_entity import *
+from .profiling_controller import *
 from .request_mapping_handler_adapter import *
 from .request_mapping_handler_mapping import *
+from .response_cache import *
+from .route_table import *
 from .urlencoded_entity import *
 
@@ -0,0 +1,220 @@
+# coding: utf8
+
+__all__ = ["ArgumentBinder"]
+__authors__ = ["Tim Chow"]
+
+from .exception import InvalidArgumentError, MissingArgumentError, \
+    ArgumentConversionError
+
+# 前缀 -> 缺少名称时的错误信息
+_PREFIXES = [("arg_", "missing argument name"),
+             ("args_", "missing argument name"),
+             ("path_var_", "missing path variable name"),
+             ("header_", "missing header name"),
+             ("cookie_", "missing cookie name")]
+
+# 不需要从请求中取值的参数
+_FIXED_ARGUMENTS = {
+    "request": lambda request, response, mv, matches, exc: request,
+    "request_body": lambda request, response, mv, matches, exc: request.body,
+    "response": lambda request, response, mv, matches, exc: response,
+    "model_and_view": lambda request, response, mv, matches, exc: mv,
+    "model": lambda request, response, mv, matches, exc: mv.model,
+    "exc": lambda request, response, mv, matches, exc: exc,
+}
+
+# 表示参数没有默认值
+_REQUIRED = object()
+
+_BOOLEAN_VALUES = {"true": True, "yes": True, "on": True, "1": True,
+                   "false": False, "no": False, "off": False, "0": False,
+                   "": False}
+
+
+def _to_bool(value):
+    try:
+        return _BOOLEAN_VALUES[value.lower()]
+    except KeyError:
+        raise ValueError("boolean expected")
+
+
+# 根据默认值的类型推断转换函数，bool 是 int 的子类，需要按照类型精确匹配
+_INFERRED_CONVERTERS = {bool: _to_bool, int: int, long: long, float: float}
+
+
+def _compile_converter(arg_name, converter, is_multiple):
+    """
+    converter 可以是一个函数，或者是只包含一个函数的 list，表示逗号分隔的列表；
+    + args_ 参数的值本身就是列表，会对其中的每个元素进行转换
+    """
+    if isinstance(converter, (list, tuple)):
+        if len(converter) != 1 or not callable(converter[0]):
+            raise InvalidArgumentError(
+                "invalid converter for argument %s" % arg_name)
+        element_converter = converter[0] is bool and _to_bool or converter[0]
+        is_list = True
+    elif callable(converter):
+        element_converter = converter is bool and _to_bool or converter
+        is_list = False
+    else:
+        raise InvalidArgumentError(
+            "invalid converter for argument %s" % arg_name)
+
+    if is_multiple:
+        def convert(value):
+            try:
+                return [element_converter(v) for v in value]
+            except (ValueError, TypeError) as e:
+                raise ArgumentConversionError(arg_name, value, str(e))
+    elif is_list:
+        def convert(value):
+            try:
+                return [element_converter(v) for v in value.split(",")
+                        if v != ""]
+            except (ValueError, TypeError) as e:
+                raise ArgumentConversionError(arg_name, value, str(e))
+    else:
+        def convert(value):
+            try:
+                return element_converter(value)
+            except (ValueError, TypeError) as e:
+                raise ArgumentConversionError(arg_name, value, str(e))
+    return convert
+
+
+def _infer_converter(default, is_multiple):
+    if default is _REQUIRED or default is None:
+        return None
+    if is_multiple:
+        # args_ 参数根据默认列表中第一个元素的类型推断
+        if isinstance(default, (list, tuple)) and default:
+            converter = _INFERRED_CONVERTERS.get(type(default[0]))
+            return converter and [converter]
+        return None
+    if isinstance(default, (list, tuple)):
+        # 逗号分隔的列表，与 args_ 参数一样根据第一个元素的类型推断
+        if default:
+            return [_INFERRED_CONVERTERS.get(type(default[0]), str)]
+        return [str]
+    return _INFERRED_CONVERTERS.get(type(default))
+
+
+def _compile_argument(arg_name, name, default, convert):
+    def extractor(request, response, mv, matches, exc):
+        try:
+            value = request.get_argument(name)
+        except MissingArgumentError:
+            if default is _REQUIRED:
+                raise
+            return default
+        return convert(value) if convert else value
+    return extractor
+
+
+def _compile_arguments(arg_name, name, default, convert):
+    def extractor(request, response, mv, matches, exc):
+        try:
+            value = request.get_arguments(name)
+        except MissingArgumentError:
+            if default is _REQUIRED:
+                raise
+            return default
+        return convert(value) if convert else value
+    return extractor
+
+
+def _compile_path_var(arg_name, name, default, convert):
+    def extractor(request, response, mv, matches, exc):
+        if matches and name in matches:
+            value = matches[name]
+            return convert(value) if convert else value
+        if default is _REQUIRED:
+            raise MissingArgumentError("missing argument %s" % arg_name)
+        return default
+    return extractor
+
+
+def _compile_header(arg_name, name, default, convert):
+    def extractor(request, response, mv, matches, exc):
+        value = request.get_header_or_default(name, None)
+        if value is not None:
+            return convert(value) if convert else value
+        if default is _REQUIRED:
+            raise MissingArgumentError("missing argument %s" % arg_name)
+        return default
+    return extractor
+
+
+def _compile_cookie(arg_name, name, default, convert):
+    def extractor(request, response, mv, matches, exc):
+        value = request.get_cookie_or_default(name, None)
+        if value is not None:
+            return convert(value) if convert else value
+        if default is _REQUIRED:
+            raise MissingArgumentError("missing argument %s" % arg_name)
+        return default
+    return extractor
+
+
+_COMPILERS = {"arg_": _compile_argument,
+              "args_": _compile_arguments,
+              "path_var_": _compile_path_var,
+              "header_": _compile_header,
+              "cookie_": _compile_cookie}
+
+
+class ArgumentBinder(object):
+    """
+    把 handler 的形参预先编译成一组取值函数，并解析好默认值和类型转换函数，
+    + 绑定参数时不再需要做前缀判断；不被支持的参数在启动时就会报错
+    """
+    def __init__(self, arg_spec, converters=None):
+        defaults = {}
+        if arg_spec.defaults:
+            defaults = dict(zip(
+                arg_spec.args[-1 * len(arg_spec.defaults):],
+                arg_spec.defaults))
+        converters = converters or {}
+
+        self._arg_names = tuple(arg_spec.args[1:])
+        for arg_name in converters:
+            if arg_name not in self._arg_names or \
+                    arg_name in _FIXED_ARGUMENTS:
+                raise InvalidArgumentError(
+                    "can not convert argument %s" % arg_name)
+        self._extractors = tuple(
+            self._compile(arg_name, defaults, converters)
+            for arg_name in self._arg_names)
+
+    @staticmethod
+    def _compile(arg_name, defaults, converters):
+        if arg_name in _FIXED_ARGUMENTS:
+            return _FIXED_ARGUMENTS[arg_name]
+
+        for prefix, message in _PREFIXES:
+            if not arg_name.startswith(prefix):
+                continue
+            if len(arg_name) == len(prefix):
+                raise InvalidArgumentError(message)
+            default = defaults.get(arg_name, _REQUIRED)
+            is_multiple = prefix == "args_"
+            converter = converters.get(arg_name) or \
+                _infer_converter(default, is_multiple)
+            convert = None
+            if converter is not None:
+                convert = _compile_converter(arg_name, converter, is_multiple)
+            return _COMPILERS[prefix](
+                arg_name,
+                arg_name[len(prefix):],
+                default,
+                convert)
+
+        raise InvalidArgumentError("unsupported argument %s" % arg_name)
+
+    @property
+    def arg_names(self):
+        return self._arg_names
+
+    def bind(self, request, response, mv, matches, exc=None):
+        return tuple([extractor(request, response, mv, matches, exc)
+                      for extractor in self._extractors])
@@ -0,0 +1,123 @@
+# coding: utf8
+
+__all__ = ["ResponseCompressor"]
+__authors__ = ["Tim Chow"]
+
+import zlib
+
+# 编码 -> zlib 的 wbits；HTTP 中的 deflate 指的是 zlib 格式
+_WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+# 客户端同时接受多种编码时，优先使用 gzip
+_PREFERENCE = ["gzip", "deflate"]
+
+_DEFAULT_CONTENT_TYPES = ("application/json",
+                          "application/javascript",
+                          "application/xml",
+                          "text/")
+
+
+class ResponseCompressor(object):
+    """
+    根据 Accept-Encoding 选择 gzip 或者 deflate 压缩响应体；
+    + 以 "/" 结尾的 content type 表示前缀，比如 "text/" 匹配所有的文本类型
+    """
+    def __init__(self, min_size=1024, level=6, content_types=None):
+        self._min_size = min_size
+        self._level = level
+        content_types = content_types or _DEFAULT_CONTENT_TYPES
+        self._content_types = frozenset(
+            t for t in content_types if not t.endswith("/"))
+        self._content_type_prefixes = tuple(
+            t for t in content_types if t.endswith("/"))
+
+    @property
+    def min_size(self):
+        return self._min_size
+
+    @property
+    def level(self):
+        return self._level
+
+    @staticmethod
+    def negotiate(accept_encoding):
+        if not accept_encoding:
+            return None
+        accepted = {}
+        for item in accept_encoding.split(","):
+            parts = item.split(";")
+            coding = parts[0].strip().lower()
+            quality = 1.0
+            for param in parts[1:]:
+                pair = param.split("=", 1)
+                if len(pair) == 2 and pair[0].strip() == "q":
+                    try:
+                        quality = float(pair[1])
+                    except ValueError:
+                        quality = 0.0
+            accepted[coding] = quality
+
+        best, best_quality = None, 0.0
+        for coding in _PREFERENCE:
+            quality = accepted.get(coding, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def is_compressible(self, content_type):
+        if not content_type:
+            return False
+        mime_type = content_type.split(";", 1)[0].strip().lower()
+        return mime_type in self._content_types or \
+            mime_type.startswith(self._content_type_prefixes)
+
+    def compress(self, body, encoding):
+        compressor = zlib.compressobj(
+            self._level, zlib.DEFLATED, _WBITS[encoding])
+        return compressor.compress(body) + compressor.flush()
+
+    def compress_iter(self, chunks, encoding):
+        compressor = zlib.compressobj(
+            self._level, zlib.DEFLATED, _WBITS[encoding])
+        for chunk in chunks:
+            if not chunk:
+                continue
+            # 每一块都立即输出，客户端不必等到整个响应体结束才能解压
+            yield compressor.compress(chunk) + \
+                compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+
+    def compress_response(self, request, response, body):
+        """
+        body 是字符串或者可迭代对象；根据需要修改响应头，返回压缩之后的响应体
+        """
+        if response.get_header("Content-Encoding") is not None or \
+                response.status_code in (204, 304) or \
+                not self.is_compressible(response.get_header("Content-Type")):
+            return body
+        is_buffered = isinstance(body, str)
+        if is_buffered and len(body) < self._min_size:
+            return body
+
+        vary = response.get_header("Vary")
+        if vary is None:
+            response.add_header("Vary", "Accept-Encoding")
+        elif "accept-encoding" not in vary.lower():
+            response.add_header("Vary", vary + ", Accept-Encoding")
+
+        encoding = self.negotiate(
+            request.get_header_or_default("Accept-Encoding", ""))
+        if encoding is None:
+            return body
+
+        response.add_header("Content-Encoding", encoding)
+        # 压缩之后的内容与原来的内容不再是字节相同的，强 ETag 需要变成弱 ETag
+        etag = response.get_header("ETag")
+        if etag is not None and not etag.startswith("W/"):
+            response.add_header("ETag", "W/" + etag)
+
+        if is_buffered:
+            body = self.compress(body, encoding)
+            response.add_header("Content-Length", str(len(body)))
+            return body
+        response.remove_header("Content-Length")
+        return self.compress_iter(body, encoding)
@@ -40,6 +40,7 @@ class HTTPStatus(object):
     Forbidden = 403
     NotFound = 404 
     MethodNotAllowed = 405
+    RequestEntityTooLarge = 413
 
     InternalError = 500
     BadGateway = 502
@@ -4,8 +4,8 @@ __all__ = ["BaseDispatcher",
            "DispatcherApplication"]
 __authors__ = ["Tim Chow"]
 
-import re
 import types
+import hashlib
 import logging
 import traceback
 import threading
@@ -18,10 +18,14 @@ from .json_view_resolver import JsonViewResolver
 from .request_mapping_handler_mapping import *
 from .request_mapping_handler_adapter import *
 from .handler_execution_chain import *
-from .constant import HTTPStatus
+from .interceptor_registry import InterceptorRegistry
+from .constant import HTTPStatus, RequestMethod
 from ..application_context import ApplicationContext
 from .dispatcher_configurer import *
 from ..utility import is_tornado_installed
+from ..lru_cache import LRUCache
+from ..decorator.mvc import get_request_mapping, get_cacheable
+from .response_cache import CachedResponse, LRUResponseCache
 
 LOGGER = logging.getLogger(__name__)
 
@@ -57,7 +61,7 @@ class BaseDispatcher(_Factory):
         self._handler_mappings = []
         self._handler_interceptors = []
         self._handler_adapters = []
-        self._view_resolver = JsonViewResolver()
+        self._view_resolver = None
         for name, bean in self._ctx.iter_beans():
             obj = self._ctx.get_bean(name)
             if issubclass(bean.cls, HandlerMapping):
@@ -69,10 +73,25 @@ class BaseDispatcher(_Factory):
             if issubclass(bean.cls, ViewResolver):
                 self._view_resolver = obj
 
-        self._configurer = DefaultDispatcherConfigurer()
+        self.configurer = DefaultDispatcherConfigurer()
         self._default_handler_mapping = RequestMappingHandlerMapping()
         self._chain_class = HandlerExecutionChain
         self._default_handler_adapter = RequestMappingHandlerAdapter()
+        self._lock = threading.Lock()
+        self._handler_cache = None
+        self._handler_cache_revision = None
+        self._response_cache = LRUResponseCache()
+
+        self._interceptor_registry = InterceptorRegistry(
+            self._handler_interceptors)
+
+        # 启动时构建路由表，并确定每个路由的拦截器链，避免在请求中构建
+        for handler_mapping in self._handler_mappings + \
+                [self._default_handler_mapping]:
+            if isinstance(handler_mapping, RequestMappingHandlerMapping):
+                route_table = handler_mapping.get_route_table(self._ctx)
+                for route in route_table.routes:
+                    self._interceptor_registry.plan(route.uri_pattern)
 
     @property
     def application_context(self):
@@ -92,7 +111,8 @@ class BaseDispatcher(_Factory):
 
     @property
     def view_resolver(self):
-        return self._view_resolver
+        # 没有注册 ViewResolver 类型的 bean 时，使用默认的 JsonViewResolver
+        return self._view_resolver or self._default_view_resolver
 
     @property
     def configurer(self):
@@ -101,6 +121,8 @@ class BaseDispatcher(_Factory):
     @configurer.setter
     def configurer(self, configurer):
         self._configurer = configurer
+        self._default_view_resolver = JsonViewResolver(
+            configurer.json_encoder)
 
     @property
     def default_handler_mapping(self):
@@ -126,27 +148,79 @@ class BaseDispatcher(_Factory):
     def default_handler_adapter(self, default_handler_adapter):
         self._default_handler_adapter = default_handler_adapter
 
+    @property
+    def handler_cache(self):
+        """(请求方法, uri, Content-Type) -> (handler, interceptors) 的 LRU 缓存"""
+        size = self.configurer.handler_cache_size
+        if not size:
+            return None
+        handler_cache = self._handler_cache
+        if handler_cache is not None and \
+                handler_cache.maxsize == size and \
+                self._handler_cache_revision == self._ctx.revision:
+            return handler_cache
+
+        with self._lock:
+            # 注册了新的 bean 之后，缓存失效
+            if self._handler_cache is None or \
+                    self._handler_cache.maxsize != size or \
+                    self._handler_cache_revision != self._ctx.revision:
+                self._handler_cache = LRUCache(size)
+                self._handler_cache_revision = self._ctx.revision
+            return self._handler_cache
+
+    @property
+    def response_cache(self):
+        """@cacheable 使用的响应缓存，没有配置时使用进程内的 LRU"""
+        return self.configurer.response_cache or self._response_cache
+
     def get_handler(self, request):
-        for handler_mapping in self.handler_mappings:
-            handler = handler_mapping.get_handler(request)
+        method_not_allowed = None
+        for handler_mapping in self.handler_mappings + \
+                [self._default_handler_mapping]:
+            try:
+                handler = handler_mapping.get_handler(request)
+            except MethodNotAllowedError as e:
+                # 其它的 handler mapping 仍然可能找到 handler
+                if method_not_allowed is None:
+                    method_not_allowed = e
+                else:
+                    method_not_allowed = MethodNotAllowedError(
+                        method_not_allowed.allowed_methods |
+                        e.allowed_methods)
+                continue
             if handler is not None:
                 return handler
-        return self._default_handler_mapping.get_handler(request)
-
-    def get_interceptors(self, uri):
-        interceptors = []
-        for interceptor in self.handler_interceptors:
-            if re.match(interceptor.path_pattern(), uri):
-                interceptors.append(interceptor)
+        if method_not_allowed is not None:
+            raise method_not_allowed
+        return None
 
-        # 按照 order 对 interceptors 进行排序
-        return sorted(interceptors, key=lambda i: i.get_order(), reverse=True)
+    def get_interceptors(self, uri, uri_pattern=None):
+        # 拦截器已经按照 order 排好序
+        return self._interceptor_registry.get_interceptors(uri, uri_pattern)
 
     def get_execution_chain(self, request):
+        handler_cache = self.handler_cache
+        if handler_cache is not None:
+            key = (request.request_method,
+                   request.uri,
+                   request.content_type,
+                   self._default_handler_mapping.__class__)
+            cached = handler_cache.get(key)
+            if cached is not None:
+                return self._chain_class(*cached)
+
         handler = self.get_handler(request)
         if handler is None:
             raise NoHandlerFoundError("no handler found")
-        interceptors = self.get_interceptors(request.uri)
+        interceptors = self.get_interceptors(
+            request.uri,
+            getattr(handler, "uri_pattern", None))
+        if handler_cache is not None and handler.cacheable:
+            # 缓存的 handler 会被多个线程共享，所以必须是不可变的
+            handler = handler.freeze()
+            interceptors = tuple(interceptors)
+            handler_cache.set(key, (handler, interceptors))
         return self._chain_class(handler, interceptors)
 
     def get_adapter(self, handler):
@@ -173,6 +247,14 @@ class BaseDispatcher(_Factory):
                     "uri must start with context path %s" % context_path)
             request.uri = request.uri[len(context_path):] or "/"
 
+    def check_body_size(self, request):
+        # 在调用 handler 之前，根据 Content-Length 拒绝过大的请求体
+        max_body_size = self.configurer.max_body_size
+        if max_body_size is not None and \
+                int(request.content_length or 0) > max_body_size:
+            raise RequestEntityTooLargeError(
+                "request body is larger than %d bytes" % max_body_size)
+
     def process_internal_redirect(self, request, response):
         if response.internal_redirect_to is not None:
             request.uri = response.internal_redirect_to
@@ -181,7 +263,28 @@ class BaseDispatcher(_Factory):
         return False
 
     def process_exception(self, exception, response, mv):
-        if isinstance(
+        if isinstance(exception, MethodNotAllowedError):
+            response.set_status(HTTPStatus.MethodNotAllowed)
+            response.add_header(
+                "Allow",
+                ", ".join(sorted(exception.allowed_methods)))
+            mv.model.add_attribute("info", "method not allowed")
+        elif isinstance(exception, ArgumentConversionError):
+            response.set_status(HTTPStatus.BadRequest)
+            mv.model.add_attribute("info", "invalid argument")
+            mv.model.add_attribute("argument", exception.argument)
+            mv.model.add_attribute("value", exception.value)
+            mv.model.add_attribute("reason", exception.reason)
+        elif isinstance(exception, RequestEntityTooLargeError):
+            response.set_status(HTTPStatus.RequestEntityTooLarge)
+            mv.model.add_attribute("info", "request entity too large")
+        elif isinstance(exception, InvalidRequestBodyError):
+            response.set_status(HTTPStatus.BadRequest)
+            mv.model.add_attribute("info", "invalid request body")
+        elif isinstance(exception, FormLimitExceededError):
+            response.set_status(HTTPStatus.BadRequest)
+            mv.model.add_attribute("info", "form limit exceeded")
+        elif isinstance(
                 exception,
                 (NoHandlerFoundError, NoAdapterFoundError)):
             response.set_status(HTTPStatus.NotFound)
@@ -202,20 +305,181 @@ class BaseDispatcher(_Factory):
             response.add_header("Content-Type", content_type)
         return body
 
+    def compress_response(self, request, response, body):
+        compressor = self.configurer.response_compressor
+        if compressor is None or request is None:
+            return body
+        return compressor.compress_response(request, response, body)
+
+    def get_etag_mode(self, chain):
+        mode = None
+        if chain is not None and chain.handler is not None:
+            mapping = get_request_mapping(chain.handler.page_handler)
+            if mapping is not None:
+                mode = mapping.get("etag")
+        if mode is None:
+            mode = self.configurer.etag
+        return mode
+
+    @staticmethod
+    def _is_cacheable(request, response):
+        return request is not None and \
+            response.status_code == HTTPStatus.OK and \
+            request.request_method in ("GET", "HEAD")
+
+    def add_etag(self, request, response, body, mode):
+        if not mode or response.get_header("ETag") is not None or \
+                not self._is_cacheable(request, response):
+            return False
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if mode == "weak":
+            etag = "W/" + etag
+        response.add_header("ETag", etag)
+        return True
+
+    def is_not_modified(self, request, response):
+        etag = response.get_header("ETag")
+        if etag is None or not self._is_cacheable(request, response):
+            return False
+        if_none_match = request.get_header_or_default("If-None-Match")
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match 使用弱比较，忽略 W/ 前缀
+        opaque_tag = etag[2:] if etag.startswith("W/") else etag
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == opaque_tag:
+                return True
+        return False
+
+    @staticmethod
+    def not_modified(response):
+        response.set_status(HTTPStatus.NotModified)
+        response.remove_headers("Content-Length", "Content-Encoding")
+        return ""
+
+    @staticmethod
+    def _get_vary_value(request, name):
+        if name.startswith("arg_"):
+            return tuple(request.query_string.get(name[4:], ()))
+        if name.startswith("header_"):
+            return request.get_header_or_default(name[7:], None)
+        return request.get_cookie_or_default(name[7:], None)
+
+    def get_cache_policy(self, request, chain):
+        """返回 (缓存键, ttl)；handler 没有被 @cacheable 装饰时返回 None"""
+        if request.request_method != RequestMethod.GET or \
+                chain is None or chain.handler is None:
+            return None
+        cacheable = get_cacheable(chain.handler.page_handler)
+        if cacheable is None:
+            return None
+        key = (request.uri, ) + tuple(
+            self._get_vary_value(request, name)
+            for name in cacheable["vary"])
+        return key, cacheable["ttl"]
+
+    def get_cached_response(self, cache_policy):
+        if cache_policy is None:
+            return None
+        return self.response_cache.get(cache_policy[0])
+
+    @staticmethod
+    def restore_cached_response(cached_response, response):
+        """恢复响应的状态和响应头，并返回响应体"""
+        response.set_status(cached_response.status_code,
+                            cached_response.message)
+        for header_name, header_value in cached_response.headers:
+            response.add_header(header_name, header_value)
+        return cached_response.body
+
+    def cache_response(self, cache_policy, response, body):
+        if cache_policy is None or response.status_code != HTTPStatus.OK:
+            return
+        headers = response.get_headers()
+        # 设置了 cookie 的响应是针对某个用户的，不缓存
+        if any(name == "Set-Cookie" for name, _ in headers):
+            return
+        key, ttl = cache_policy
+        self.response_cache.set(
+            key,
+            CachedResponse(response.status_code,
+                           response.message,
+                           headers,
+                           body),
+            ttl)
+
+    def render_response(self, request, response, mv, chain=None,
+                        cache_policy=None):
+        """
+        渲染响应体并处理 ETag 、缓存和压缩，返回字符串或者可迭代对象；
+        + handler 设置的 ETag 匹配时不渲染响应体
+        """
+        if self.is_not_modified(request, response):
+            return self.not_modified(response)
+
+        if self.configurer.stream_response:
+            return self.compress_response(
+                request,
+                response,
+                self.rend_iter(mv, response))
+
+        body = self.rend(mv, response)
+        self.add_etag(request, response, body, self.get_etag_mode(chain))
+        self.cache_response(cache_policy, response, body)
+        return self.render_cached_response(request, response, body)
+
+    def render_cached_response(self, request, response, body):
+        if self.is_not_modified(request, response):
+            return self.not_modified(response)
+        return self.compress_response(request, response, body)
+
+    def rend_iter(self, mv, response):
+        view_object = self.view_resolver.get_view(
+            mv.view,
+            response.status_code)
+        content_type = view_object.get_content_type()
+        response.remove_header("Content-Length")
+        if content_type is not None:
+            response.add_header("Content-Type", content_type)
+        return view_object.render_iter(mv.model)
+
 
 class DispatcherApplication(BaseDispatcher):
     def __call__(self, environment, start_response):
-        request = Request.from_wsgi_environment(
-            environment,
-            self.application_context)
         response = Response()
         mv = ModelAndView()
+        request = None
+        chain = None
+        cache_policy = None
+        cached_body = None
 
         try:
+            # 解析查询字符串时可能会因为超出限制而抛出异常
+            request = self.configurer.request_class.from_wsgi_environment(
+                environment,
+                self.application_context,
+                self.configurer.max_body_size)
             self.remove_context_path(request)
+            self.check_body_size(request)
 
             for _ in range(self.configurer.max_redirect_count):
                 chain = self.get_execution_chain(request)
+                cache_policy = self.get_cache_policy(request, chain)
+                cached_response = self.get_cached_response(cache_policy)
+                if cached_response is not None:
+                    # 命中缓存时仍然执行拦截器的 pre handle 链（比如认证），
+                    # + 通过之后不再执行 handler 和 post handle 链
+                    if chain.pre_handle(request, response, mv):
+                        cached_body = self.restore_cached_response(
+                            cached_response, response)
+                    else:
+                        cache_policy = None
+                    break
                 result = self.handle_request(chain, request, response)
 
                 if self.process_internal_redirect(request, response):
@@ -233,6 +497,7 @@ class DispatcherApplication(BaseDispatcher):
                 # 判断是否是 Transfer-Encoding: chunked 响应
                 if isinstance(result, types.GeneratorType):
                     response.remove_headers("Content-Length")
+                    result = self.compress_response(request, response, result)
                     # WSGI Server会自动加上 Transfer-Encoding: chunked 头
                     start_response(response.get_headline(), response.get_headers())
                     request.close()
@@ -244,13 +509,27 @@ class DispatcherApplication(BaseDispatcher):
             else:
                 raise MaxRedirectCountReached("max redirect count reached")
         except BaseException as exception:
+            cache_policy = None
             self.process_exception(exception, response, mv)
 
-        body = self.rend(mv, response)
+        # 流式响应没有 Content-Length，WSGI Server会自动加上
+        # + Transfer-Encoding: chunked 头
+        if cached_body is not None:
+            body = self.render_cached_response(request, response, cached_body)
+        else:
+            body = self.render_response(
+                request,
+                response,
+                mv,
+                chain,
+                cache_policy)
+        if isinstance(body, str):
+            body = [body]
         start_response(response.get_headline(), response.get_headers())
-        request.close()
+        if request is not None:
+            request.close()
         response.close()
-        return [body]
+        return body
 
 
 if is_tornado_installed:
@@ -289,17 +568,42 @@ if is_tornado_installed:
         def prepare(self):
             self._prepare()
 
-            request = Request.from_tornado_request(
+            request_class = self._dispatcher.configurer.request_class
+            request = request_class.from_tornado_request(
                 self.request,
                 self.settings['application_context'])
             response = Response()
             mv = ModelAndView()
+            chain = None
+            cache_policy = None
+            cached_body = None
 
             try:
                 self._dispatcher.remove_context_path(request)
+                self._dispatcher.check_body_size(request)
 
                 for _ in range(self._dispatcher.configurer.max_redirect_count):
                     chain = self._dispatcher.get_execution_chain(request)
+                    cache_policy = self._dispatcher.get_cache_policy(
+                        request,
+                        chain)
+                    cached_response = self._dispatcher.get_cached_response(
+                        cache_policy)
+                    if cached_response is not None:
+                        # 命中缓存时仍然执行拦截器的 pre handle 链
+                        return_value = chain.pre_handle(request, response, mv)
+                        if gen.is_future(return_value):
+                            passed = yield return_value
+                        else:
+                            passed = return_value
+                        if passed:
+                            cached_body = \
+                                self._dispatcher.restore_cached_response(
+                                    cached_response,
+                                    response)
+                        else:
+                            cache_policy = None
+                        break
                     return_value = self._dispatcher.handle_request(
                         chain,
                         request,
@@ -334,14 +638,32 @@ if is_tornado_installed:
                 else:
                     raise MaxRedirectCountReached("max redirect count reached")
             except BaseException as exception:
+                cache_policy = None
                 self._dispatcher.process_exception(exception, response, mv)
 
-            body = self._dispatcher.rend(mv, response)
+            if cached_body is not None:
+                body = self._dispatcher.render_cached_response(
+                    request,
+                    response,
+                    cached_body)
+            else:
+                body = self._dispatcher.render_response(
+                    request,
+                    response,
+                    mv,
+                    chain,
+                    cache_policy)
             self.set_status(response.status_code,
                             response.message)
             for one_header in response.get_headers():
                 self.set_header(*one_header)
             request.close()
             response.close()
-            self.finish(body)
+            if isinstance(body, str):
+                self.finish(body)
+                return
+            for chunk in body:
+                self.write(chunk)
+                yield self.flush()
+            self.finish()
 
@@ -6,6 +6,8 @@ __authors__ = ["Tim Chow"]
 
 from abc import ABCMeta, abstractproperty
 
+from .http_utility import Request
+
 
 class DispatcherConfigurer(object):
     __metaclass__ = ABCMeta
@@ -18,6 +20,59 @@ class DispatcherConfigurer(object):
     def context_path(self):
         pass
 
+    @property
+    def handler_cache_size(self):
+        """缓存 handler 解析结果的 LRU 的大小，为 0 时不缓存"""
+        return 0
+
+    @property
+    def max_body_size(self):
+        """请求体的最大长度（字节），为 None 时不限制"""
+        return None
+
+    @property
+    def stream_response(self):
+        """
+        为 True 时通过 View.render_iter 逐块生成响应体，不设置 Content-Length，
+        + 内存占用不再随着响应体的大小增长
+        """
+        return False
+
+    @property
+    def response_compressor(self):
+        """压缩响应体的 ResponseCompressor，为 None 时不压缩"""
+        return None
+
+    @property
+    def etag(self):
+        """
+        全局的 ETag 配置，可以被 request_mapping 的 etag 参数覆盖：
+        + None/False 表示不生成，True/"strong"/"weak" 表示根据响应体生成
+        """
+        return None
+
+    @property
+    def response_cache(self):
+        """
+        @cacheable 使用的 ResponseCache，为 None 时使用进程内的 LRUResponseCache
+        """
+        return None
+
+    @property
+    def json_encoder(self):
+        """
+        默认的 JsonViewResolver 使用的 JsonEncoder 对象或者后端的名称（比如 "ujson"），
+        + 为 None 时使用标准库 json
+        """
+        return None
+
+    @property
+    def request_class(self):
+        """
+        用来构建请求对象的类，LazyRequest 在第一次访问时才解析请求的各个部分
+        """
+        return Request
+
 
 class DefaultDispatcherConfigurer(DispatcherConfigurer):
     @property
@@ -18,6 +18,29 @@ class InvalidArgumentError(MVCError):
     pass
 
 
+# 参数的值无法转换成声明的类型
+class ArgumentConversionError(MVCError):
+    def __init__(self, argument, value, reason=None):
+        MVCError.__init__(
+            self,
+            "can not convert argument %s: %s" % (argument, reason))
+        self._argument = argument
+        self._value = value
+        self._reason = reason
+
+    @property
+    def argument(self):
+        return self._argument
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def reason(self):
+        return self._reason
+
+
 # handler 返回了不被支持的值
 class InvalidReturnValueError(MVCError):
     pass
@@ -38,6 +61,17 @@ class NoHandlerFoundError(MVCError):
     pass
 
 
+# uri 存在，但是不支持该请求方法
+class MethodNotAllowedError(NoHandlerFoundError):
+    def __init__(self, allowed_methods, *a):
+        NoHandlerFoundError.__init__(self, *a)
+        self._allowed_methods = frozenset(allowed_methods)
+
+    @property
+    def allowed_methods(self):
+        return self._allowed_methods
+
+
 # 找不到适配器
 class NoAdapterFoundError(MVCError):
     pass
@@ -51,3 +85,18 @@ class UnsupportedRequestMethodError(MVCError):
 # 达到了最大的内部重定向次数
 class MaxRedirectCountReached(MVCError):
     pass
+
+
+# 请求体超过了允许的最大长度
+class RequestEntityTooLargeError(MVCError):
+    pass
+
+
+# 请求体的格式不正确，比如 chunked 编码错误
+class InvalidRequestBodyError(MVCError):
+    pass
+
+
+# 表单或查询字符串的字段数量、字段名长度超出了限制
+class FormLimitExceededError(MVCError):
+    pass
@@ -7,11 +7,22 @@ Handler 对象包含 page handler 和若干个 exception handler
 from ..utility import is_tornado_installed
 
 
+class _FrozenDict(dict):
+    def _immutable(self, *a, **kw):
+        raise TypeError("frozen dict is immutable")
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+
 class Handler(object):
     def __init__(self):
         self._page_handler = None
         self._matches = None
+        self._uri_pattern = None
         self._exception_handlers = {}
+        self._frozen = False
+        self._cacheable = True
 
     def __nonzero__(self):
         return self.page_handler is not None
@@ -21,13 +32,46 @@ class Handler(object):
             raise RuntimeError("no page handler specified")
         return self.page_handler(*a, **kw)
 
-    def add_page_handler(self, page_handler, matches=None):
+    def add_page_handler(self, page_handler, matches=None, uri_pattern=None):
+        if self._frozen:
+            raise RuntimeError("handler is frozen")
         self._page_handler = page_handler
         self._matches = matches
+        self._uri_pattern = uri_pattern
 
     def add_exception_handler(self, exception, exception_handler, matches=None):
+        if self._frozen:
+            raise RuntimeError("handler is frozen")
         self._exception_handlers[exception] = exception_handler, matches
 
+    def freeze(self):
+        """冻结之后，handler 不可再修改，从而可以在多个线程之间共享"""
+        if self._frozen:
+            return self
+        if self._matches is not None:
+            self._matches = _FrozenDict(self._matches)
+        self._exception_handlers = _FrozenDict(
+            (exception, (exception_handler,
+                         matches if matches is None else _FrozenDict(matches)))
+            for exception, (exception_handler, matches)
+            in self._exception_handlers.iteritems())
+        self._frozen = True
+        return self
+
+    @property
+    def frozen(self):
+        return self._frozen
+
+    def set_cacheable(self, cacheable):
+        if self._frozen:
+            raise RuntimeError("handler is frozen")
+        self._cacheable = cacheable
+
+    # 绑定了原型 bean 实例的 handler 不能被多个请求共享
+    @property
+    def cacheable(self):
+        return self._cacheable
+
     @property
     def page_handler(self):
         return self._page_handler
@@ -36,6 +80,11 @@ class Handler(object):
     def matches(self):
         return self._matches
 
+    # 匹配到 page handler 的 uri pattern，用来在启动时确定拦截器链
+    @property
+    def uri_pattern(self):
+        return self._uri_pattern
+
     @property
     def exception_handlers(self):
         return self._exception_handlers
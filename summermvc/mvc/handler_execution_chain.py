@@ -12,13 +12,18 @@ class HandlerExecutionChain(object):
         self._handler = handler
         self._interceptors = interceptors
 
-    def handle(self, request, response, mv, *args, **kwargs):
-        # 执行拦截器的 pre handle 链
+    def pre_handle(self, request, response, mv):
+        """执行拦截器的 pre handle 链，被拦截时返回 False"""
         for interceptor in self.interceptors:
             try:
                 interceptor.pre_handle(request, response, mv)
             except InterceptError:
-                return
+                return False
+        return True
+
+    def handle(self, request, response, mv, *args, **kwargs):
+        if not self.pre_handle(request, response, mv):
+            return
 
         # 执行 handler
         result = self.handler.invoke(*args, **kwargs)
@@ -47,8 +52,7 @@ if is_tornado_installed:
 
     class TornadoHandlerExecutionChain(HandlerExecutionChain): 
         @gen.coroutine
-        def handle(self, request, response, mv, *args, **kwargs):
-            # 执行拦截器的 pre handle 链
+        def pre_handle(self, request, response, mv):
             for interceptor in self.interceptors:
                 try:
                     return_value = interceptor.pre_handle(
@@ -58,7 +62,14 @@ if is_tornado_installed:
                     if gen.is_future(return_value):
                         yield return_value
                 except InterceptError:
-                    raise gen.Return()
+                    raise gen.Return(False)
+            raise gen.Return(True)
+
+        @gen.coroutine
+        def handle(self, request, response, mv, *args, **kwargs):
+            passed = yield self.pre_handle(request, response, mv)
+            if not passed:
+                raise gen.Return()
 
             # 执行 handler
             return_value = self.handler.invoke(*args, **kwargs)
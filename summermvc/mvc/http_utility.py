@@ -1,15 +1,20 @@
 # coding: utf8
 
-__all__ = ["Request", "Response"]
+__all__ = ["Request", "LazyRequest", "RequestBodyReader", "Response"]
 __authors__ = ["Tim Chow"]
 
 from urllib import unquote, quote
 from collections import namedtuple
+from StringIO import StringIO
+from tempfile import SpooledTemporaryFile
 import re
 from datetime import datetime
 
-from .exception import MissingArgumentError, InvalidRedirectURLError
+from .exception import MissingArgumentError, InvalidRedirectURLError, \
+    RequestEntityTooLargeError, InvalidRequestBodyError
 from .constant import HTTPStatus
+from .urlencoded_entity import parse_urlencoded, URLEncodedEntityParser
+from .multipart_entity import MultipartParser
 from ..utility import is_tornado_installed
 
 protocol = namedtuple("protocol", ["scheme", "version"])
@@ -18,6 +23,108 @@ def format_header_name(header_name):
     return "-".join([w.capitalize() for w in re.split(r"[\-_]", header_name)])
 
 
+class RequestBodyReader(object):
+    """
+    按需从 wsgi.input 中读取请求体，支持 Content-Length 和 chunked 两种方式，
+    + 读取的总长度超过 max_body_size 时抛出 RequestEntityTooLargeError
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream, content_length=None, chunked=False,
+                 max_body_size=None):
+        self._stream = stream
+        # content_length 为 None 时读到流结束为止
+        self._content_length = content_length
+        self._chunked = chunked
+        self._max_body_size = max_body_size
+        self._bytes_read = 0
+        self._chunk_remaining = 0
+        self._eof = False
+
+    @property
+    def bytes_read(self):
+        return self._bytes_read
+
+    @property
+    def eof(self):
+        return self._eof
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            chunks = []
+            while True:
+                chunk = self.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            return "".join(chunks)
+
+        if size == 0 or self._eof:
+            return ""
+        if self._max_body_size is not None and \
+                (self._content_length or 0) > self._max_body_size:
+            raise RequestEntityTooLargeError(
+                "request body is larger than %d bytes" % self._max_body_size)
+
+        if self._chunked:
+            data = self._read_chunked(size)
+        else:
+            data = self._read_plain(size)
+        if not data:
+            self._eof = True
+            return ""
+
+        self._bytes_read = self._bytes_read + len(data)
+        if self._max_body_size is not None and \
+                self._bytes_read > self._max_body_size:
+            raise RequestEntityTooLargeError(
+                "request body is larger than %d bytes" % self._max_body_size)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+    def _read_plain(self, size):
+        if self._content_length is not None:
+            size = min(size, self._content_length - self._bytes_read)
+            if size <= 0:
+                return ""
+        return self._stream.read(size)
+
+    def _read_chunked(self, size):
+        if self._chunk_remaining == 0:
+            line = self._stream.readline()
+            try:
+                chunk_size = int(line.split(";", 1)[0].strip(), 16)
+            except ValueError:
+                raise InvalidRequestBodyError("invalid chunk size")
+            if chunk_size < 0:
+                raise InvalidRequestBodyError("invalid chunk size")
+            if chunk_size == 0:
+                # 跳过 trailer
+                while self._stream.readline().strip():
+                    pass
+                return ""
+            self._chunk_remaining = chunk_size
+
+        data = self._stream.read(min(size, self._chunk_remaining))
+        if not data:
+            raise InvalidRequestBodyError("incomplete chunked body")
+        self._chunk_remaining = self._chunk_remaining - len(data)
+        if self._chunk_remaining == 0:
+            self._stream.readline()
+        return data
+
+
 class Attribute(object):
     def __init__(self):
         self._meta = {}
@@ -48,11 +155,16 @@ class Request(Attribute):
         self._application_context = None
         self._content_length = 0
         self._body = None
+        self._body_reader = None
+        # 解析 multipart 表单时保存的请求体副本
+        self._body_copy = None
         self._content_type = None
         self._content_type_attributes = {}
         self._uri = None
         self._request_method = "GET"
         self._query_string = {}
+        self._form = None
+        self._multipart_parser = None
         self._user_agent = ""
         self._headers = {}
         self._cookies = {}
@@ -113,7 +225,8 @@ class Request(Attribute):
     def from_wsgi_environment(
             cls,
             environment,
-            application_context):
+            application_context,
+            max_body_size=None):
         request = cls()
 
         request.application_context = application_context
@@ -121,12 +234,10 @@ class Request(Attribute):
         request.content_length = \
             int(environment.get("CONTENT_LENGTH") or 0)
 
-        # TODO: 暂不支持 chunked 请求体
-        # 读取请求体
-        request.body = None
-        if request.content_length:
-            request.body = environment["wsgi.input"] \
-                .read(request.content_length)
+        # 请求体在第一次访问时才读取
+        request._body_reader = cls.create_body_reader(
+            environment,
+            max_body_size)
 
         content_type_string = environment.get("CONTENT_TYPE")
         request.content_type, \
@@ -159,6 +270,26 @@ class Request(Attribute):
 
         return request
 
+    @staticmethod
+    def create_body_reader(environment, max_body_size=None):
+        stream = environment.get("wsgi.input")
+        if stream is None:
+            return None
+        transfer_encoding = environment.get("HTTP_TRANSFER_ENCODING", "")
+        if "chunked" in transfer_encoding.lower():
+            # 服务器已经解码了 chunked 请求体时，读到流结束为止
+            if environment.get("wsgi.input_terminated"):
+                return RequestBodyReader(stream, None, False, max_body_size)
+            return RequestBodyReader(stream, None, True, max_body_size)
+        content_length = int(environment.get("CONTENT_LENGTH") or 0)
+        if not content_length:
+            return None
+        return RequestBodyReader(
+            stream,
+            content_length,
+            False,
+            max_body_size)
+
     @staticmethod
     def parse_type_and_attributes(content_type_string):
         content_type = None
@@ -192,11 +323,46 @@ class Request(Attribute):
 
     @property
     def body(self):
+        if self._body is None and self._body_reader is not None:
+            if self._body_copy is not None:
+                # 请求体已经被 form 读取，使用读取时保存的副本
+                self._body_copy.seek(0)
+                self._body = self._body_copy.read()
+            elif self._body_reader.bytes_read:
+                raise RuntimeError("request body has been consumed")
+            else:
+                self._body = self._body_reader.read()
         return self._body
 
     @body.setter
     def body(self, body):
         self._body = body
+        self._body_reader = None
+
+    def _get_body_reader(self):
+        if self._body_reader is None and self._body is not None:
+            self._body_reader = RequestBodyReader(
+                StringIO(self._body),
+                len(self._body))
+        return self._body_reader
+
+    def iter_body(self, chunk_size=RequestBodyReader.CHUNK_SIZE):
+        """逐块读取请求体，不会把整个请求体读入内存"""
+        body_reader = self._get_body_reader()
+        if body_reader is None:
+            return
+        while True:
+            chunk = body_reader.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def readinto(self, buffer):
+        """把请求体读入可重复使用的 buffer（比如 bytearray），返回读取的字节数"""
+        body_reader = self._get_body_reader()
+        if body_reader is None:
+            return 0
+        return body_reader.readinto(buffer)
 
     @property
     def content_type(self):
@@ -290,26 +456,63 @@ class Request(Attribute):
 
     @staticmethod
     def parse_query_string(query_string):
-        d = {}
-        for item in query_string.split("&"):
-            pair = item.split("=", 1)
-            if len(pair) == 2:
-                d.setdefault(unquote(pair[0]), []) \
-                    .append(unquote(pair[1]))
-        return d
+        return parse_urlencoded(query_string)
+
+    @property
+    def form(self):
+        """请求体中的表单字段，第一次访问时解析，之后直接使用缓存的结果"""
+        if self._form is None:
+            self._form = self.parse_form()
+        return self._form
+
+    @property
+    def files(self):
+        """multipart 请求体中上传的文件"""
+        self.form
+        if self._multipart_parser is not None:
+            return dict((name, part)
+                        for name, part in self._multipart_parser
+                        .files.iteritems()
+                        if part.filename is not None)
+        return {}
+
+    def parse_form(self):
+        content_type = self.content_type
+        if content_type == "application/x-www-form-urlencoded":
+            return URLEncodedEntityParser(self.body or "", lazy=True) \
+                .arguments
+        if content_type == "multipart/form-data" and \
+                "boundary" in self.content_type_attributes:
+            # handler 可能同时需要原始的请求体，所以读取时保存一份副本，
+            # + 超过 SPOOL_SIZE 的部分写入临时文件
+            if not isinstance(self._body, str):
+                self._body_copy = SpooledTemporaryFile(
+                    max_size=MultipartParser.SPOOL_SIZE)
+            self._multipart_parser = MultipartParser.from_request(
+                self, copy_to=self._body_copy)
+            return dict((name, [part.content])
+                        for name, part in self._multipart_parser
+                        .files.iteritems()
+                        if part.filename is None)
+        return {}
 
     def get_argument(self, argument):
-        if argument not in self._query_string:
+        # 先查找查询字符串，再查找请求体中的表单
+        values = self.query_string.get(argument) or \
+            self.form.get(argument)
+        if not values:
             raise MissingArgumentError("no argument named %s" % argument)
-        return self._query_string[argument][0]
+        return values[0]
 
     def get_arguments(self, argument):
-        if argument not in self._query_string:
+        values = self.query_string.get(argument, []) + \
+            self.form.get(argument, [])
+        if not values:
             raise MissingArgumentError("no argument named %s" % argument)
-        return self._query_string[argument]
+        return values
 
     def add_argument(self, arg_name, arg_value):
-        self._query_string.setdefault(
+        self.query_string.setdefault(
             quote(arg_name), []).append(quote(arg_value))
 
     @staticmethod
@@ -349,9 +552,216 @@ class Request(Attribute):
 
     def close(self):
         del self._application_context
+        if self._multipart_parser is not None:
+            self._multipart_parser.close()
+        if self._body_copy is not None:
+            self._body_copy.close()
         Attribute.close(self)
 
 
+# 表示 LazyRequest 的字段还没有从 WSGI environ 中解析
+_UNSET = object()
+
+
+class LazyRequest(Request):
+    """
+    保存 WSGI environ，请求体、查询字符串、请求头和 cookie 等字段在第一次访问时
+    + 才解析；按名称查找请求头时直接读取 environ 中的 HTTP_XXX，不需要格式化
+    + 所有请求头的名称
+    """
+    def __init__(self):
+        Request.__init__(self)
+        self._environment = {}
+        self._max_body_size = None
+        self._content_length = _UNSET
+        self._body = _UNSET
+        self._content_type = _UNSET
+        self._content_type_attributes = _UNSET
+        self._query_string = _UNSET
+        self._user_agent = _UNSET
+        self._headers = _UNSET
+        self._cookies = _UNSET
+        self._remote_addr = _UNSET
+        self._server_port = _UNSET
+        self._protocol = _UNSET
+
+    @classmethod
+    def from_wsgi_environment(
+            cls,
+            environment,
+            application_context,
+            max_body_size=None):
+        request = cls()
+        request._environment = environment
+        request._max_body_size = max_body_size
+        request.application_context = application_context
+        # 路由需要用到 uri 和请求方法，所以直接读取
+        request.uri = environment["PATH_INFO"]
+        request.request_method = environment["REQUEST_METHOD"]
+        return request
+
+    def _parse_content_type(self):
+        self._content_type, self._content_type_attributes = \
+            self.parse_type_and_attributes(
+                self._environment.get("CONTENT_TYPE"))
+
+    @property
+    def content_length(self):
+        if self._content_length is _UNSET:
+            self._content_length = \
+                int(self._environment.get("CONTENT_LENGTH") or 0)
+        return self._content_length
+
+    @content_length.setter
+    def content_length(self, content_length):
+        self._content_length = content_length
+
+    def _load_body_reader(self):
+        if self._body is _UNSET:
+            self._body = None
+            self._body_reader = self.create_body_reader(
+                self._environment,
+                self._max_body_size)
+
+    @property
+    def body(self):
+        self._load_body_reader()
+        return Request.body.fget(self)
+
+    @body.setter
+    def body(self, body):
+        Request.body.fset(self, body)
+
+    def _get_body_reader(self):
+        self._load_body_reader()
+        return Request._get_body_reader(self)
+
+    @property
+    def content_type(self):
+        if self._content_type is _UNSET:
+            self._parse_content_type()
+        return self._content_type
+
+    @content_type.setter
+    def content_type(self, content_type):
+        self._content_type = content_type
+
+    @property
+    def content_type_attributes(self):
+        if self._content_type_attributes is _UNSET:
+            self._parse_content_type()
+        return self._content_type_attributes
+
+    @content_type_attributes.setter
+    def content_type_attributes(self, content_type_attributes):
+        self._content_type_attributes = content_type_attributes
+
+    @property
+    def query_string(self):
+        if self._query_string is _UNSET:
+            self._query_string = self.parse_query_string(
+                self._environment.get("QUERY_STRING", ""))
+        return self._query_string
+
+    @query_string.setter
+    def query_string(self, query_string):
+        self._query_string = query_string
+
+    @property
+    def user_agent(self):
+        if self._user_agent is _UNSET:
+            self._user_agent = self._environment.get("HTTP_USER_AGENT")
+        return self._user_agent
+
+    @user_agent.setter
+    def user_agent(self, user_agent):
+        self._user_agent = user_agent
+
+    @property
+    def headers(self):
+        if self._headers is _UNSET:
+            self._headers = self.parse_headers(self._environment)
+            self._headers.pop("Cookie", None)
+        return self._headers
+
+    @headers.setter
+    def headers(self, headers):
+        self._headers = headers
+
+    @property
+    def cookies(self):
+        if self._cookies is _UNSET:
+            self._cookies = self.parse_cookies(
+                self._environment.get("HTTP_COOKIE", ""))
+        return self._cookies
+
+    @cookies.setter
+    def cookies(self, cookies):
+        self._cookies = cookies
+
+    @property
+    def remote_addr(self):
+        if self._remote_addr is _UNSET:
+            self._remote_addr = self._environment.get(
+                "REMOTE_ADDR",
+                "127.0.0.1")
+        return self._remote_addr
+
+    @remote_addr.setter
+    def remote_addr(self, remote_addr):
+        self._remote_addr = remote_addr
+
+    @property
+    def server_port(self):
+        if self._server_port is _UNSET:
+            self._server_port = self._environment.get("SERVER_PORT", 80)
+        return self._server_port
+
+    @server_port.setter
+    def server_port(self, server_port):
+        self._server_port = server_port
+
+    @property
+    def protocol(self):
+        if self._protocol is _UNSET:
+            self._protocol = protocol(
+                *self._environment.get("SERVER_PROTOCOL",
+                                       "HTTP/1.0").upper().split("/", 1))
+        return self._protocol
+
+    @protocol.setter
+    def protocol(self, protocol):
+        self._protocol = protocol
+
+    @staticmethod
+    def _environment_key(header_name):
+        return "HTTP_" + header_name.upper().replace("-", "_")
+
+    def get_header(self, header_name):
+        if self._headers is not _UNSET:
+            return Request.get_header(self, header_name)
+        key = self._environment_key(header_name)
+        # 与 Request 一致，Cookie 不作为请求头
+        if key == "HTTP_COOKIE":
+            raise KeyError(format_header_name(header_name))
+        try:
+            return self._environment[key]
+        except KeyError:
+            raise KeyError(format_header_name(header_name))
+
+    def get_header_or_default(self, header_name, default=None):
+        if self._headers is not _UNSET:
+            return Request.get_header_or_default(self, header_name, default)
+        key = self._environment_key(header_name)
+        if key == "HTTP_COOKIE":
+            return default
+        return self._environment.get(key, default)
+
+    def close(self):
+        self._environment = {}
+        Request.close(self)
+
+
 class Response(object):
     def __init__(self):
         self._initialize()
@@ -370,6 +780,13 @@ class Response(object):
     def add_header(self, header_name, header_value):
         self._headers[format_header_name(header_name)] = header_value
 
+    def set_etag(self, version, weak=False):
+        """由 handler 根据版本号等信息设置 ETag，匹配时不需要渲染响应体"""
+        etag = '"%s"' % version
+        if weak:
+            etag = "W/" + etag
+        self.add_header("ETag", etag)
+
     def redirect(self, url, permanently=True):
         if url.startswith("http://") or \
                 url.startswith("https://"):
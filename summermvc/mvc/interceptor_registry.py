@@ -0,0 +1,94 @@
+# coding: utf8
+
+__all__ = ["InterceptorRegistry"]
+__authors__ = ["Tim Chow"]
+
+import re
+import threading
+
+from ..utility import literal_prefix
+
+# 拦截器与路由之间的关系
+_NEVER, _ALWAYS, _DYNAMIC = range(3)
+
+
+class _CompiledInterceptor(object):
+    __slots__ = ["interceptor", "regex", "prefix"]
+
+    def __init__(self, interceptor):
+        self.interceptor = interceptor
+        path_pattern = interceptor.path_pattern()
+        self.regex = re.compile(path_pattern)
+        # re.match 不要求匹配到结尾，所以形如 "/admin" 或 "/admin/.*" 的
+        # + pattern 等价于前缀判断
+        self.prefix = None
+        candidate = path_pattern
+        if candidate.endswith(".*"):
+            candidate = candidate[:-2]
+        prefix, is_literal = literal_prefix(candidate)
+        if is_literal and not candidate.endswith("$"):
+            self.prefix = prefix
+
+    def relation(self, uri_pattern):
+        """在启动时判断拦截器是否作用于 uri pattern 对应的路由"""
+        route_prefix, is_literal = literal_prefix(uri_pattern)
+        if is_literal:
+            return self.regex.match(route_prefix) and _ALWAYS or _NEVER
+        if self.prefix is None:
+            return _DYNAMIC
+        if route_prefix.startswith(self.prefix):
+            return _ALWAYS
+        if not self.prefix.startswith(route_prefix):
+            return _NEVER
+        return _DYNAMIC
+
+
+class InterceptorRegistry(object):
+    """
+    拦截器只编译和排序一次；对于 handler mapping 给出了 uri pattern 的路由，
+    + 在启动时（或者第一次访问时）确定拦截器链，每次请求只需要查表
+    """
+    def __init__(self, interceptors):
+        # sorted 是稳定的，与每次请求时先过滤再排序的结果一致
+        self._interceptors = tuple(
+            _CompiledInterceptor(interceptor)
+            for interceptor in sorted(interceptors,
+                                      key=lambda i: i.get_order(),
+                                      reverse=True))
+        self._lock = threading.Lock()
+        # uri pattern -> 拦截器链或者 ((interceptor, regex or None), ...)
+        self._plans = {}
+
+    def plan(self, uri_pattern):
+        plan = self._plans.get(uri_pattern)
+        if plan is not None:
+            return plan
+
+        entries = []
+        is_static = True
+        for compiled in self._interceptors:
+            relation = compiled.relation(uri_pattern)
+            if relation == _ALWAYS:
+                entries.append((compiled.interceptor, None))
+            elif relation == _DYNAMIC:
+                entries.append((compiled.interceptor, compiled.regex))
+                is_static = False
+
+        if is_static:
+            plan = True, tuple(interceptor for interceptor, _ in entries)
+        else:
+            plan = False, tuple(entries)
+        with self._lock:
+            return self._plans.setdefault(uri_pattern, plan)
+
+    def get_interceptors(self, uri, uri_pattern=None):
+        if uri_pattern is None:
+            return tuple(compiled.interceptor
+                         for compiled in self._interceptors
+                         if compiled.regex.match(uri))
+
+        is_static, entries = self.plan(uri_pattern)
+        if is_static:
+            return entries
+        return tuple(interceptor for interceptor, regex in entries
+                     if regex is None or regex.match(uri))
@@ -6,7 +6,9 @@ __all__ = [
     "HandlerAdapter",
     "HandlerInterceptor",
     "ViewResolver",
-    "View"]
+    "View",
+    "JsonEncoder",
+    "ResponseCache"]
 __authors__ = ["Tim Chow"]
 
 from abc import ABCMeta, abstractmethod
@@ -71,6 +73,37 @@ class View(object):
     def render(self, model):
         pass
 
+    def render_iter(self, model):
+        """逐块生成响应体，默认一次生成整个响应体"""
+        yield self.render(model)
+
     @abstractmethod
     def get_content_type(self):
         pass
+
+
+class JsonEncoder(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def encode(self, obj):
+        pass
+
+    def iterencode(self, obj):
+        yield self.encode(obj)
+
+
+class ResponseCache(object):
+    __metaclass__ = ABCMeta
+
+    @abstractmethod
+    def get(self, key):
+        pass
+
+    @abstractmethod
+    def set(self, key, cached_response, ttl):
+        pass
+
+    @abstractmethod
+    def stats(self):
+        pass
@@ -0,0 +1,198 @@
+# coding: utf8
+
+__all__ = ["BaseJsonEncoder",
+           "StdlibJsonEncoder",
+           "SimpleJsonEncoder",
+           "UJsonEncoder",
+           "register_json_converter",
+           "get_json_encoder"]
+__authors__ = ["Tim Chow"]
+
+import json
+import datetime
+import threading
+
+from .interface import JsonEncoder
+from .model_and_view import Model
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+try:
+    import ujson
+    # 只有支持 default 参数的 ujson 才能序列化 Model 和日期
+    ujson.dumps(None, default=None)
+except (ImportError, TypeError):
+    ujson = None
+
+# 类型 -> 转换函数，按照类型精确匹配。isoformat 比 strftime 快得多，
+# + 结果与 "%Y-%m-%d"、"%H:%M:%S" 相同；datetime 是 date 的子类，
+# + 以前的 JsonView 只输出它的日期部分，这里保持一致
+_CONVERTERS = {
+    Model: Model.as_map,
+    datetime.datetime: datetime.date.isoformat,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: lambda obj: obj.isoformat()[:8],
+}
+_lock = threading.Lock()
+
+
+def register_json_converter(cls, converter):
+    with _lock:
+        _CONVERTERS[cls] = converter
+        # 子类的转换函数是根据 MRO 推断出来的，需要重新推断
+        for subclass in _inferred_types:
+            _CONVERTERS.pop(subclass, None)
+        _inferred_types.clear()
+
+
+# 根据 MRO 推断出转换函数的子类
+_inferred_types = set()
+
+
+def _resolve_converter(cls):
+    for base in cls.__mro__[1:]:
+        converter = _CONVERTERS.get(base)
+        if converter is not None:
+            with _lock:
+                _CONVERTERS[cls] = converter
+                _inferred_types.add(cls)
+            return converter
+    return None
+
+
+def default(obj):
+    converter = _CONVERTERS.get(type(obj)) or \
+        _resolve_converter(type(obj))
+    if converter is None:
+        raise TypeError("%r is not JSON serializable" % obj)
+    return converter(obj)
+
+
+class BaseJsonEncoder(JsonEncoder):
+    """
+    iterencode 逐层展开 Model、dict 和 list，列表中的元素整个编码，
+    + 然后把编码结果合并成不小于 chunk_size 的块，内存占用取决于最大的元素
+    """
+    CHUNK_SIZE = 64 * 1024
+    BATCH_SIZE = 128
+
+    def iterencode(self, obj, chunk_size=None):
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        buf = []
+        size = 0
+        for piece in self._iterencode(obj):
+            buf.append(piece)
+            size = size + len(piece)
+            if size >= chunk_size:
+                yield "".join(buf)
+                buf = []
+                size = 0
+        if buf:
+            yield "".join(buf)
+
+    def _iterencode(self, obj):
+        if isinstance(obj, Model):
+            obj = obj.as_map()
+        elif type(obj) not in _CONTAINER_TYPES:
+            yield self.encode(obj)
+            return
+
+        if isinstance(obj, dict):
+            yield "{"
+            first = True
+            for key, value in obj.iteritems():
+                if not first:
+                    yield ", "
+                first = False
+                yield self._encode_key(key) + ": "
+                for piece in self._iterencode(value):
+                    yield piece
+            yield "}"
+        else:
+            # 连续的元素成批编码，减少调用编码器的次数
+            yield "["
+            first = True
+            batch = []
+            for value in obj:
+                if type(value) not in _SEQUENCE_TYPES:
+                    batch.append(value)
+                    if len(batch) < self.BATCH_SIZE:
+                        continue
+                if batch:
+                    yield ("" if first else ", ") + self.encode(batch)[1:-1]
+                    first = False
+                    batch = []
+                if type(value) in _SEQUENCE_TYPES:
+                    if not first:
+                        yield ", "
+                    first = False
+                    for piece in self._iterencode(value):
+                        yield piece
+            if batch:
+                yield ("" if first else ", ") + self.encode(batch)[1:-1]
+            yield "]"
+
+    def _encode_key(self, key):
+        # 与 json.dumps 一致，非字符串的键转换成字符串
+        if isinstance(key, basestring):
+            return self.encode(key)
+        if key is True or key is False or key is None:
+            return '"%s"' % self.encode(key)
+        if isinstance(key, (int, long, float)):
+            return '"%s"' % self.encode(key)
+        raise TypeError("key %r is not a string" % (key, ))
+
+
+_SEQUENCE_TYPES = frozenset([list, tuple])
+_CONTAINER_TYPES = frozenset([dict, list, tuple])
+
+
+class StdlibJsonEncoder(BaseJsonEncoder):
+    name = "json"
+
+    def __init__(self):
+        # 复用同一个 JSONEncoder，json.dumps 每次传入 default 时都会新建一个
+        self._encoder = json.JSONEncoder(default=default)
+
+    def encode(self, obj):
+        return self._encoder.encode(obj)
+
+
+class SimpleJsonEncoder(BaseJsonEncoder):
+    name = "simplejson"
+
+    def __init__(self):
+        self._encoder = simplejson.JSONEncoder(default=default)
+
+    def encode(self, obj):
+        return self._encoder.encode(obj)
+
+
+class UJsonEncoder(BaseJsonEncoder):
+    name = "ujson"
+
+    def encode(self, obj):
+        return ujson.dumps(obj, default=default)
+
+
+_BACKENDS = [(UJsonEncoder, ujson is not None),
+             (SimpleJsonEncoder, simplejson is not None),
+             (StdlibJsonEncoder, True)]
+
+
+def get_json_encoder(name=None):
+    """
+    name 为 None 时使用标准库 json，输出与以前的 JsonView 完全相同；
+    + simplejson 和 ujson 的输出格式（分隔符、转义等）可能不同，只有显式指定时才使用
+    """
+    name = name or StdlibJsonEncoder.name
+    for encoder_class, is_available in _BACKENDS:
+        if encoder_class.name != name:
+            continue
+        if is_available:
+            return encoder_class()
+        raise ValueError("json backend %s is not installed" % name)
+    raise ValueError("unknown json backend %s" % name)
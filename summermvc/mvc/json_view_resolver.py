@@ -3,38 +3,38 @@
 __all__ = ["JsonViewResolver"]
 __authors__ = ["Tim Chow"]
 
-import json
-import datetime
-
-from .interface import ViewResolver, View
-from .model_and_view import Model
+from .interface import ViewResolver, View, JsonEncoder
+from .json_encoder import get_json_encoder
 
 
 class JsonView(View):
+    def __init__(self, encoder):
+        self._encoder = encoder
+
+    @property
+    def encoder(self):
+        return self._encoder
+
     def get_content_type(self):
         return "application/json; charset=UTF-8"
 
     def render(self, model):
-        return self.__dumps(model)
-
-    def __dumps(self, model):
-        return json.dumps(model, default=self.__default)
+        return self._encoder.encode(model)
 
-    def __default(self, obj):
-        if isinstance(obj, Model):
-            return obj.as_map()
-        if isinstance(obj, datetime.date):
-            return obj.strftime("%Y-%m-%d")
-        if isinstance(obj, datetime.time):
-            return obj.strftime("%H:%M:%S")
-        if isinstance(obj, datetime.datetime):
-            return obj.strftime("%Y-%m-%d %H:%M:%S")
-        raise TypeError("%r is not JSON serializable" % obj)
+    def render_iter(self, model):
+        return self._encoder.iterencode(model)
 
 
 class JsonViewResolver(ViewResolver):
-    def __init__(self):
-        self._json_view = JsonView()
+    def __init__(self, encoder=None):
+        """encoder 是 JsonEncoder 对象或者后端的名称，为 None 时使用标准库 json"""
+        if not isinstance(encoder, JsonEncoder):
+            encoder = get_json_encoder(encoder)
+        self._json_view = JsonView(encoder)
+
+    @property
+    def encoder(self):
+        return self._json_view.encoder
 
     def get_view(self, view_name, status_code):
         return self._json_view
@@ -1,45 +1,332 @@
 # coding: utf8
 
-__all__ = ["MultipartParser"]
+__all__ = ["MultipartParser", "MultipartPart", "MultipartBufferPart"]
 __authors__ = ["Tim Chow"]
 
+from tempfile import SpooledTemporaryFile
+from cStringIO import StringIO
+
+from .exception import InvalidRequestBodyError
+
+# 解析器的状态
+_PREAMBLE, _AFTER_BOUNDARY, _HEADERS, _BODY, _END = range(5)
+
+
+class _BasePart(object):
+    """为了兼容以前的用法，仍然可以通过 part["filename"]、part["content"] 访问"""
+    def __init__(self, headers):
+        self._headers = headers
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def name(self):
+        return self._headers.get("name")
+
+    @property
+    def filename(self):
+        return self._headers.get("filename")
+
+    @property
+    def content_type(self):
+        return self._headers.get("Content-Type")
+
+    def __getitem__(self, key):
+        if key == "content":
+            return self.content
+        return self._headers[key]
+
+    def __contains__(self, key):
+        return key == "content" or key in self._headers
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return "<%s name=%r filename=%r size=%d>" % (
+            self.__class__.__name__, self.name, self.filename, self.size)
+
+
+class MultipartPart(_BasePart):
+    """内容保存在 file 中，超过 spool_size 之后写入临时文件"""
+    def __init__(self, headers, spool_size):
+        _BasePart.__init__(self, headers)
+        self._file = SpooledTemporaryFile(max_size=spool_size)
+        self._size = 0
+
+    def write(self, data):
+        self._file.write(data)
+        self._size = self._size + len(data)
+
+    def finish(self):
+        self._file.seek(0)
+
+    @property
+    def file(self):
+        return self._file
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def content(self):
+        """把内容全部读入内存，只适合较小的字段"""
+        position = self._file.tell()
+        self._file.seek(0)
+        try:
+            return self._file.read()
+        finally:
+            self._file.seek(position)
+
+    def close(self):
+        self._file.close()
+
+
+class MultipartBufferPart(_BasePart):
+    """
+    内容是原始请求体的一个切片，view 是不复制数据的 memoryview，
+    + 可以直接传给 hashlib、socket.send 等接受 buffer 的函数
+    """
+    def __init__(self, headers, body, start, end):
+        _BasePart.__init__(self, headers)
+        self._body = body
+        self._start = start
+        self._end = end
+
+    @property
+    def view(self):
+        return memoryview(self._body)[self._start:self._end]
+
+    @property
+    def file(self):
+        # cStringIO 直接引用 buffer 中的数据，不会复制
+        return StringIO(buffer(self._body, self._start, self.size))
+
+    @property
+    def size(self):
+        return self._end - self._start
+
+    @property
+    def content(self):
+        return self._body[self._start:self._end]
+
+
+def _copy_chunks(chunks, copy_to):
+    for chunk in chunks:
+        copy_to.write(chunk)
+        yield chunk
+
 
 class MultipartParser(object):
-    def __init__(self, body, boundary):
-        self._files = self.parse(body, boundary)
+    """
+    增量地解析 multipart 请求体：按块读入数据，在缓冲区中查找边界，
+    + 内存中只保留不完整的边界以及 spool_size 以内的内容
+    """
+    CHUNK_SIZE = 64 * 1024
+    SPOOL_SIZE = 1024 * 1024
+    MAX_HEADER_SIZE = 64 * 1024
 
-    @staticmethod
-    def parse(body, boundary):
-        parts = {}
-        original_parts = body.split("--%s" % boundary)[1:-1]
-        for one_original_part in original_parts:
-            part = {}
-            phrases = one_original_part.split("\r\n")[1:-1]
-            line_no = 0
-            for line_no, line in enumerate(phrases, start=1):
-                if line == "":
+    def __init__(self, body, boundary, spool_size=None, chunk_size=None,
+                 zero_copy=False):
+        """
+        body 可以是字符串、有 read 方法的文件对象，或者字符串的迭代器
+        + （比如 Request.iter_body()）；zero_copy 为 True 时 body 必须是字符串，
+        + 每个部分都是 body 的切片，不会复制数据
+        """
+        self._spool_size = spool_size or self.SPOOL_SIZE
+        self._chunk_size = chunk_size or self.CHUNK_SIZE
+        self._files = {}
+        if zero_copy:
+            if not isinstance(body, str):
+                raise TypeError("zero copy mode requires a str body")
+            self.parse_in_memory(body, boundary)
+        else:
+            self.parse(self._iter_chunks(body), boundary)
+
+    @classmethod
+    def from_request(cls, request, spool_size=None, chunk_size=None,
+                     zero_copy=False, copy_to=None):
+        """copy_to 是一个文件对象，读取请求体的同时把数据写入其中"""
+        boundary = request.content_type_attributes["boundary"].strip("\"")
+        if zero_copy:
+            return cls(request.body or "", boundary, zero_copy=True)
+        chunks = request.iter_body(chunk_size or cls.CHUNK_SIZE)
+        if copy_to is not None:
+            chunks = _copy_chunks(chunks, copy_to)
+        return cls(
+            chunks,
+            boundary,
+            spool_size,
+            chunk_size)
+
+    def _iter_chunks(self, body):
+        if isinstance(body, basestring):
+            for offset in xrange(0, len(body), self._chunk_size):
+                yield body[offset:offset + self._chunk_size]
+        elif hasattr(body, "read"):
+            while True:
+                chunk = body.read(self._chunk_size)
+                if not chunk:
                     break
-                pair = line.split(":", 1)
-                if len(pair) != 2:
-                    continue
-                part[pair[0].strip()] = pair[1].strip()
+                yield chunk
+        else:
+            for chunk in body:
+                yield chunk
 
-            cd = part.pop("Content-Disposition", "")
-            for item in cd.split(";")[1:]:
-                pair = item.split("=", 1)
-                if len(pair) != 2:
+    @staticmethod
+    def parse_headers(header_block):
+        headers = {}
+        for line in header_block.split("\r\n"):
+            pair = line.split(":", 1)
+            if len(pair) != 2:
+                continue
+            headers[pair[0].strip()] = pair[1].strip()
+
+        cd = ""
+        for key in headers.keys():
+            if key.lower() == "content-disposition":
+                cd = headers.pop(key)
+        for item in cd.split(";")[1:]:
+            pair = item.split("=", 1)
+            if len(pair) != 2:
+                continue
+            headers[pair[0].strip()] = pair[1].strip(" \"")
+        return headers
+
+    def _add_part(self, part):
+        if part.name is None:
+            part.close()
+            return
+        previous = self._files.pop(part.name, None)
+        if previous is not None:
+            previous.close()
+        self._files[part.name] = part
+
+    def parse(self, chunks, boundary):
+        # 第一个边界前面没有 CRLF，补上之后所有的边界都是同样的形式
+        delimiter = "\r\n--%s" % boundary
+        keep = len(delimiter) - 1
+        buf = "\r\n"
+        state = _PREAMBLE
+        part = None
+        chunks = iter(chunks)
+        eof = False
+
+        while state != _END:
+            if state == _PREAMBLE:
+                index = buf.find(delimiter)
+                if index != -1:
+                    buf = buf[index + len(delimiter):]
+                    state = _AFTER_BOUNDARY
+                    continue
+                buf = buf[-keep:]
+            elif state == _AFTER_BOUNDARY:
+                if buf.startswith("--"):
+                    state = _END
+                    continue
+                index = buf.find("\r\n")
+                if index != -1:
+                    buf = buf[index + 2:]
+                    state = _HEADERS
+                    continue
+            elif state == _HEADERS:
+                if buf.startswith("\r\n"):
+                    header_block, buf = "", buf[2:]
+                else:
+                    index = buf.find("\r\n\r\n")
+                    if index == -1:
+                        if len(buf) > self.MAX_HEADER_SIZE:
+                            raise InvalidRequestBodyError(
+                                "multipart headers too large")
+                        header_block = None
+                    else:
+                        header_block, buf = buf[:index], buf[index + 4:]
+                if header_block is not None:
+                    part = MultipartPart(
+                        self.parse_headers(header_block),
+                        self._spool_size)
+                    state = _BODY
                     continue
-                part[pair[0].strip()] = pair[1].strip(" \"")
+            elif state == _BODY:
+                index = buf.find(delimiter)
+                if index != -1:
+                    part.write(buf[:index])
+                    part.finish()
+                    self._add_part(part)
+                    part = None
+                    buf = buf[index + len(delimiter):]
+                    state = _AFTER_BOUNDARY
+                    continue
+                if len(buf) > keep:
+                    part.write(buf[:-keep])
+                    buf = buf[-keep:]
+
+            # 缓冲区中的数据不足，继续读取
+            if eof:
+                if part is not None:
+                    part.close()
+                raise InvalidRequestBodyError("incomplete multipart body")
+            try:
+                buf = buf + next(chunks)
+            except StopIteration:
+                eof = True
+
+    def parse_in_memory(self, body, boundary):
+        delimiter = "\r\n--%s" % boundary
+        if body.startswith(delimiter[2:]):
+            position = len(delimiter) - 2
+        else:
+            position = body.find(delimiter)
+            if position == -1:
+                raise InvalidRequestBodyError("incomplete multipart body")
+            position = position + len(delimiter)
+
+        while not body.startswith("--", position):
+            index = body.find("\r\n", position)
+            if index == -1:
+                raise InvalidRequestBodyError("incomplete multipart body")
+            header_start = index + 2
+            if body.startswith("\r\n", header_start):
+                header_end = header_start
+                content_start = header_start + 2
+            else:
+                header_end = body.find("\r\n\r\n", header_start)
+                if header_end == -1:
+                    raise InvalidRequestBodyError("incomplete multipart body")
+                content_start = header_end + 4
+            content_end = body.find(delimiter, content_start)
+            if content_end == -1:
+                raise InvalidRequestBodyError("incomplete multipart body")
 
-            if "name" in part:
-                part["content"] = "\r\n".join(phrases[line_no:])
-                parts[part["name"]] = part
-        return parts
+            self._add_part(MultipartBufferPart(
+                self.parse_headers(body[header_start:header_end]),
+                body,
+                content_start,
+                content_end))
+            position = content_end + len(delimiter)
 
     @property
     def files(self):
         return self._files
 
+    def close(self):
+        for part in self._files.itervalues():
+            part.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 
 if __name__ == "__main__":
     boundary_string = "form_boundary"
@@ -0,0 +1,24 @@
+# coding: utf8
+
+__all__ = ["ProfilingController"]
+__authors__ = ["Tim Chow"]
+
+from ..decorator import rest_controller, request_mapping
+from ..profiling import get_default_profiler
+from .constant import RequestMethod
+
+
+@rest_controller
+class ProfilingController(object):
+    """
+    以 JSON 导出默认 Profiler 的统计信息，DELETE 请求清空统计信息；
+    + 和其它 controller 一样，需要被注册为 bean 才会生效
+    """
+    @request_mapping("/_profiling", method=RequestMethod.GET)
+    def snapshot(self, model):
+        model.add_attribute("methods", get_default_profiler().snapshot())
+
+    @request_mapping("/_profiling", method=RequestMethod.DELETE)
+    def reset(self, model):
+        get_default_profiler().reset()
+        model.add_attribute("reset", True)
@@ -1,70 +1,78 @@
 # coding: utf8
 
-__all__ = ["RequestMappingHandlerMapping"]
+__all__ = ["RequestMappingHandlerMapping",
+           "RadixTreeHandlerMapping",
+           "CombinedRegexHandlerMapping"]
 __authors__ = ["Tim Chow"]
 
-import re
+import threading
+import weakref
 
 from .interface import HandlerMapping
 from ..decorator import *
 from .handler import Handler
-from ..reflect import get_declared_methods
+from .route_table import *
 from ..utility import is_tornado_installed
 
 
 class RequestMappingHandlerMapping(HandlerMapping):
+    # application context -> {handler mapping class: route table}
+    _route_tables = weakref.WeakKeyDictionary()
+    _route_tables_lock = threading.Lock()
+
     @property
     def handler_class(self):
         return Handler
 
+    @property
+    def route_table_class(self):
+        return RouteTable
+
     def can_handle(self, cls):
         return is_rest_controller_present(cls)
 
+    def get_route_table(self, application_context):
+        key = self.__class__
+        route_table = self._route_tables \
+            .get(application_context, {}).get(key)
+        if route_table is not None and \
+                not route_table.is_stale(application_context):
+            return route_table
+
+        with self._route_tables_lock:
+            route_tables = self._route_tables \
+                .setdefault(application_context, {})
+            route_table = route_tables.get(key)
+            if route_table is None or \
+                    route_table.is_stale(application_context):
+                route_table = self.route_table_class(
+                    application_context,
+                    self.can_handle)
+                route_tables[key] = route_table
+            return route_table
+
     def get_handler(self, request):
-        handler = self.handler_class()
-        for bean_name, bean_obj in request.application_context.iter_beans():
-            cls = bean_obj.cls
-            if not self.can_handle(cls):
-                continue
-            obj = request.application_context.get_bean(bean_name)
-            for attr_name, method in get_declared_methods(cls):
-                class_mvc_args = get_request_mapping(cls)
-                method_mvc_args = get_request_mapping(method)
-                method_exception_handler = get_exception_handler(method)
-                if method_mvc_args:
-                    uri_pattern = (class_mvc_args and class_mvc_args["uri"] or "") + \
-                            (method_mvc_args and method_mvc_args["uri"] or "")
-                    uri_pattern = uri_pattern.endswith("$") and uri_pattern or (uri_pattern + "$")
-                    m = re.match(uri_pattern, request.uri)
-                    if m:
-                        consumes = method_mvc_args["consumes"]
-                        if not consumes or request.content_type in consumes:
-                            matches = dict(zip(map(str, range(1, len(m.groups())+1)), m.groups()))
-                            matches.update(m.groupdict() or {})
-                            wanted_request_method = method_mvc_args["method"]
-                            if wanted_request_method is None and not handler:
-                                handler.add_page_handler(getattr(obj, attr_name), matches)
-                            elif wanted_request_method and \
-                                    wanted_request_method == request.request_method:
-                                handler.add_page_handler(getattr(obj, attr_name), matches)
-                if method_exception_handler:
-                    uri_pattern = (class_mvc_args and class_mvc_args["uri"] or "") + \
-                            (method_exception_handler and method_exception_handler["uri"] or "")
-                    uri_pattern = uri_pattern.endswith("$") and uri_pattern or (uri_pattern + "$")
-                    m = re.match(uri_pattern, request.uri)
-                    if m:
-                        matches = dict(zip(map(str, range(1, len(m.groups())+1)), m.groups()))
-                        matches.update(m.groupdict() or {})
-                        for exc in method_exception_handler["exceptions"]:
-                            handler.add_exception_handler(
-                                exc,
-                                getattr(obj, attr_name),
-                                matches)
-        return handler or None
+        route_table = self.get_route_table(request.application_context)
+        return route_table.get_handler(request, self.handler_class)
+
+
+# 注册为 bean 后，会被 BaseDispatcher 优先使用
+class RadixTreeHandlerMapping(RequestMappingHandlerMapping):
+    @property
+    def route_table_class(self):
+        return RadixRouteTable
+
+
+class CombinedRegexHandlerMapping(RequestMappingHandlerMapping):
+    @property
+    def route_table_class(self):
+        return CombinedRegexRouteTable
 
 
 if is_tornado_installed:
-    __all__.append("TornadoRequestMappingHandlerMapping")
+    __all__.extend(["TornadoRequestMappingHandlerMapping",
+                    "TornadoRadixTreeHandlerMapping",
+                    "TornadoCombinedRegexHandlerMapping"])
 
     from ..decorator import is_tornado_rest_controller_present
     from .handler import TornadoHandler
@@ -79,3 +87,16 @@ if is_tornado_installed:
         def can_handle(self, cls):
             return is_tornado_rest_controller_present(cls)
 
+
+    class TornadoRadixTreeHandlerMapping(
+            TornadoRequestMappingHandlerMapping):
+        @property
+        def route_table_class(self):
+            return RadixRouteTable
+
+
+    class TornadoCombinedRegexHandlerMapping(
+            TornadoRequestMappingHandlerMapping):
+        @property
+        def route_table_class(self):
+            return CombinedRegexRouteTable
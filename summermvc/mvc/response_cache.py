@@ -0,0 +1,32 @@
+# coding: utf8
+
+__all__ = ["CachedResponse", "LRUResponseCache"]
+__authors__ = ["Tim Chow"]
+
+from collections import namedtuple
+
+from .interface import ResponseCache
+from ..lru_cache import LRUCache
+
+# 缓存的是渲染之后、压缩之前的响应
+CachedResponse = namedtuple(
+    "CachedResponse",
+    ["status_code", "message", "headers", "body"])
+
+
+class LRUResponseCache(ResponseCache):
+    """进程内的响应缓存，超过 maxsize 之后淘汰最近最少使用的响应"""
+    def __init__(self, maxsize=1024):
+        self._cache = LRUCache(maxsize)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, cached_response, ttl):
+        self._cache.set(key, cached_response, ttl)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return self._cache.stats()
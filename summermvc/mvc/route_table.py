@@ -0,0 +1,463 @@
+# coding: utf8
+
+__all__ = ["Route", "ExceptionRoute", "RouteTable", "RadixRouteTable",
+           "CombinedRegexRouteTable"]
+__authors__ = ["Tim Chow"]
+
+import re
+import threading
+
+from ..decorator import *
+from ..reflect import get_declared_methods
+from ..utility import literal_prefix
+from .exception import MethodNotAllowedError
+
+
+def _compile_uri_pattern(class_uri, method_uri):
+    uri_pattern = (class_uri or "") + (method_uri or "")
+    if not uri_pattern.endswith("$"):
+        uri_pattern = uri_pattern + "$"
+    return uri_pattern, re.compile(uri_pattern)
+
+
+class _BaseRoute(object):
+    __slots__ = ["index", "bean_name", "attr_name", "bound_method",
+                 "uri_pattern", "regex", "group_keys", "has_named_groups"]
+
+    def __init__(self, bean_name, attr_name, bound_method,
+                 uri_pattern, regex):
+        # 路由项在路由表中的位置，决定匹配的优先级
+        self.index = -1
+        self.bean_name = bean_name
+        self.attr_name = attr_name
+        # 只有单例 bean 才能预先绑定方法
+        self.bound_method = bound_method
+        self.uri_pattern = uri_pattern
+        self.regex = regex
+        self.group_keys = tuple(str(i) for i in range(1, regex.groups + 1))
+        self.has_named_groups = bool(regex.groupindex)
+
+    def get_method(self, application_context, instances):
+        if self.bound_method is not None:
+            return self.bound_method
+        # 同一次查找中，原型 bean 只创建一个实例
+        if self.bean_name not in instances:
+            instances[self.bean_name] = \
+                application_context.get_bean(self.bean_name)
+        return getattr(instances[self.bean_name], self.attr_name)
+
+    def build_matches(self, m):
+        matches = dict(zip(self.group_keys, m.groups()))
+        if self.has_named_groups:
+            matches.update(m.groupdict())
+        return matches
+
+
+class Route(_BaseRoute):
+    """page handler 对应的路由项"""
+    __slots__ = ["method", "consumes"]
+
+    def __init__(self, bean_name, attr_name, bound_method,
+                 uri_pattern, regex, method, consumes):
+        _BaseRoute.__init__(self, bean_name, attr_name, bound_method,
+                            uri_pattern, regex)
+        self.method = method
+        self.consumes = frozenset(consumes)
+
+    def accepts(self, content_type):
+        return not self.consumes or content_type in self.consumes
+
+
+class ExceptionRoute(_BaseRoute):
+    """exception handler 对应的路由项"""
+    __slots__ = ["exceptions"]
+
+    def __init__(self, bean_name, attr_name, bound_method,
+                 uri_pattern, regex, exceptions):
+        _BaseRoute.__init__(self, bean_name, attr_name, bound_method,
+                            uri_pattern, regex)
+        self.exceptions = tuple(exceptions)
+
+
+class RouteTable(object):
+    """
+    在启动时扫描一次所有的 controller，预编译 uri pattern，
+    + 这样每次请求只需要做匹配
+    """
+    def __init__(self, application_context, can_handle):
+        self._revision = application_context.revision
+        self._routes = []
+        self._exception_routes = []
+
+        for bean_name, bean in application_context.iter_beans():
+            cls = bean.cls
+            if not can_handle(cls):
+                continue
+            obj = None
+            if bean.is_singleton:
+                obj = application_context.get_bean(bean_name)
+            class_mvc_args = get_request_mapping(cls)
+            class_uri = class_mvc_args and class_mvc_args["uri"] or ""
+            for attr_name, method in get_declared_methods(cls):
+                bound_method = None
+                if obj is not None:
+                    bound_method = getattr(obj, attr_name)
+
+                method_mvc_args = get_request_mapping(method)
+                if method_mvc_args:
+                    uri_pattern, regex = _compile_uri_pattern(
+                        class_uri,
+                        method_mvc_args["uri"])
+                    self._routes.append(Route(
+                        bean_name,
+                        attr_name,
+                        bound_method,
+                        uri_pattern,
+                        regex,
+                        method_mvc_args["method"],
+                        method_mvc_args["consumes"]))
+
+                method_exception_handler = get_exception_handler(method)
+                if method_exception_handler:
+                    uri_pattern, regex = _compile_uri_pattern(
+                        class_uri,
+                        method_exception_handler["uri"])
+                    self._exception_routes.append(ExceptionRoute(
+                        bean_name,
+                        attr_name,
+                        bound_method,
+                        uri_pattern,
+                        regex,
+                        method_exception_handler["exceptions"]))
+
+        self._routes = tuple(self._routes)
+        self._exception_routes = tuple(self._exception_routes)
+        for index, route in enumerate(self._routes):
+            route.index = index
+        for index, route in enumerate(self._exception_routes):
+            route.index = index
+        self._build_indexes()
+
+    def _build_indexes(self):
+        # 按照请求方法对路由项分桶，另外没有指定请求方法的路由项放在一个桶中
+        method_routes = {}
+        method_less_routes = []
+        # uri pattern -> (第一个使用该 pattern 的路由项, 允许的请求方法)，
+        # + 允许的请求方法为 None 时，表示允许所有的请求方法
+        allowed = {}
+        for route in self._routes:
+            if route.method is None:
+                method_less_routes.append(route)
+            else:
+                method_routes.setdefault(route.method, []).append(route)
+
+            first_route, methods = allowed.setdefault(
+                route.uri_pattern, (route, set()))
+            if route.method is None or methods is None:
+                allowed[route.uri_pattern] = first_route, None
+            else:
+                methods.add(route.method)
+
+        self._method_indexes = dict(
+            (method, self.create_index(routes))
+            for method, routes in method_routes.iteritems())
+        self._method_less_index = self.create_index(method_less_routes)
+
+        # 只有限定了请求方法的 uri pattern 才可能导致 405
+        restricted = sorted(
+            ((route, frozenset(methods))
+             for route, methods in allowed.itervalues()
+             if methods is not None),
+            key=lambda item: item[0].index)
+        self._allowed_methods = dict(
+            (route.index, methods) for route, methods in restricted)
+        # 请求方法 -> 不允许该请求方法的 uri pattern 的索引；查找路由失败时，
+        # + 允许该请求方法的 pattern 已经在查找过程中匹配过了，只需要再匹配这些
+        self._disallowed_indexes = dict(
+            (method, self.create_index(
+                route for route, methods in restricted
+                if method not in methods))
+            for method in method_routes)
+        self._disallowed_index = self.create_index(
+            route for route, _ in restricted)
+        self._exception_index = self.create_index(self._exception_routes)
+
+    @property
+    def revision(self):
+        return self._revision
+
+    @property
+    def routes(self):
+        return self._routes
+
+    @property
+    def exception_routes(self):
+        return self._exception_routes
+
+    def is_stale(self, application_context):
+        return self._revision != application_context.revision
+
+    def create_index(self, routes):
+        """创建索引，索引按照路由项在路由表中的顺序返回可能与 uri 匹配的路由项"""
+        return _LinearIndex(routes)
+
+    def iter_routes(self, uri, request_method):
+        """按照优先级返回可能与 uri 匹配的路由项"""
+        index = self._method_indexes.get(request_method)
+        if index is not None:
+            # 指定了请求方法的路由，后定义的优先
+            for route in reversed(index.candidates(uri)):
+                yield route
+        # 没有指定请求方法的路由，先定义的优先
+        for route in self._method_less_index.candidates(uri):
+            yield route
+
+    def iter_exception_routes(self, uri):
+        return self._exception_index.candidates(uri)
+
+    def find_route(self, request):
+        """返回匹配的 (route, matches)，找不到时返回 (None, None)"""
+        route, matches, _ = self.match_route(request)
+        return route, matches
+
+    def match_route(self, request):
+        """
+        返回 (route, matches, matched)，matched 表示 uri 是否与
+        + 允许该请求方法的某个 uri pattern 匹配
+        """
+        uri = request.uri
+        content_type = request.content_type
+        matched = False
+        for route in self.iter_routes(uri, request.request_method):
+            m = route.regex.match(uri)
+            if m is None:
+                continue
+            if route.accepts(content_type):
+                return route, route.build_matches(m), True
+            matched = True
+        return None, None, matched
+
+    def find_allowed_methods(self, uri, request_method):
+        """
+        返回不允许 request_method 的 uri pattern 中，与 uri 匹配的
+        + 那些 pattern 允许的请求方法，没有匹配的 pattern 时返回空集合
+        """
+        index = self._disallowed_indexes.get(
+            request_method, self._disallowed_index)
+        allowed_methods = set()
+        for route in index.candidates(uri):
+            if route.regex.match(uri) is not None:
+                allowed_methods.update(self._allowed_methods[route.index])
+        return allowed_methods
+
+    def get_handler(self, request, handler_class):
+        route, matches, matched = self.match_route(request)
+        if route is None:
+            # 只有在 uri 存在，但是请求方法不被允许时，才返回 405；
+            # + uri 与允许该请求方法的 pattern 匹配时，不需要再查找
+            if not matched:
+                allowed_methods = self.find_allowed_methods(
+                    request.uri, request.request_method)
+                if allowed_methods:
+                    raise MethodNotAllowedError(allowed_methods)
+            return None
+
+        application_context = request.application_context
+        instances = {}
+        handler = handler_class()
+        handler.add_page_handler(
+            route.get_method(application_context, instances),
+            matches,
+            route.uri_pattern)
+        self.add_exception_handlers(request, handler, instances)
+        # 创建了原型 bean 的实例，每次请求都需要重新创建
+        if instances:
+            handler.set_cacheable(False)
+        return handler
+
+    def add_exception_handlers(self, request, handler, instances):
+        application_context = request.application_context
+        uri = request.uri
+        for route in self.iter_exception_routes(uri):
+            m = route.regex.match(uri)
+            if m is None:
+                continue
+            matches = route.build_matches(m)
+            method = route.get_method(application_context, instances)
+            for exc in route.exceptions:
+                handler.add_exception_handler(exc, method, matches)
+
+
+class _LinearIndex(object):
+    def __init__(self, routes):
+        self._routes = tuple(routes)
+
+    def candidates(self, uri):
+        return self._routes
+
+
+class _RadixNode(object):
+    __slots__ = ["children", "routes"]
+
+    def __init__(self):
+        self.children = {}
+        self.routes = []
+
+
+class _RadixIndex(object):
+    """
+    完全由字面量组成的路由放在字典中；其余的路由按照字面量前缀中
+    + 完整的路径段挂在前缀树上，只有动态的部分才需要正则匹配
+    """
+    def __init__(self, routes):
+        self._static = {}
+        self._root = _RadixNode()
+        for route in routes:
+            prefix, is_literal = literal_prefix(route.uri_pattern)
+            if is_literal:
+                self._static.setdefault(prefix, []).append(route)
+                continue
+            node = self._root
+            if prefix.startswith("/"):
+                # 最后一个路径段可能不完整，不能作为前缀树的节点
+                for segment in prefix.split("/")[1:-1]:
+                    node = node.children.setdefault(segment, _RadixNode())
+            node.routes.append(route)
+
+    def candidates(self, uri):
+        routes = list(self._static.get(uri, ()))
+        node = self._root
+        routes.extend(node.routes)
+        if uri.startswith("/"):
+            for segment in uri.split("/")[1:-1]:
+                node = node.children.get(segment)
+                if node is None:
+                    break
+                routes.extend(node.routes)
+        # 恢复路由项在路由表中的顺序，保证匹配的语义不变
+        routes.sort(key=lambda r: r.index)
+        return routes
+
+
+class RadixRouteTable(RouteTable):
+    """查找的时间取决于路径的深度，而不是路由的数量"""
+    def create_index(self, routes):
+        return _RadixIndex(routes)
+
+
+# Python 2 的 re 模块最多支持 100 个分组
+_MAX_GROUPS_PER_PATTERN = 99
+_NAMED_GROUP = re.compile(r"\(\?P<\w+>")
+# 反向引用和内联标志不能放到合并后的正则表达式中
+_NOT_COMBINABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?[iLmsux]+\)")
+# 查找时忽略路由项的 consumes
+_ANY_CONTENT_TYPE = object()
+
+
+class _CombinedPattern(object):
+    """
+    把多个路由的 uri pattern 合并成一个分支，每个分支用一个命名的哨兵分组包裹，
+    + 一次 match 就可以确定第一个匹配的路由及其路径变量
+    """
+    def __init__(self, routes):
+        # 每一项是 (regex, {哨兵分组序号: (route, 分组偏移量)})
+        self._chunks = []
+
+        alternatives, sentinels, group_count = [], {}, 0
+        for route in routes:
+            groups = route.regex.groups + 1
+            if _NOT_COMBINABLE.search(route.uri_pattern) or \
+                    groups > _MAX_GROUPS_PER_PATTERN:
+                self._flush(alternatives, sentinels)
+                alternatives, sentinels, group_count = [], {}, 0
+                self._chunks.append((route.regex, None, route))
+                continue
+            if group_count + groups > _MAX_GROUPS_PER_PATTERN:
+                self._flush(alternatives, sentinels)
+                alternatives, sentinels, group_count = [], {}, 0
+            sentinels[group_count+1] = route
+            alternatives.append("(?P<_r%d>%s)" % (
+                len(alternatives),
+                _NAMED_GROUP.sub("(", route.uri_pattern)))
+            group_count = group_count + groups
+        self._flush(alternatives, sentinels)
+
+    def _flush(self, alternatives, sentinels):
+        if alternatives:
+            self._chunks.append(
+                (re.compile("|".join(alternatives)), sentinels, None))
+
+    def match(self, uri):
+        for regex, sentinels, route in self._chunks:
+            m = regex.match(uri)
+            if m is None:
+                continue
+            if sentinels is None:
+                return route, route.build_matches(m)
+            offset = m.lastindex
+            route = sentinels[offset]
+            values = m.groups()[offset:offset+route.regex.groups]
+            matches = dict(zip(route.group_keys, values))
+            if route.has_named_groups:
+                for name, index in route.regex.groupindex.iteritems():
+                    matches[name] = values[index-1]
+            return route, matches
+        return None, None
+
+
+class CombinedRegexRouteTable(RouteTable):
+    """适用于大量正则路由的场景，每次查找只需要一次 re.match"""
+    def __init__(self, application_context, can_handle):
+        RouteTable.__init__(self, application_context, can_handle)
+        self._lock = threading.Lock()
+        # (请求方法, Content-Type) -> _CombinedPattern
+        self._patterns = {}
+        self._methods = frozenset(
+            route.method for route in self.routes
+            if route.method is not None)
+        self._content_types = frozenset(
+            content_type for route in self.routes
+            for content_type in route.consumes)
+
+    def get_pattern(self, request_method, content_type):
+        # 没有路由关心的请求方法和 Content-Type 归为一类，
+        # + 从而保证缓存的大小是有界的
+        if request_method not in self._methods:
+            request_method = None
+        if content_type is not _ANY_CONTENT_TYPE and \
+                content_type not in self._content_types:
+            content_type = None
+        key = request_method, content_type
+        pattern = self._patterns.get(key)
+        if pattern is not None:
+            return pattern
+
+        with self._lock:
+            if key not in self._patterns:
+                # 指定了请求方法的路由，后定义的优先；
+                # + 没有指定请求方法的路由，先定义的优先
+                accepts = lambda route: \
+                    content_type is _ANY_CONTENT_TYPE or \
+                    route.accepts(content_type)
+                routes = [route for route in reversed(self.routes)
+                          if route.method is not None and
+                          route.method == request_method and
+                          accepts(route)]
+                routes.extend(route for route in self.routes
+                              if route.method is None and accepts(route))
+                self._patterns[key] = _CombinedPattern(routes)
+            return self._patterns[key]
+
+    def match_route(self, request):
+        uri = request.uri
+        request_method = request.request_method
+        pattern = self.get_pattern(request_method, request.content_type)
+        route, matches = pattern.match(uri)
+        if route is not None:
+            return route, matches, True
+        if not self._content_types:
+            return None, None, False
+        # 可能是因为 Content-Type 不被接受而没有找到路由
+        route, _ = self.get_pattern(
+            request_method, _ANY_CONTENT_TYPE).match(uri)
+        return None, None, route is not None
@@ -1,33 +1,158 @@
 # coding: utf8
 
-__all__ = ["URLEncodedEntityParser"]
+__all__ = ["URLEncodedEntityParser", "parse_urlencoded"]
 __authors__ = ["Tim Chow"]
 
+from collections import Mapping
 from urllib import unquote
 
-from .exception import MissingArgumentError
+from .exception import MissingArgumentError, FormLimitExceededError
+
+# 默认的字段数量和字段名长度的上限
+MAX_FIELDS = 10000
+MAX_KEY_LENGTH = 1024
+
+
+def _decode(string, has_plus=True, has_percent=True):
+    # 没有转义字符时不需要调用 unquote；has_plus 和 has_percent 为 False，
+    # + 表示调用者已经确定整个字符串中不包含对应的字符，不需要再检查
+    if has_plus and "+" in string:
+        string = string.replace("+", " ")
+    if has_percent and "%" in string:
+        string = unquote(string)
+    return string
+
+
+def _split(string, max_fields, max_key_length):
+    items = string.split("&")
+    if max_fields is not None and len(items) > max_fields:
+        raise FormLimitExceededError("more than %d fields" % max_fields)
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            continue
+        if max_key_length is not None and len(key) > max_key_length:
+            raise FormLimitExceededError(
+                "field name longer than %d" % max_key_length)
+        yield key, value
+
+
+def parse_urlencoded(string, max_fields=MAX_FIELDS,
+                     max_key_length=MAX_KEY_LENGTH):
+    """
+    解析查询字符串或者 application/x-www-form-urlencoded 请求体，
+    + 返回字段名到值列表的映射；"+" 被解码成空格
+    """
+    arguments = {}
+    if not string:
+        return arguments
+
+    # 整个字符串都没有转义字符时，跳过所有的解码
+    has_plus = "+" in string
+    has_percent = "%" in string
+    for key, value in _split(string, max_fields, max_key_length):
+        if has_plus or has_percent:
+            key = _decode(key, has_plus, has_percent)
+            value = _decode(value, has_plus, has_percent)
+        values = arguments.get(key)
+        if values is None:
+            arguments[key] = [value]
+        else:
+            values.append(value)
+    return arguments
+
+
+class _LazyArguments(Mapping):
+    """
+    只切分字段，不解码；字段名和值在第一次被访问时才解码。
+    + 与 parse_urlencoded 的结果一样，是字段名到值列表的只读映射
+    """
+    def __init__(self, string, max_fields, max_key_length):
+        # 不需要解码的字段名 -> [(字段的位置, 未解码的值), ...]
+        self._plain = {}
+        # 需要解码的字段：[(字段的位置, 未解码的字段名, 未解码的值), ...]
+        self._escaped = []
+        self._escaped_index = None
+        self._decoded = {}
+        if not string:
+            return
+        for position, (key, value) in enumerate(
+                _split(string, max_fields, max_key_length)):
+            if "%" in key or "+" in key:
+                self._escaped.append((position, key, value))
+            else:
+                self._plain.setdefault(key, []).append((position, value))
+
+    def _get_escaped_index(self):
+        if self._escaped_index is None:
+            index = {}
+            for position, key, value in self._escaped:
+                index.setdefault(_decode(key), []).append((position, value))
+            self._escaped_index = index
+        return self._escaped_index
+
+    def get(self, key, default=None):
+        if key in self._decoded:
+            return self._decoded[key]
+        entries = self._plain.get(key, [])
+        if self._escaped:
+            escaped_entries = self._get_escaped_index().get(key)
+            if escaped_entries:
+                entries = sorted(entries + escaped_entries)
+        if not entries:
+            return default
+        values = self._decoded[key] = [_decode(value)
+                                       for _, value in entries]
+        return values
+
+    def __getitem__(self, key):
+        values = self.get(key)
+        if values is None:
+            raise KeyError(key)
+        return values
+
+    def __contains__(self, key):
+        return key in self._plain or \
+            (bool(self._escaped) and key in self._get_escaped_index())
+
+    def keys(self):
+        return list(set(self._plain) | set(self._get_escaped_index()))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
 
 
 class URLEncodedEntityParser(object):
-    def __init__(self, body):
-        self._arguments = self.parse(body)
+    """lazy 为 True 时，只有被访问的字段才会被解码"""
+    def __init__(self, body, lazy=False, max_fields=MAX_FIELDS,
+                 max_key_length=MAX_KEY_LENGTH):
+        if lazy:
+            self._arguments = _LazyArguments(body, max_fields, max_key_length)
+        else:
+            self._arguments = parse_urlencoded(
+                body,
+                max_fields,
+                max_key_length)
 
     @staticmethod
     def parse(body):
-        arguments = {}
-        for item in body.split("&"):
-            pair = item.split("=", 1)
-            if len(pair) != 2:
-                continue
-            arguments.setdefault(unquote(pair[0]), []).append(unquote(pair[1]))
-        return arguments
+        return parse_urlencoded(body)
+
+    @property
+    def arguments(self):
+        return self._arguments
 
     def get_argument(self, argument):
-        if argument not in self._arguments:
+        values = self._arguments.get(argument)
+        if values is None:
             raise MissingArgumentError("missing argument %s" % argument)
-        return self._arguments[argument][0]
+        return values[0]
 
     def get_arguments(self, argument):
-        if argument not in self._arguments:
+        values = self._arguments.get(argument)
+        if values is None:
             raise MissingArgumentError("missing argument %s" % argument)
-        return self._arguments[argument]
+        return values
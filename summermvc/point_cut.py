@@ -0,0 +1,68 @@
+# coding: utf8
+
+__all__ = ["PointCutIndex"]
+__authors__ = ["Tim Chow"]
+
+import re
+
+from .utility import literal_prefix
+
+
+class _CompiledPointCut(object):
+    __slots__ = ["point_cut", "regex", "prefix", "class_name", "values"]
+
+    def __init__(self, point_cut):
+        self.point_cut = point_cut
+        # 与 re.match(point_cut.rstrip("$") + "$", ...) 的语义一致
+        pattern = point_cut.rstrip("$")
+        self.regex = re.compile(pattern + "$")
+        self.prefix, _ = literal_prefix(pattern)
+        # 字面量前缀中含有空格时，切点只可能匹配这一个类
+        class_name, sep, _ = self.prefix.partition(" ")
+        self.class_name = class_name if sep else None
+        self.values = []
+
+
+class PointCutIndex(object):
+    """
+    切点只编译一次，并按照类名建立索引：织入一个类之前先筛选出可能匹配的切点，
+    + 每个方法只需要用这些切点的正则表达式匹配一次 "类名 方法名"
+    """
+    def __init__(self):
+        self._point_cuts = {}
+        # 类名 -> [切点]，字面量前缀包含了完整类名的切点
+        self._by_class_name = {}
+        # 只知道类名前缀（可能为空）的切点
+        self._by_prefix = []
+
+    def add(self, point_cut, value):
+        compiled = self._point_cuts.get(point_cut)
+        if compiled is None:
+            compiled = self._point_cuts[point_cut] = \
+                _CompiledPointCut(point_cut)
+            if compiled.class_name is not None:
+                self._by_class_name.setdefault(compiled.class_name, []) \
+                    .append(compiled)
+            else:
+                self._by_prefix.append(compiled)
+        compiled.values.append(value)
+
+    def __len__(self):
+        return len(self._point_cuts)
+
+    def candidates(self, class_name):
+        """返回可能匹配该类中方法的切点"""
+        return self._by_class_name.get(class_name, []) + \
+            [compiled for compiled in self._by_prefix
+             if class_name.startswith(compiled.prefix)]
+
+    def match(self, class_name, attr_name, candidates=None):
+        """返回所有匹配 "类名 方法名" 的切点对应的 value"""
+        if candidates is None:
+            candidates = self.candidates(class_name)
+        subject = "%s %s" % (class_name, attr_name)
+        values = []
+        for compiled in candidates:
+            if compiled.regex.match(subject):
+                values.extend(compiled.values)
+        return values
@@ -0,0 +1,200 @@
+# coding: utf8
+
+__all__ = ["Profiler", "profiling", "get_default_profiler"]
+__authors__ = ["Tim Chow"]
+
+import sys
+import inspect
+import threading
+import timeit
+import collections
+
+from .decorator import aspect, around, get_aspect
+
+# 默认放在最内层，统计的是方法本身（以及内层通知）的耗时
+LOWEST_ORDER = -sys.maxint - 1
+
+
+def _method_name(method):
+    # 与切点匹配的格式相同："类名 方法名"
+    cls = getattr(method, "im_class", None)
+    if cls is None:
+        return getattr(method, "__name__", repr(method))
+    return "%s %s" % (cls.__name__, method.__name__)
+
+
+class _ThreadState(object):
+    __slots__ = ["counters", "starts", "generation"]
+
+    def __init__(self, generation):
+        # method -> [调用次数, 总耗时, 最大耗时, 异常次数]
+        self.counters = {}
+        # 计数器所属的代，与 Profiler 的代不同时说明已经被 reset
+        self.generation = generation
+        # id(连接点) -> 开始时间，按照开始的顺序排列；
+        # + 同一个线程中的协程交错执行时，调用不一定按照后进先出的顺序结束
+        self.starts = collections.OrderedDict()
+
+
+class Profiler(object):
+    """
+    每个线程只写自己的计数器，记录时不需要加锁，也不会为每次调用分配闭包；
+    + snapshot 时合并所有线程（包括已经结束的线程）的计数器。
+    + reset 只增加代，每个线程在下一次记录时清空自己的计数器。
+    + 同一个连接点被使用同一个 Profiler 的多个切面包围时，只统计一次
+    """
+    # 每个线程中未结束的调用的最大数量
+    MAX_PENDING = 1024
+
+    def __init__(self, timer=timeit.default_timer):
+        self._timer = timer
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # [(线程, _ThreadState), ...]，线程结束之后会被合并到 _finished_counters 中
+        self._thread_states = []
+        self._finished_counters = {}
+        self._generation = 0
+        # 预先绑定，环绕通知每次返回同一个对象
+        self._exit_callback = self._exit
+
+    @property
+    def timer(self):
+        return self._timer
+
+    def _get_state(self):
+        try:
+            state = self._local.state
+        except AttributeError:
+            with self._lock:
+                state = self._local.state = _ThreadState(self._generation)
+                self._merge_finished_threads()
+                self._thread_states.append(
+                    (threading.current_thread(), state))
+            return state
+        generation = self._generation
+        if state.generation != generation:
+            # 只有当前线程会修改自己的计数器
+            state.counters.clear()
+            state.generation = generation
+        return state
+
+    def _merge_finished_threads(self):
+        # 调用者需要持有锁；结束的线程不会再修改自己的计数器
+        thread_states = []
+        for thread, state in self._thread_states:
+            if thread.is_alive():
+                thread_states.append((thread, state))
+            elif state.generation == self._generation:
+                self._merge(self._finished_counters, state.counters)
+        self._thread_states = thread_states
+
+    def enter(self, joint_point):
+        """环绕通知的前半部分，返回在连接点执行之后调用的函数"""
+        starts = self._get_state().starts
+        # 更内层的环绕通知通过 Return 提前返回时，对应的记录不会被删除；
+        # + 超过上限时只丢弃最早的记录，避免无限增长
+        if len(starts) >= self.MAX_PENDING:
+            starts.popitem(last=False)
+        starts[id(joint_point)] = self._timer()
+        return self._exit_callback
+
+    def _exit(self, joint_point, returning, exc_info):
+        end = self._timer()
+        state = self._get_state()
+        start = state.starts.pop(id(joint_point), None)
+        if start is None:
+            return
+        self._update(state.counters, joint_point.method, end - start,
+                     exc_info is not None)
+
+    def record(self, method, elapsed, failed=False):
+        self._update(self._get_state().counters, method, elapsed, failed)
+
+    @staticmethod
+    def _update(counters, method, elapsed, failed):
+        counter = counters.get(method)
+        if counter is None:
+            counter = counters[method] = [0, 0.0, 0.0, 0]
+        counter[0] = counter[0] + 1
+        counter[1] = counter[1] + elapsed
+        if elapsed > counter[2]:
+            counter[2] = elapsed
+        if failed:
+            counter[3] = counter[3] + 1
+
+    @staticmethod
+    def _merge(merged, counters):
+        for method, counter in counters.items():
+            calls, total, max_time, exceptions = tuple(counter)
+            target = merged.get(method)
+            if target is None:
+                merged[method] = [calls, total, max_time, exceptions]
+                continue
+            target[0] = target[0] + calls
+            target[1] = target[1] + total
+            target[2] = max(target[2], max_time)
+            target[3] = target[3] + exceptions
+
+    def snapshot(self):
+        """返回 "类名 方法名" -> 统计信息，时间的单位是秒"""
+        merged = {}
+        with self._lock:
+            self._merge_finished_threads()
+            self._merge(merged, self._finished_counters)
+            for _, state in self._thread_states:
+                # 已经被 reset、但是线程还没有清空的计数器
+                if state.generation == self._generation:
+                    self._merge(merged, state.counters)
+
+        # 不同的 method 对象可能对应相同的名称
+        by_name = {}
+        for method, (calls, total, max_time, exceptions) in \
+                merged.iteritems():
+            name = _method_name(method)
+            stats = by_name.get(name)
+            if stats is None:
+                by_name[name] = stats = {"calls": 0,
+                                         "total_time": 0.0,
+                                         "max_time": 0.0,
+                                         "exceptions": 0}
+            stats["calls"] = stats["calls"] + calls
+            stats["total_time"] = stats["total_time"] + total
+            stats["max_time"] = max(stats["max_time"], max_time)
+            stats["exceptions"] = stats["exceptions"] + exceptions
+        for stats in by_name.itervalues():
+            stats["mean_time"] = stats["calls"] and \
+                stats["total_time"] / stats["calls"] or 0.0
+        return by_name
+
+    def reset(self):
+        with self._lock:
+            self._generation = self._generation + 1
+            self._finished_counters.clear()
+
+
+_DEFAULT_PROFILER = Profiler()
+
+
+def get_default_profiler():
+    return _DEFAULT_PROFILER
+
+
+def profiling(point_cut, order=LOWEST_ORDER, profiler=None):
+    """
+    类装饰器：把类变成统计 point_cut 匹配的方法的调用次数、耗时和异常次数的切面，
+    + 类仍然需要被注册成 bean；默认使用 get_default_profiler() 返回的 Profiler
+    """
+    profiler = profiler or _DEFAULT_PROFILER
+
+    def _inner(cls):
+        if not inspect.isclass(cls):
+            raise RuntimeError("class expected")
+
+        def profile_around(self, joint_point):
+            return profiler.enter(joint_point)
+        setattr(cls, "profile_around", around(point_cut)(profile_around))
+        setattr(cls, "profiler", profiler)
+        if get_aspect(cls) is None:
+            aspect(order)(cls)
+        return cls
+    return _inner
@@ -32,10 +32,7 @@ class MultipartController(object):
         yield html
 
     @request_mapping("/upload", method=RequestMethod.POST)
-    def upload_files_post(self, model, request, request_body):
-        uploaded_files = MultipartParser(
-            request_body,
-            request.content_type_attributes["boundary"]).files
-        LOGGER.debug("uploaded files are: %s", uploaded_files)
+    def upload_files_post(self, model, request):
+        LOGGER.debug("uploaded files are: %s", request.files)
         model.add_attribute("success", True)
         return "json"
@@ -1,3 +1,7 @@
+# coding: utf8
+
+import re
+
 is_tornado_installed = True
 
 try:
@@ -5,3 +9,65 @@ try:
 except ImportError:
     is_tornado_installed = False
 
+
+_REGEX_META_CHARACTERS = ".^$*+?{}[]\\|()"
+_REGEX_QUANTIFIERS = "*?{+"
+_REGEX_INLINE_FLAGS = re.compile(r"\(\?[iLmsux]+\)")
+
+
+def _has_top_level_alternation(pattern):
+    depth = 0
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        character = pattern[index]
+        if character == "\\":
+            index = index + 2
+            continue
+        if in_class:
+            in_class = character != "]"
+        elif character == "[":
+            in_class = True
+        elif character == "(":
+            depth = depth + 1
+        elif character == ")":
+            depth = depth - 1
+        elif character == "|" and depth == 0:
+            return True
+        index = index + 1
+    return False
+
+
+def literal_prefix(pattern):
+    """
+    返回正则表达式必须匹配的字面量前缀，以及该正则表达式是否完全由字面量组成
+    （可以以 $ 结尾）。无法确定时，返回空前缀
+    """
+    # 含有顶层分支或者内联标志时，前缀不可靠
+    if _has_top_level_alternation(pattern) or \
+            _REGEX_INLINE_FLAGS.search(pattern):
+        return "", False
+
+    prefix = []
+    index = 0
+    length = len(pattern)
+    while index < length:
+        character = pattern[index]
+        if character == "\\":
+            if index + 1 >= length or pattern[index+1].isalnum():
+                break
+            literal, step = pattern[index+1], 2
+        elif character in _REGEX_META_CHARACTERS:
+            break
+        else:
+            literal, step = character, 1
+
+        quantifier = pattern[index+step:index+step+1]
+        if quantifier and quantifier in _REGEX_QUANTIFIERS:
+            # + 表示至少出现一次，所以该字符仍然属于前缀
+            if quantifier == "+":
+                prefix.append(literal)
+            break
+        prefix.append(literal)
+        index = index + step
+    return "".join(prefix), pattern[index:] in ("", "$")
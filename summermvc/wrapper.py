@@ -5,12 +5,221 @@ __authors__ = ["Tim Chow"]
 
 from functools import wraps
 import inspect
+import itertools
 import sys
 
 from .joint_point import JointPoint
 from .exception import Return
 from .utility import is_tornado_installed
 
+# 通知可以接受的参数，按照这个顺序组成调用计划的 key
+_ADVICE_ARGUMENTS = ("joint_point", "returning", "exc_info")
+
+# 通知接受的参数 -> 以固定的形式 (jp, returning, exc_info) 调用通知的函数
+_INVOKERS = {
+    (): lambda advice:
+        lambda jp, returning, exc_info: advice(),
+    ("joint_point", ): lambda advice:
+        lambda jp, returning, exc_info: advice(joint_point=jp),
+    ("returning", ): lambda advice:
+        lambda jp, returning, exc_info: advice(returning=returning),
+    ("exc_info", ): lambda advice:
+        lambda jp, returning, exc_info: advice(exc_info=exc_info),
+    ("joint_point", "returning"): lambda advice:
+        lambda jp, returning, exc_info: advice(
+            joint_point=jp, returning=returning),
+    ("joint_point", "exc_info"): lambda advice:
+        lambda jp, returning, exc_info: advice(
+            joint_point=jp, exc_info=exc_info),
+    ("returning", "exc_info"): lambda advice:
+        lambda jp, returning, exc_info: advice(
+            returning=returning, exc_info=exc_info),
+    ("joint_point", "returning", "exc_info"): lambda advice:
+        lambda jp, returning, exc_info: advice(
+            joint_point=jp, returning=returning, exc_info=exc_info),
+}
+
+
+def compile_advices(advices, accepted_arguments):
+    """
+    织入时为每个通知生成调用计划：只检查一次通知的形参，
+    + 调用时不再需要 inspect.getargspec 以及构造关键字参数
+    """
+    invokers = []
+    for advice in advices:
+        formal_arguments = inspect.getargspec(advice).args
+        key = tuple(argument for argument in _ADVICE_ARGUMENTS
+                    if argument in accepted_arguments and
+                    argument in formal_arguments)
+        invokers.append(_INVOKERS[key](advice))
+    return tuple(invokers)
+
+
+def needs_joint_point(before_advices,
+                      around_advices,
+                      after_returning_advices,
+                      after_throwing_advices,
+                      after_advices):
+    """
+    只有通知需要时才创建 JointPoint；环绕通知返回的函数总是以 JointPoint
+    + 作为第一个参数，所以有环绕通知时也需要
+    """
+    if around_advices:
+        return True
+    for advice in itertools.chain(before_advices,
+                                  after_returning_advices,
+                                  after_throwing_advices,
+                                  after_advices):
+        if "joint_point" in inspect.getargspec(advice).args:
+            return True
+    return False
+
+
+def _compile_all(before_advices,
+                 around_advices,
+                 after_returning_advices,
+                 after_throwing_advices,
+                 after_advices):
+    return (needs_joint_point(before_advices,
+                              around_advices,
+                              after_returning_advices,
+                              after_throwing_advices,
+                              after_advices),
+            compile_advices(before_advices, ("joint_point", )),
+            compile_advices(around_advices, ("joint_point", )),
+            compile_advices(after_returning_advices,
+                            ("joint_point", "returning")),
+            compile_advices(after_throwing_advices,
+                            ("joint_point", "exc_info")),
+            compile_advices(after_advices, _ADVICE_ARGUMENTS))
+
+
+def is_simple_shape(around_advices, after_throwing_advices, after_advices):
+    """
+    只有前置通知和返回通知时，连接点抛出的异常可以直接传播出去，
+    + 不需要环绕通知、异常通知以及 sys.exc_info 相关的处理
+    """
+    return not (around_advices or after_throwing_advices or after_advices)
+
+
+def _simple_logic(f, with_joint_point, before_invokers,
+                  after_returning_invokers):
+    # 只有一个前置通知时，生成两步调用
+    if len(before_invokers) == 1 and not after_returning_invokers:
+        before_invoker = before_invokers[0]
+        if with_joint_point:
+            def _real_logic(*a, **kw):
+                jp = JointPoint(f, a, kw)
+                try:
+                    before_invoker(jp, None, None)
+                except Return as e:
+                    return e.get_return_value()
+                return jp.proceed()
+        else:
+            def _real_logic(*a, **kw):
+                try:
+                    before_invoker(None, None, None)
+                except Return as e:
+                    return e.get_return_value()
+                return f(*a, **kw)
+        return _real_logic
+
+    def _real_logic(*a, **kw):
+        jp = JointPoint(f, a, kw) if with_joint_point else None
+        # 执行前置通知
+        for before_invoker in before_invokers:
+            try:
+                before_invoker(jp, None, None)
+            except Return as e:
+                return e.get_return_value()
+
+        # 执行连接点
+        if jp is None:
+            returning = f(*a, **kw)
+        else:
+            returning = jp.proceed()
+
+        # 执行返回通知
+        for after_returning_invoker in after_returning_invokers:
+            try:
+                after_returning_invoker(jp, returning, None)
+            except Return as e:
+                return e.get_return_value()
+        return returning
+    return _real_logic
+
+
+def _generic_logic(f,
+                   with_joint_point,
+                   before_invokers,
+                   around_invokers,
+                   after_returning_invokers,
+                   after_throwing_invokers,
+                   after_invokers):
+    def _real_logic(*a, **kw):
+        jp = JointPoint(f, a, kw) if with_joint_point else None
+        # 执行前置通知
+        for before_invoker in before_invokers:
+            try:
+                before_invoker(jp, None, None)
+            except Return as e:
+                return e.get_return_value()
+
+        # 执行环绕通知
+        around_after_advices = []
+        for around_invoker in around_invokers:
+            try:
+                result = around_invoker(jp, None, None)
+                if callable(result):
+                    around_after_advices.append(result)
+            except Return as e:
+                return e.get_return_value()
+
+        # 执行连接点
+        returning = None
+        exc_info = None
+        try:
+            if jp is None:
+                returning = f(*a, **kw)
+            else:
+                returning = jp.proceed()
+        except:
+            exc_info = sys.exc_info()
+
+        # 执行环绕通知
+        for around_after_advice in around_after_advices:
+            try:
+                around_after_advice(jp, returning, exc_info)
+            except Return as e:
+                return e.get_return_value()
+
+        if exc_info is None:
+            # 执行返回通知
+            for after_returning_invoker in after_returning_invokers:
+                try:
+                    after_returning_invoker(jp, returning, None)
+                except Return as e:
+                    return e.get_return_value()
+        else:
+            # 执行异常通知
+            for after_throwing_invoker in after_throwing_invokers:
+                try:
+                    after_throwing_invoker(jp, None, exc_info)
+                except Return as e:
+                    return e.get_return_value()
+
+        # 执行最终通知
+        for after_invoker in after_invokers:
+            try:
+                after_invoker(jp, returning, exc_info)
+            except Return as e:
+                return e.get_return_value()
+
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+        return returning
+    return _real_logic
+
 
 def wrapper(
         before_advices,
@@ -18,103 +227,161 @@ def wrapper(
         after_returning_advices,
         after_throwing_advices,
         after_advices):
+    """根据通知的组合，为被织入的方法生成专门的调用逻辑"""
+    plan = _compile_all(
+        before_advices,
+        around_advices,
+        after_returning_advices,
+        after_throwing_advices,
+        after_advices)
+    with_joint_point, before_invokers, _, after_returning_invokers, _, _ = plan
+    is_simple = is_simple_shape(
+        around_advices, after_throwing_advices, after_advices)
+
     def _inner(f):
+        if not before_advices and is_simple and not after_returning_advices:
+            return f
+        if is_simple:
+            real_logic = _simple_logic(
+                f, with_joint_point, before_invokers, after_returning_invokers)
+        else:
+            real_logic = _generic_logic(f, *plan)
+        return wraps(f)(real_logic)
+    return _inner
+
+
+if is_tornado_installed:
+    __all__.append("tornado_wrapper")
+
+    import tornado.gen as gen
+
+
+    def _tornado_simple_logic(f, with_joint_point, before_invokers,
+                              after_returning_invokers):
+        @gen.coroutine
         @wraps(f)
         def _real_logic(*a, **kw):
-            jp = JointPoint(f, a, kw)
+            jp = JointPoint(f, a, kw) if with_joint_point else None
             # 执行前置通知
-            for before_advice in before_advices:
-                formal_arguments = inspect.getargspec(before_advice).args
+            for before_invoker in before_invokers:
                 try:
-                    if "joint_point" in formal_arguments:
-                        before_advice(joint_point=jp)
-                    else:
-                        before_advice()
+                    return_value = before_invoker(jp, None, None)
+                    if gen.is_future(return_value):
+                        yield return_value
                 except Return as e:
-                    return e.get_return_value()
+                    raise gen.Return(e.get_return_value())
+
+            # 执行连接点
+            if jp is None:
+                returning = f(*a, **kw)
+            else:
+                returning = jp.proceed()
+            if gen.is_future(returning):
+                returning = yield returning
+
+            # 执行返回通知
+            for after_returning_invoker in after_returning_invokers:
+                try:
+                    return_value = after_returning_invoker(
+                        jp, returning, None)
+                    if gen.is_future(return_value):
+                        yield return_value
+                except Return as e:
+                    raise gen.Return(e.get_return_value())
+            raise gen.Return(returning)
+        return _real_logic
+
+
+    def _tornado_generic_logic(f,
+                               with_joint_point,
+                               before_invokers,
+                               around_invokers,
+                               after_returning_invokers,
+                               after_throwing_invokers,
+                               after_invokers):
+        @gen.coroutine
+        @wraps(f)
+        def _real_logic(*a, **kw):
+            jp = JointPoint(f, a, kw) if with_joint_point else None
+            # 执行前置通知
+            for before_invoker in before_invokers:
+                try:
+                    return_value = before_invoker(jp, None, None)
+                    if gen.is_future(return_value):
+                        yield return_value
+                except Return as e:
+                    raise gen.Return(e.get_return_value())
 
             # 执行环绕通知
             around_after_advices = []
-            for around_advice in around_advices:
-                formal_arguments = inspect.getargspec(around_advice).args
+            for around_invoker in around_invokers:
                 try:
-                    if "joint_point" in formal_arguments:
-                        result = around_advice(joint_point=jp)
+                    return_value = around_invoker(jp, None, None)
+                    if gen.is_future(return_value):
+                        result = yield return_value
                     else:
-                        result = around_advice()
+                        result = return_value
                     if callable(result):
                         around_after_advices.append(result)
                 except Return as e:
-                    return e.get_return_value()
+                    raise gen.Return(e.get_return_value())
 
             # 执行连接点
             returning = None
             exc_info = None
             try:
-                returning = jp.proceed()
+                if jp is None:
+                    returning = f(*a, **kw)
+                else:
+                    returning = jp.proceed()
+                if gen.is_future(returning):
+                    returning = yield returning
             except:
                 exc_info = sys.exc_info()
 
             # 执行环绕通知
             for around_after_advice in around_after_advices:
                 try:
-                    around_after_advice(jp, returning, exc_info)
+                    return_value = around_after_advice(jp, returning, exc_info)
+                    if gen.is_future(return_value):
+                        yield return_value
                 except Return as e:
-                    return e.get_return_value()
+                    raise gen.Return(e.get_return_value())
 
             if exc_info is None:
                 # 执行返回通知
-                for after_returning_advice in after_returning_advices:
-                    formal_arguments = inspect.getargspec(after_returning_advice).args
-                    kwargs = {}
-                    if "joint_point" in formal_arguments:
-                        kwargs["joint_point"] = jp
-                    if "returning" in formal_arguments:
-                        kwargs["returning"] = returning
+                for after_returning_invoker in after_returning_invokers:
                     try:
-                        after_returning_advice(**kwargs)
+                        return_value = after_returning_invoker(
+                            jp, returning, None)
+                        if gen.is_future(return_value):
+                            yield return_value
                     except Return as e:
-                        return e.get_return_value()
+                        raise gen.Return(e.get_return_value())
             else:
                 # 执行异常通知
-                for after_throwing_advice in after_throwing_advices:
-                    formal_arguments = inspect.getargspec(after_throwing_advice).args
-                    kwargs = {}
-                    if "joint_point" in formal_arguments:
-                        kwargs["joint_point"] = jp
-                    if "exc_info" in formal_arguments:
-                        kwargs["exc_info"] = exc_info
+                for after_throwing_invoker in after_throwing_invokers:
                     try:
-                        after_throwing_advice(**kwargs)
+                        return_value = after_throwing_invoker(
+                            jp, None, exc_info)
+                        if gen.is_future(return_value):
+                            yield return_value
                     except Return as e:
-                        return e.get_return_value()
+                        raise gen.Return(e.get_return_value())
 
             # 执行最终通知
-            for after_advice in after_advices:
-                formal_arguments = inspect.getargspec(after_advice).args
-                kwargs = {}
-                if "joint_point" in formal_arguments:
-                    kwargs["joint_point"] = jp
-                if "returning" in formal_arguments:
-                    kwargs["returning"] = returning
-                if "exc_info" in formal_arguments:
-                    kwargs["exc_info"] = exc_info
+            for after_invoker in after_invokers:
                 try:
-                    after_advice(**kwargs)
+                    return_value = after_invoker(jp, returning, exc_info)
+                    if gen.is_future(return_value):
+                        yield return_value
                 except Return as e:
-                    return e.get_return_value()
+                    raise gen.Return(e.get_return_value())
 
             if exc_info is not None:
                 raise exc_info[0], exc_info[1], exc_info[2]
-            return returning
+            raise gen.Return(returning)
         return _real_logic
-    return _inner
-
-
-if is_tornado_installed:
-    __all__.append("tornado_wrapper")
-
-    import tornado.gen as gen
 
 
     def tornado_wrapper(
@@ -123,119 +390,33 @@ if is_tornado_installed:
             after_returning_advices,
             after_throwing_advices,
             after_advices):
+        plan = _compile_all(
+            before_advices,
+            around_advices,
+            after_returning_advices,
+            after_throwing_advices,
+            after_advices)
+        with_joint_point, before_invokers, _, \
+            after_returning_invokers, _, _ = plan
+        is_simple = is_simple_shape(
+            around_advices, after_throwing_advices, after_advices)
+        sync_wrapper = wrapper(
+            before_advices,
+            around_advices,
+            after_returning_advices,
+            after_throwing_advices,
+            after_advices)
+
         def _inner(f):
             if not gen.is_coroutine_function(f):
-                return wrapper(
-                    before_advices,
-                    around_advices,
-                    after_returning_advices,
-                    after_throwing_advices,
-                    after_advices)(f)
-
-            @gen.coroutine
-            @wraps(f)
-            def _real_logic(*a, **kw):
-                jp = JointPoint(f, a, kw)
-                # 执行前置通知
-                for before_advice in before_advices:
-                    formal_arguments = inspect.getargspec(before_advice).args
-                    try:
-                        if "joint_point" in formal_arguments:
-                            return_value = before_advice(joint_point=jp)
-                        else:
-                            return_value = before_advice()
-                        if gen.is_future(return_value):
-                            yield return_value
-                    except Return as e:
-                        raise gen.Return(e.get_return_value())
-
-                # 执行环绕通知
-                around_after_advices = []
-                for around_advice in around_advices:
-                    formal_arguments = inspect.getargspec(around_advice).args
-                    try:
-                        if "joint_point" in formal_arguments:
-                            return_value = around_advice(joint_point=jp)
-                        else:
-                            return_value = around_advice()
-                        if gen.is_future(return_value):
-                            result = yield return_value
-                        else:
-                            result = return_value
-                        if callable(result):
-                            around_after_advices.append(result)
-                    except Return as e:
-                        raise gen.Return(e.get_return_value())
-
-                # 执行连接点
-                returning = None
-                exc_info = None
-                try:
-                    returning = jp.proceed()
-                    if gen.is_future(returning):
-                        returning = yield returning
-                except:
-                    exc_info = sys.exc_info()
-
-                # 执行环绕通知
-                for around_after_advice in around_after_advices:
-                    try:
-                        return_value = around_after_advice(jp, returning, exc_info)
-                        if gen.is_future(return_value):
-                            yield return_value
-                    except Return as e:
-                        raise gen.Return(e.get_return_value())
-
-                if exc_info is None:
-                    # 执行返回通知
-                    for after_returning_advice in after_returning_advices:
-                        formal_arguments = inspect.getargspec(after_returning_advice).args
-                        kwargs = {}
-                        if "joint_point" in formal_arguments:
-                            kwargs["joint_point"] = jp
-                        if "returning" in formal_arguments:
-                            kwargs["returning"] = returning
-                        try:
-                            return_value = after_returning_advice(**kwargs)
-                            if gen.is_future(return_value):
-                                yield return_value
-                        except Return as e:
-                            raise gen.Return(e.get_return_value())
-                else:
-                    # 执行异常通知
-                    for after_throwing_advice in after_throwing_advices:
-                        formal_arguments = inspect.getargspec(after_throwing_advice).args
-                        kwargs = {}
-                        if "joint_point" in formal_arguments:
-                            kwargs["joint_point"] = jp
-                        if "exc_info" in formal_arguments:
-                            kwargs["exc_info"] = exc_info
-                        try:
-                            return_value = after_throwing_advice(**kwargs)
-                            if gen.is_future(return_value):
-                                yield return_value
-                        except Return as e:
-                            raise gen.Return(e.get_return_value())
-
-                # 执行最终通知
-                for after_advice in after_advices:
-                    formal_arguments = inspect.getargspec(after_advice).args
-                    kwargs = {}
-                    if "joint_point" in formal_arguments:
-                        kwargs["joint_point"] = jp
-                    if "returning" in formal_arguments:
-                        kwargs["returning"] = returning
-                    if "exc_info" in formal_arguments:
-                        kwargs["exc_info"] = exc_info
-                    try:
-                        return_value = after_advice(**kwargs)
-                        if gen.is_future(return_value):
-                            yield return_value
-                    except Return as e:
-                        raise gen.Return(e.get_return_value())
-
-                if exc_info is not None:
-                    raise exc_info[0], exc_info[1], exc_info[2]
-                raise gen.Return(returning)
-            return _real_logic
+                return sync_wrapper(f)
+            # 没有通知时不需要再包装一层协程
+            if not before_advices and is_simple and \
+                    not after_returning_advices:
+                return f
+            if is_simple:
+                return _tornado_simple_logic(
+                    f, with_joint_point, before_invokers,
+                    after_returning_invokers)
+            return _tornado_generic_logic(f, *plan)
         return _inner
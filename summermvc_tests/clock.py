@@ -0,0 +1,13 @@
+# coding: utf8
+
+__all__ = ["Clock"]
+__authors__ = ["Tim Chow"]
+
+
+class Clock(object):
+    """测试用的时钟，通过修改 now 控制时间"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -1,8 +1,12 @@
+# coding: utf8
+
 import unittest
 import functools
 
 from summermvc.decorator import *
-from summermvc import BeanFactory, return_value
+from summermvc import BeanFactory, JointPoint, return_value
+from summermvc.joint_point import get_binder
+from summermvc.point_cut import PointCutIndex
 
 
 @component
@@ -51,6 +55,12 @@ class TestAspect(object):
         return_value(returning + 1)
 
 
+@component
+class SubTestComponent(TestComponent):
+    def test_after(self):
+        return 10
+
+
 class TestAop(unittest.TestCase):
     def test_advice(self):
         bean_classes = [TestComponent, TestAspect]
@@ -61,3 +71,73 @@ class TestAop(unittest.TestCase):
         self.assertEqual(test_component.test_after_returning(), 2)
         self.assertEqual(test_component.test_after_throwing(), 1)
         self.assertEqual(test_component.test_after(), 2)
+
+    def test_multiple_factories(self):
+        first = BeanFactory([TestComponent, TestAspect])
+        second = BeanFactory([TestComponent, TestAspect])
+        # 另一个 BeanFactory 不影响已经织入的通知，通知也不会重复织入
+        for factory in (first, second):
+            test_component = factory.get_bean("TestComponent")
+            self.assertEqual(test_component.test_before(), 2)
+            self.assertEqual(test_component.test_around(), 6)
+            self.assertEqual(test_component.test_after(), 2)
+        # 原始的类没有被修改
+        self.assertEqual(TestComponent().test_before(), 1)
+        factory = BeanFactory([TestComponent])
+        self.assertEqual(factory.get_bean("TestComponent").test_before(), 1)
+        self.assertEqual(first.get_bean("TestComponent").test_before(), 2)
+
+    def test_inherited_advice(self):
+        factory = BeanFactory([TestComponent, SubTestComponent, TestAspect])
+        sub_test_component = factory.get_bean("SubTestComponent")
+        self.assertIsInstance(sub_test_component, SubTestComponent)
+        # 继承自父类的方法仍然被织入，覆盖的方法不被织入
+        self.assertEqual(sub_test_component.test_before(), 2)
+        self.assertEqual(sub_test_component.test_after(), 10)
+
+
+class TestJointPoint(unittest.TestCase):
+    @staticmethod
+    def method(self, a, b=2, *args, **kwargs):
+        pass
+
+    def test_get_arguments(self):
+        jp = JointPoint(self.method, ("self", 1), {"c": 3})
+        self.assertEqual(jp.get_arguments(),
+                         {"self": "self", "a": 1, "b": 2,
+                          "args": (), "kwargs": {"c": 3}})
+        jp = JointPoint(self.method, ("self", 1, 2, 3), {"c": 3})
+        self.assertEqual(jp.get_arguments()["args"], (3, ))
+        # 绑定参数不会修改连接点的关键字参数
+        jp = JointPoint(self.method, ("self", ), {"a": 1})
+        self.assertEqual(jp.get_arguments()["a"], 1)
+        self.assertEqual(jp.kwargs, {"a": 1})
+        self.assertRaises(
+            ValueError,
+            JointPoint(self.method, ("self", ), {}).get_arguments)
+
+    def test_binder_cached(self):
+        self.assertIs(get_binder(self.method), get_binder(self.method))
+        self.assertRaises(AttributeError, setattr,
+                          JointPoint(), "extra", 1)
+
+
+class TestPointCutIndex(unittest.TestCase):
+    def test_match(self):
+        index = PointCutIndex()
+        index.add(r"UserDao get_.*", "get")
+        index.add(r"UserDao .*$$", "all")
+        index.add(r"User.* save", "save")
+        index.add(r".* .*", "any")
+        index.add(r"(UserDao|OrderDao) get_user", "alternation")
+
+        self.assertEqual(len(index.candidates("UserDao")), 5)
+        self.assertEqual(len(index.candidates("OrderDao")), 2)
+        self.assertEqual(sorted(index.match("UserDao", "get_user")),
+                         ["all", "alternation", "any", "get"])
+        self.assertEqual(sorted(index.match("UserService", "save")),
+                         ["any", "save"])
+        # 切点需要匹配完整的方法名
+        self.assertEqual(index.match("UserService", "save_all"), ["any"])
+        self.assertEqual(sorted(index.match("OrderDao", "get_user")),
+                         ["alternation", "any"])
@@ -0,0 +1,140 @@
+# coding: utf8
+
+import unittest
+
+from summermvc.decorator import *
+from summermvc import BeanFactory
+
+
+@component
+class UserDao(object):
+    def __init__(self):
+        self.queries = 0
+
+    @memoize(maxsize=2)
+    def get_user(self, user_id, detail=False):
+        self.queries = self.queries + 1
+        return {"id": user_id, "detail": detail}
+
+    @memoize(key=lambda user_id, **kw: user_id)
+    def get_name(self, user_id, **kw):
+        self.queries = self.queries + 1
+        if user_id < 0:
+            raise ValueError("invalid user id")
+        return "user%d" % user_id
+
+    def count(self):
+        return self.queries
+
+
+@component
+class CountingAspectDao(object):
+    def __init__(self):
+        self.queries = 0
+
+    @memoize(ttl=60)
+    def find(self, name):
+        self.queries = self.queries + 1
+        return name.upper()
+
+
+@aspect(1)
+@component
+class CountingAspect(object):
+    calls = 0
+    around_calls = 0
+    returns = 0
+    afters = 0
+
+    @before(r"CountingAspectDao find")
+    def before_find(self):
+        CountingAspect.calls = CountingAspect.calls + 1
+
+    @around(r"CountingAspectDao find")
+    def around_find(self):
+        def _exit(joint_point, returning, exc_info):
+            CountingAspect.around_calls = CountingAspect.around_calls + 1
+        return _exit
+
+    @after_returning(r"CountingAspectDao find")
+    def after_returning_find(self):
+        CountingAspect.returns = CountingAspect.returns + 1
+
+    @after(r"CountingAspectDao find")
+    def after_find(self):
+        CountingAspect.afters = CountingAspect.afters + 1
+
+
+class TestMemoize(unittest.TestCase):
+    def setUp(self):
+        self.factory = BeanFactory([UserDao])
+        self.dao = self.factory.get_bean("UserDao")
+
+    def test_hit(self):
+        self.assertEqual(self.dao.get_user(1), {"id": 1, "detail": False})
+        # 默认值被填充之后 key 相同
+        self.dao.get_user(1, detail=False)
+        self.dao.get_user(user_id=1)
+        self.assertEqual(self.dao.count(), 1)
+        self.dao.get_user(1, True)
+        self.assertEqual(self.dao.count(), 2)
+
+    def test_eviction_and_stats(self):
+        for user_id in [1, 2, 3, 1]:
+            self.dao.get_user(user_id)
+        self.assertEqual(self.dao.count(), 4)
+        stats = self.factory.get_memoize_stats("UserDao")
+        self.assertEqual(sorted(stats), ["get_name", "get_user"])
+        self.assertEqual(stats["get_user"]["evictions"], 2)
+        self.assertEqual(stats["get_user"]["size"], 2)
+
+    def test_custom_key_and_exception(self):
+        self.assertEqual(self.dao.get_name(1, source="db"), "user1")
+        self.assertEqual(self.dao.get_name(1, source="cache"), "user1")
+        self.assertEqual(self.dao.count(), 1)
+        self.assertRaises(ValueError, self.dao.get_name, -1)
+        self.assertRaises(ValueError, self.dao.get_name, -1)
+        self.assertEqual(self.dao.count(), 3)
+
+    def test_invalidate(self):
+        self.dao.get_user(1)
+        self.assertTrue(self.dao.get_user.invalidate(1))
+        self.assertFalse(self.dao.get_user.invalidate(1))
+        self.dao.get_user(1)
+        self.assertEqual(self.dao.count(), 2)
+        self.factory.invalidate_memoized("UserDao", "get_user")
+        self.dao.get_user(1)
+        self.assertEqual(self.dao.count(), 3)
+        self.assertEqual(self.dao.get_user.cache_stats()["hits"], 0)
+
+    def test_multiple_factories(self):
+        self.dao.get_user(1)
+        # 每个 BeanFactory 有各自的缓存
+        another = BeanFactory([UserDao]).get_bean("UserDao")
+        another.get_user(1)
+        another.get_user(1)
+        self.assertEqual(another.count(), 1)
+        self.dao.get_user(1)
+        self.assertEqual(self.dao.count(), 1)
+        self.assertEqual(
+            self.factory.get_memoize_stats("UserDao")["get_user"]["hits"], 1)
+
+    def test_invalid_options(self):
+        self.assertRaises(ValueError, memoize, 0)
+        self.assertRaises(ValueError, memoize, 1, -1)
+        self.assertRaises(ValueError, memoize, 1, None, "key")
+
+
+class TestMemoizeWithAdvice(unittest.TestCase):
+    def test_before_advice(self):
+        factory = BeanFactory([CountingAspectDao, CountingAspect])
+        dao = factory.get_bean("CountingAspectDao")
+        self.assertEqual(dao.find("a"), "A")
+        self.assertEqual(dao.find("a"), "A")
+        self.assertEqual(dao.queries, 1)
+        # 前置通知在缓存之前执行
+        self.assertEqual(CountingAspect.calls, 2)
+        # 命中缓存时跳过其它的环绕通知、返回通知和最终通知
+        self.assertEqual(CountingAspect.around_calls, 1)
+        self.assertEqual(CountingAspect.returns, 1)
+        self.assertEqual(CountingAspect.afters, 1)
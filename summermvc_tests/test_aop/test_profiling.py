@@ -0,0 +1,147 @@
+# coding: utf8
+
+import unittest
+import threading
+
+from summermvc.decorator import *
+from summermvc import BeanFactory, Profiler, profiling, return_value
+from summermvc.joint_point import JointPoint
+from summermvc_tests.clock import Clock
+
+
+CLOCK = Clock()
+PROFILER = Profiler(timer=CLOCK)
+
+
+@component
+class ProfiledDao(object):
+    def get(self, elapsed):
+        CLOCK.now = CLOCK.now + elapsed
+        return elapsed
+
+    def fail(self):
+        CLOCK.now = CLOCK.now + 1
+        raise RuntimeError()
+
+    def cached(self):
+        return "uncached"
+
+
+@profiling(r"ProfiledDao .*", profiler=PROFILER)
+@component
+class DaoProfiler(object):
+    pass
+
+
+@profiling(r"ProfiledDao .*", order=10, profiler=PROFILER)
+@component
+class OuterDaoProfiler(object):
+    pass
+
+
+@aspect(1)
+@component
+class ShortCircuitAspect(object):
+    # 在 OuterDaoProfiler 之后执行，提前返回时 OuterDaoProfiler 收不到通知
+    @around(r"ProfiledDao cached")
+    def around_cached(self):
+        return_value("cached")
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        PROFILER.reset()
+        factory = BeanFactory([ProfiledDao, DaoProfiler])
+        self.dao = factory.get_bean("ProfiledDao")
+
+    def test_snapshot(self):
+        self.assertIs(DaoProfiler.profiler, PROFILER)
+        self.dao.get(2)
+        self.dao.get(4)
+        self.assertRaises(RuntimeError, self.dao.fail)
+        snapshot = PROFILER.snapshot()
+        self.assertEqual(snapshot["ProfiledDao get"],
+                         {"calls": 2, "total_time": 6.0, "max_time": 4.0,
+                          "mean_time": 3.0, "exceptions": 0})
+        self.assertEqual(snapshot["ProfiledDao fail"]["exceptions"], 1)
+        PROFILER.reset()
+        self.assertEqual(PROFILER.snapshot(), {})
+
+    def test_threads(self):
+        threads = [threading.Thread(target=self.dao.get, args=(0, ))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.dao.get(0)
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"]["calls"], 5)
+        # 已经结束的线程的计数器只被合并一次
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"]["calls"], 5)
+        PROFILER.reset()
+        self.assertEqual(PROFILER.snapshot(), {})
+
+    def test_reset_running_thread(self):
+        called = threading.Event()
+        resetted = threading.Event()
+
+        def _run():
+            self.dao.get(1)
+            called.set()
+            resetted.wait()
+            self.dao.get(2)
+        thread = threading.Thread(target=_run)
+        thread.start()
+        called.wait()
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"]["calls"], 1)
+        # 运行中的线程在下一次记录时清空自己的计数器
+        PROFILER.reset()
+        self.assertEqual(PROFILER.snapshot(), {})
+        resetted.set()
+        thread.join()
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"],
+                         {"calls": 1, "total_time": 2.0, "max_time": 2.0,
+                          "mean_time": 2.0, "exceptions": 0})
+
+    def test_interleaved_calls(self):
+        # 协程交错执行时，先开始的调用可能先结束
+        first = JointPoint(ProfiledDao.get)
+        second = JointPoint(ProfiledDao.get)
+        exit_first = PROFILER.enter(first)
+        CLOCK.now = CLOCK.now + 1
+        exit_second = PROFILER.enter(second)
+        CLOCK.now = CLOCK.now + 2
+        exit_first(first, None, None)
+        CLOCK.now = CLOCK.now + 4
+        exit_second(second, None, None)
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"],
+                         {"calls": 2, "total_time": 9.0, "max_time": 6.0,
+                          "mean_time": 4.5, "exceptions": 0})
+
+    def test_short_circuit(self):
+        factory = BeanFactory(
+            [ProfiledDao, OuterDaoProfiler, ShortCircuitAspect])
+        dao = factory.get_bean("ProfiledDao")
+        self.assertEqual(dao.cached(), "cached")
+        dao.get(1)
+        self.assertEqual(PROFILER.snapshot().keys(), ["ProfiledDao get"])
+        dao.get(1)
+        self.assertEqual(PROFILER.snapshot()["ProfiledDao get"]["calls"], 2)
+
+    def test_pending_overflow(self):
+        # 提前返回留下的记录超过上限时，只丢弃最早的记录
+        points = [JointPoint(ProfiledDao.cached)
+                  for _ in range(Profiler.MAX_PENDING - 1)]
+        for point in points:
+            PROFILER.enter(point)
+        pending = JointPoint(ProfiledDao.get)
+        exit_pending = PROFILER.enter(pending)
+        for _ in range(10):
+            PROFILER.enter(JointPoint(ProfiledDao.cached))
+        CLOCK.now = CLOCK.now + 3
+        exit_pending(pending, None, None)
+        exit_pending(points[0], None, None)
+        exit_pending(points[-1], None, None)
+        snapshot = PROFILER.snapshot()
+        self.assertEqual(snapshot["ProfiledDao get"]["total_time"], 3.0)
+        self.assertEqual(snapshot["ProfiledDao cached"]["calls"], 1)
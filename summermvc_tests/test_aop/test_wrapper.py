@@ -0,0 +1,103 @@
+# coding: utf8
+
+import unittest
+import inspect
+
+import summermvc.wrapper as wrapper_module
+from summermvc.wrapper import wrapper, compile_advices
+from summermvc.exception import Return
+
+
+class TestWrapper(unittest.TestCase):
+    def test_compile_advices(self):
+        calls = []
+
+        def only_returning(returning):
+            calls.append(("returning", returning))
+
+        def everything(exc_info, returning, joint_point):
+            calls.append(("everything", joint_point, returning, exc_info))
+
+        def nothing():
+            calls.append(("nothing", ))
+
+        invokers = compile_advices(
+            [only_returning, everything, nothing],
+            ("joint_point", "returning", "exc_info"))
+        for invoker in invokers:
+            invoker("jp", 1, None)
+        self.assertEqual(calls, [("returning", 1),
+                                 ("everything", "jp", 1, None),
+                                 ("nothing", )])
+
+        # 不被接受的参数不会传给通知
+        invokers = compile_advices([everything], ("joint_point", ))
+        self.assertRaises(TypeError, invokers[0], "jp", 1, None)
+
+    def test_no_inspection_per_call(self):
+        calls = []
+
+        def before_advice(joint_point):
+            calls.append(joint_point.args)
+
+        def after_advice(returning, exc_info):
+            calls.append((returning, exc_info))
+
+        woven = wrapper([before_advice], [], [], [], [after_advice])(
+            lambda a, b=2: a + b)
+        original = inspect.getargspec
+        inspect.getargspec = None
+        try:
+            self.assertEqual(woven(1), 3)
+            self.assertEqual(woven(1, b=3), 4)
+        finally:
+            inspect.getargspec = original
+        self.assertEqual(calls, [(1, ), (3, None), (1, ), (4, None)])
+
+    def test_joint_point_only_when_needed(self):
+        calls = []
+
+        def before_advice():
+            calls.append("before")
+
+        def after_advice(returning):
+            calls.append(returning)
+
+        original = wrapper_module.JointPoint
+        wrapper_module.JointPoint = None
+        try:
+            woven = wrapper([before_advice], [], [], [], [after_advice])(
+                lambda a, b=2: a + b)
+            self.assertEqual(woven(1, b=3), 4)
+        finally:
+            wrapper_module.JointPoint = original
+        self.assertEqual(calls, ["before", 4])
+
+    def test_simple_shapes(self):
+        calls = []
+
+        def short_circuit(joint_point):
+            if joint_point.args[0] < 0:
+                raise Return("negative")
+
+        def after_returning(returning):
+            calls.append(returning)
+
+        def target(a):
+            if a == 0:
+                raise ZeroDivisionError()
+            return a
+
+        woven = wrapper([short_circuit], [], [], [], [])(target)
+        self.assertEqual(woven.__name__, "target")
+        self.assertEqual(woven(1), 1)
+        self.assertEqual(woven(-1), "negative")
+
+        woven = wrapper([short_circuit], [], [after_returning], [], [])(target)
+        self.assertEqual(woven(2), 2)
+        self.assertEqual(woven(-1), "negative")
+        # 连接点抛出的异常直接传播，不执行返回通知
+        self.assertRaises(ZeroDivisionError, woven, 0)
+        self.assertEqual(calls, [2])
+
+        self.assertIs(wrapper([], [], [], [], [])(target), target)
@@ -0,0 +1,121 @@
+import unittest
+
+from summermvc.decorator import *
+from summermvc.mvc import *
+
+
+def make_request():
+    request = Request()
+    request.query_string = Request.parse_query_string("id=1&tag=a&tag=b")
+    request.headers = {"X-Token": "token"}
+    request.cookies = {"session": "abc"}
+    request.body = "body"
+    return request
+
+
+class TestArgumentBinder(unittest.TestCase):
+    def test_bind(self):
+        @request_mapping(r"/user/(?P<name>\w+)")
+        def handler(self, request, response, model, model_and_view,
+                    request_body, arg_id, args_tag, path_var_name,
+                    header_x_token, cookie_session, exc):
+            pass
+
+        request, response, mv = make_request(), Response(), ModelAndView()
+        args = get_request_mapping(handler)["binder"].bind(
+            request, response, mv, {"name": "tim"})
+        self.assertEqual(args, (request, response, mv.model, mv, "body",
+                                "1", ["a", "b"], "tim", "token", "abc",
+                                None))
+
+    def test_defaults(self):
+        @request_mapping("/")
+        def handler(self, arg_absent="a", args_absent=None,
+                    path_var_absent=1, header_absent=2, cookie_absent=3):
+            pass
+
+        args = get_request_mapping(handler)["binder"].bind(
+            make_request(), Response(), ModelAndView(), {})
+        self.assertEqual(args, ("a", None, 1, 2, 3))
+
+    def test_missing_argument(self):
+        @request_mapping("/")
+        def handler(self, arg_absent):
+            pass
+
+        self.assertRaises(
+            MissingArgumentError,
+            get_request_mapping(handler)["binder"].bind,
+            make_request(), Response(), ModelAndView(), {})
+
+    def test_invalid_argument_is_reported_at_decoration(self):
+        def handler(self, unknown):
+            pass
+        self.assertRaises(InvalidArgumentError,
+                          request_mapping("/"), handler)
+
+        def handler(self, arg_):
+            pass
+        self.assertRaises(InvalidArgumentError,
+                          exception_handler("/", ValueError), handler)
+
+    def test_inferred_conversion(self):
+        @request_mapping("/")
+        def handler(self, arg_id=0, args_tag=None, arg_flag=False,
+                    arg_absent=1.5):
+            pass
+
+        request = make_request()
+        request.query_string.update(
+            Request.parse_query_string("flag=yes"))
+        args = get_request_mapping(handler)["binder"].bind(
+            request, Response(), ModelAndView(), {})
+        self.assertEqual(args, (1, ["a", "b"], True, 1.5))
+
+    def test_inferred_list_conversion(self):
+        @request_mapping("/")
+        def handler(self, arg_ids=[0], arg_names=[], args_id=[0]):
+            pass
+
+        request = make_request()
+        request.query_string.update(
+            Request.parse_query_string("ids=1,2&names=a,b"))
+        args = get_request_mapping(handler)["binder"].bind(
+            request, Response(), ModelAndView(), {})
+        self.assertEqual(args, ([1, 2], ["a", "b"], [1]))
+
+    def test_explicit_conversion(self):
+        @request_mapping(r"/(?P<id>\d+)",
+                         converters={"path_var_id": int,
+                                     "arg_ids": [int],
+                                     "args_num": float})
+        def handler(self, path_var_id, arg_ids, args_num):
+            pass
+
+        request = Request()
+        request.query_string = Request.parse_query_string(
+            "ids=1,2,3&num=1&num=2.5")
+        args = get_request_mapping(handler)["binder"].bind(
+            request, Response(), ModelAndView(), {"id": "7"})
+        self.assertEqual(args, (7, [1, 2, 3], [1.0, 2.5]))
+
+    def test_conversion_error(self):
+        @request_mapping("/", converters={"arg_tag": int})
+        def handler(self, arg_tag):
+            pass
+
+        with self.assertRaises(ArgumentConversionError) as cm:
+            get_request_mapping(handler)["binder"].bind(
+                make_request(), Response(), ModelAndView(), {})
+        self.assertEqual(cm.exception.argument, "arg_tag")
+        self.assertEqual(cm.exception.value, "a")
+
+    def test_invalid_converter_is_reported_at_decoration(self):
+        def handler(self, arg_id):
+            pass
+        self.assertRaises(InvalidArgumentError,
+                          request_mapping("/", converters={"arg_x": int}),
+                          handler)
+        self.assertRaises(InvalidArgumentError,
+                          request_mapping("/", converters={"arg_id": 1}),
+                          handler)
@@ -0,0 +1,85 @@
+# coding: utf8
+
+import unittest
+import zlib
+
+from summermvc.mvc import *
+
+
+def make_request(accept_encoding):
+    request = Request()
+    request.headers = {"Accept-Encoding": accept_encoding}
+    return request
+
+
+def make_response(content_type="application/json; charset=UTF-8"):
+    response = Response()
+    response.add_header("Content-Type", content_type)
+    return response
+
+
+class TestResponseCompressor(unittest.TestCase):
+    def setUp(self):
+        self.compressor = ResponseCompressor(min_size=10)
+
+    def test_negotiate(self):
+        negotiate = ResponseCompressor.negotiate
+        self.assertEqual(negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate("deflate, gzip;q=0.5"), "deflate")
+        self.assertEqual(negotiate("gzip;q=0, deflate"), "deflate")
+        self.assertEqual(negotiate("*"), "gzip")
+        self.assertIsNone(negotiate("br"))
+        self.assertIsNone(negotiate(""))
+
+    def test_is_compressible(self):
+        self.assertTrue(self.compressor.is_compressible("text/html"))
+        self.assertTrue(self.compressor.is_compressible(
+            "application/json; charset=UTF-8"))
+        self.assertFalse(self.compressor.is_compressible("image/png"))
+        self.assertFalse(self.compressor.is_compressible(None))
+
+    def test_buffered(self):
+        body = "x" * 100
+        response = make_response()
+        response.add_header("ETag", '"abc"')
+        compressed = self.compressor.compress_response(
+            make_request("gzip"), response, body)
+        self.assertEqual(zlib.decompress(compressed, 16 + zlib.MAX_WBITS),
+                         body)
+        self.assertEqual(response.get_header("Content-Encoding"), "gzip")
+        self.assertEqual(response.get_header("Content-Length"),
+                         str(len(compressed)))
+        self.assertEqual(response.get_header("Vary"), "Accept-Encoding")
+        self.assertEqual(response.get_header("ETag"), 'W/"abc"')
+
+    def test_not_compressed(self):
+        for request, response, body in [
+                (make_request("gzip"), make_response(), "short"),
+                (make_request("gzip"), make_response("image/png"), "x" * 100),
+                (make_request("identity"), make_response(), "x" * 100)]:
+            self.assertIs(self.compressor.compress_response(
+                request, response, body), body)
+            self.assertIsNone(response.get_header("Content-Encoding"))
+
+    def test_stream(self):
+        chunks = ["x" * 100, "y" * 100]
+        response = make_response()
+        compressed = self.compressor.compress_response(
+            make_request("deflate"), response, iter(chunks))
+        self.assertEqual(zlib.decompress("".join(compressed)),
+                         "".join(chunks))
+        self.assertEqual(response.get_header("Content-Encoding"), "deflate")
+
+    def test_stream_chunks_are_flushed(self):
+        def chunks():
+            yield "x" * 100
+            # 第一块被解压之前，生成器不能继续执行
+            self.assertEqual(decompressor.decompress(first), "x" * 100)
+            yield "y" * 100
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        compressed = self.compressor.compress_response(
+            make_request("gzip"), make_response(), chunks())
+        first = next(compressed)
+        rest = "".join(compressed)
+        self.assertEqual(decompressor.decompress(rest), "y" * 100)
@@ -0,0 +1,372 @@
+# coding: utf8
+
+import unittest
+import json
+import zlib
+from StringIO import StringIO
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.mvc import *
+
+
+@rest_controller
+class DispatcherTestController(object):
+    @request_mapping("/hello", method=RequestMethod.GET)
+    def hello(self, model, arg_name="world"):
+        model.add_attribute("hello", arg_name)
+
+    @request_mapping("/hello", method=RequestMethod.POST)
+    def post_hello(self, model):
+        model.add_attribute("posted", True)
+
+    @request_mapping("/echo", method=RequestMethod.POST)
+    def echo(self, request, model):
+        model.add_attribute("size", sum(len(chunk)
+                                        for chunk in request.iter_body()))
+
+    @request_mapping("/versioned")
+    def versioned(self, response, model):
+        response.set_etag("v1")
+        model.add_attribute("version", 1)
+
+    @request_mapping("/tagged", etag="weak")
+    def tagged(self, model):
+        model.add_attribute("tagged", True)
+
+    @request_mapping("/count")
+    def count(self, model, arg_n=0):
+        model.add_attribute("next", arg_n + 1)
+
+    @request_mapping("/upload", method=RequestMethod.POST)
+    def upload(self, model, arg_x, request_body=None):
+        model.add_attribute("x", arg_x)
+        model.add_attribute("size", len(request_body))
+
+
+def call(application, uri, method="GET", query_string="", body="",
+         headers=None):
+    environment = {
+        "PATH_INFO": uri,
+        "REQUEST_METHOD": method,
+        "QUERY_STRING": query_string,
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": StringIO(body),
+    }
+    for name, value in (headers or {}).iteritems():
+        key = name.upper().replace("-", "_")
+        if key != "CONTENT_TYPE":
+            key = "HTTP_" + key
+        environment[key] = value
+    result = {}
+
+    def start_response(status, headers):
+        result["status"] = status
+        result["headers"] = dict(headers)
+    result["body"] = "".join(application(environment, start_response))
+    return result
+
+
+class TestDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.application = DispatcherApplication(
+            ApplicationContext([DispatcherTestController]))
+
+    def test_dispatch(self):
+        result = call(self.application, "/hello", query_string="name=tim")
+        self.assertEqual(result["status"], "200 OK")
+        self.assertEqual(json.loads(result["body"]), {"hello": "tim"})
+
+    def test_not_found(self):
+        result = call(self.application, "/absent")
+        self.assertEqual(result["status"], "404 NotFound")
+
+    def test_method_not_allowed(self):
+        result = call(self.application, "/hello", method="DELETE")
+        self.assertEqual(result["status"], "405 MethodNotAllowed")
+        self.assertEqual(result["headers"]["Allow"], "GET, POST")
+
+    def test_form_limit_exceeded(self):
+        result = call(self.application, "/hello",
+                      query_string="&".join(["a=1"] * 10001))
+        self.assertEqual(result["status"], "400 BadRequest")
+
+    def test_form_binding(self):
+        result = call(self.application, "/count", method="POST",
+                      body="n=1",
+                      headers={"Content-Type":
+                               "application/x-www-form-urlencoded"})
+        self.assertEqual(json.loads(result["body"]), {"next": 2})
+
+    def test_form_and_request_body(self):
+        body = "--b\r\n" \
+               "Content-Disposition: form-data; name=\"x\"\r\n\r\n" \
+               "1\r\n" \
+               "--b--\r\n"
+        # 表单字段已经读取了请求体，handler 仍然可以得到原始的请求体
+        result = call(self.application, "/upload", method="POST",
+                      body=body,
+                      headers={"Content-Type":
+                               "multipart/form-data; boundary=b"})
+        self.assertEqual(result["status"], "200 OK")
+        self.assertEqual(json.loads(result["body"]),
+                         {"x": "1", "size": len(body)})
+
+    def test_argument_conversion(self):
+        result = call(self.application, "/count", query_string="n=41")
+        self.assertEqual(json.loads(result["body"]), {"next": 42})
+        result = call(self.application, "/count", query_string="n=x")
+        self.assertEqual(result["status"], "400 BadRequest")
+        self.assertEqual(json.loads(result["body"])["argument"], "arg_n")
+
+
+class LazyRequestDispatcherConfigurer(DefaultDispatcherConfigurer):
+    @property
+    def request_class(self):
+        return LazyRequest
+
+    @property
+    def max_body_size(self):
+        return 8
+
+
+class FormLazyRequestDispatcherConfigurer(LazyRequestDispatcherConfigurer):
+    @property
+    def max_body_size(self):
+        return 1024
+
+
+class TestLazyRequestDispatcher(TestDispatcher):
+    def setUp(self):
+        self.application = DispatcherApplication(
+            ApplicationContext([DispatcherTestController]))
+        self.application.configurer = LazyRequestDispatcherConfigurer()
+
+    def test_max_body_size(self):
+        result = call(self.application, "/echo", method="POST", body="body")
+        self.assertEqual(json.loads(result["body"]), {"size": 4})
+        result = call(self.application, "/echo", method="POST",
+                      body="too large body")
+        self.assertEqual(result["status"], "413 RequestEntityTooLarge")
+
+    def test_form_and_request_body(self):
+        self.application.configurer = FormLazyRequestDispatcherConfigurer()
+        TestDispatcher.test_form_and_request_body(self)
+
+
+class StreamingDispatcherConfigurer(DefaultDispatcherConfigurer):
+    @property
+    def stream_response(self):
+        return True
+
+
+class TestStreamingDispatcher(TestDispatcher):
+    def setUp(self):
+        self.application = DispatcherApplication(
+            ApplicationContext([DispatcherTestController]))
+        self.application.configurer = StreamingDispatcherConfigurer()
+
+    def test_dispatch(self):
+        TestDispatcher.test_dispatch(self)
+        result = call(self.application, "/hello")
+        self.assertNotIn("Content-Length", result["headers"])
+
+
+class ETagDispatcherConfigurer(DefaultDispatcherConfigurer):
+    @property
+    def etag(self):
+        return True
+
+
+class TestETag(unittest.TestCase):
+    def setUp(self):
+        self.application = DispatcherApplication(
+            ApplicationContext([DispatcherTestController]))
+
+    def test_handler_provided_etag(self):
+        result = call(self.application, "/versioned")
+        self.assertEqual(result["headers"]["Etag"], '"v1"')
+        self.assertEqual(json.loads(result["body"]), {"version": 1})
+        result = call(self.application, "/versioned",
+                      headers={"If-None-Match": 'W/"v0", W/"v1"'})
+        self.assertEqual(result["status"], "304 NotModified")
+        self.assertEqual(result["body"], "")
+        self.assertNotIn("Content-Length", result["headers"])
+
+    def test_body_etag(self):
+        self.assertNotIn("Etag", call(self.application, "/hello")["headers"])
+        etag = call(self.application, "/tagged")["headers"]["Etag"]
+        self.assertTrue(etag.startswith('W/"'))
+        result = call(self.application, "/tagged",
+                      headers={"If-None-Match": etag})
+        self.assertEqual(result["status"], "304 NotModified")
+        result = call(self.application, "/tagged", method="POST",
+                      headers={"If-None-Match": etag})
+        self.assertEqual(result["status"], "200 OK")
+
+    def test_global_etag(self):
+        self.application.configurer = ETagDispatcherConfigurer()
+        etag = call(self.application, "/hello")["headers"]["Etag"]
+        self.assertTrue(etag.startswith('"'))
+        result = call(self.application, "/hello",
+                      headers={"If-None-Match": etag})
+        self.assertEqual(result["status"], "304 NotModified")
+        self.assertNotEqual(
+            etag,
+            call(self.application, "/hello",
+                 query_string="name=tim")["headers"]["Etag"])
+
+
+class CompressingDispatcherConfigurer(DefaultDispatcherConfigurer):
+    def __init__(self, stream_response):
+        self._stream_response = stream_response
+        self._response_compressor = ResponseCompressor(min_size=0)
+
+    @property
+    def stream_response(self):
+        return self._stream_response
+
+    @property
+    def response_compressor(self):
+        return self._response_compressor
+
+
+class TestCompression(unittest.TestCase):
+    def test_compression(self):
+        application = DispatcherApplication(
+            ApplicationContext([DispatcherTestController]))
+        for stream_response in [False, True]:
+            application.configurer = CompressingDispatcherConfigurer(
+                stream_response)
+            result = call(application, "/hello",
+                          headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(result["headers"]["Content-Encoding"], "gzip")
+            body = zlib.decompress(result["body"], 16 + zlib.MAX_WBITS)
+            self.assertEqual(json.loads(body), {"hello": "world"})
+
+            result = call(application, "/hello")
+            self.assertNotIn("Content-Encoding", result["headers"])
+            self.assertEqual(json.loads(result["body"]), {"hello": "world"})
+
+
+class CachingDispatcherConfigurer(DefaultDispatcherConfigurer):
+    @property
+    def handler_cache_size(self):
+        return 2
+
+
+@rest_controller
+class LateController(object):
+    @request_mapping("/late")
+    def late(self, model):
+        model.add_attribute("late", True)
+
+
+@rest_controller(is_singleton=False)
+class PrototypeController(object):
+    @request_mapping("/prototype")
+    def prototype(self, model):
+        model.add_attribute("prototype", True)
+
+
+class TestHandlerCache(unittest.TestCase):
+    def setUp(self):
+        self.ctx = ApplicationContext([DispatcherTestController])
+        self.application = DispatcherApplication(self.ctx)
+        self.application.configurer = CachingDispatcherConfigurer()
+
+    def test_handler_cache(self):
+        call(self.application, "/hello")
+        result = call(self.application, "/hello", query_string="name=tim")
+        self.assertEqual(json.loads(result["body"]), {"hello": "tim"})
+        handler_cache = self.application.handler_cache
+        self.assertEqual((handler_cache.hits, handler_cache.misses), (1, 1))
+
+        # 缓存的 handler 不可修改
+        chain = self.application.get_execution_chain(
+            Request.from_wsgi_environment(
+                {"PATH_INFO": "/hello", "REQUEST_METHOD": "GET"},
+                self.ctx))
+        self.assertTrue(chain.handler.frozen)
+        self.assertRaises(TypeError, chain.handler.matches.update, {})
+
+        # 找不到 handler 时不缓存
+        call(self.application, "/absent")
+        call(self.application, "/absent")
+        self.assertEqual(len(handler_cache), 1)
+
+    def test_prototype_handler_is_not_cached(self):
+        self.ctx.add_bean(PrototypeController)
+        controllers = [self.application.get_execution_chain(
+            Request.from_wsgi_environment(
+                {"PATH_INFO": "/prototype", "REQUEST_METHOD": "GET"},
+                self.ctx)).handler.page_handler.__self__ for _ in range(2)]
+        self.assertIsNot(controllers[0], controllers[1])
+        self.assertEqual(len(self.application.handler_cache), 0)
+        result = call(self.application, "/prototype")
+        self.assertEqual(result["status"], "200 OK")
+
+    def test_add_bean_invalidates_handler_cache(self):
+        call(self.application, "/hello")
+        handler_cache = self.application.handler_cache
+        self.ctx.add_bean(LateController)
+        self.assertIsNot(handler_cache, self.application.handler_cache)
+        result = call(self.application, "/late")
+        self.assertEqual(json.loads(result["body"]), {"late": True})
+
+
+class PathInterceptor(HandlerInterceptor):
+    def __init__(self, path_pattern, order):
+        self._path_pattern = path_pattern
+        self._order = order
+
+    def pre_handle(self, request, response, model_and_view):
+        pass
+
+    def post_handle(self, request, response, model_and_view):
+        pass
+
+    def path_pattern(self):
+        return self._path_pattern
+
+    def get_order(self):
+        return self._order
+
+
+class TestInterceptorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.all = PathInterceptor(r"/.*", 1)
+        self.admin = PathInterceptor(r"/admin/", 2)
+        self.json = PathInterceptor(r".*\.json$", 3)
+        self.registry = InterceptorRegistry(
+            [self.all, self.admin, self.json])
+
+    def test_sorted_by_order(self):
+        self.assertEqual(self.registry.get_interceptors("/admin/a.json"),
+                         (self.json, self.admin, self.all))
+
+    def test_static_plan(self):
+        is_static, interceptors = self.registry.plan(r"/admin/user$")
+        self.assertTrue(is_static)
+        self.assertEqual(interceptors, (self.admin, self.all))
+
+        is_static, entries = self.registry.plan(r"/admin/(\d+)$")
+        self.assertFalse(is_static)
+        self.assertEqual([(i, regex is None) for i, regex in entries],
+                         [(self.json, False),
+                          (self.admin, True),
+                          (self.all, True)])
+
+        is_static, interceptors = self.registry.plan(r"/user/(\d+)$")
+        self.assertFalse(is_static)
+        self.assertEqual([i for i, regex in interceptors if regex is None],
+                         [self.all])
+
+    def test_plan_agrees_with_matching(self):
+        for uri_pattern, uri in [(r"/admin/(\d+)$", "/admin/1"),
+                                 (r"/(\w+)\.json$", "/a.json"),
+                                 (r"/adm(\w+)$", "/admin"),
+                                 (r"/get/user$", "/get/user")]:
+            self.assertEqual(
+                self.registry.get_interceptors(uri, uri_pattern),
+                self.registry.get_interceptors(uri))
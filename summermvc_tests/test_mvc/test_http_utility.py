@@ -0,0 +1,147 @@
+# coding: utf8
+
+import unittest
+from StringIO import StringIO
+
+from summermvc.mvc import *
+
+
+def make_environment(**kwargs):
+    environment = {
+        "PATH_INFO": "/path",
+        "REQUEST_METHOD": "POST",
+        "QUERY_STRING": "a=1&a=2&b=%20",
+        "CONTENT_TYPE": "text/plain; charset=utf8",
+        "CONTENT_LENGTH": "4",
+        "HTTP_X_FORWARDED_FOR": "10.0.0.1",
+        "HTTP_COOKIE": "session=abc",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "wsgi.input": StringIO("body"),
+    }
+    environment.update(kwargs)
+    return environment
+
+
+class TestLazyRequest(unittest.TestCase):
+    def test_same_as_request(self):
+        eager = Request.from_wsgi_environment(make_environment(), None)
+        lazy = LazyRequest.from_wsgi_environment(make_environment(), None)
+        for name in ["uri", "request_method", "content_length", "body",
+                     "content_type", "content_type_attributes",
+                     "query_string", "user_agent", "headers", "cookies",
+                     "remote_addr", "server_port", "protocol"]:
+            self.assertEqual(getattr(eager, name), getattr(lazy, name))
+
+    def test_parse_on_first_access(self):
+        environment = make_environment()
+        request = LazyRequest.from_wsgi_environment(environment, None)
+        self.assertEqual(request.get_header("x-forwarded-for"), "10.0.0.1")
+        self.assertIsNone(request.get_header_or_default("Cookie"))
+        self.assertRaises(KeyError, request.get_header, "X-Absent")
+        self.assertEqual(request.get_arguments("a"), ["1", "2"])
+        self.assertEqual(environment["wsgi.input"].tell(), 0)
+        self.assertEqual(request.body, "body")
+        self.assertEqual(request.body, "body")
+
+    def test_setters(self):
+        request = LazyRequest.from_wsgi_environment(make_environment(), None)
+        request.headers = {"X-Token": "token"}
+        request.query_string = {}
+        self.assertEqual(request.get_header("x-token"), "token")
+        self.assertIsNone(request.get_header_or_default("X-Forwarded-For"))
+        self.assertRaises(MissingArgumentError, request.get_argument, "a")
+
+
+class TestRequestBody(unittest.TestCase):
+    def test_lazy_body(self):
+        environment = make_environment(CONTENT_LENGTH="3")
+        request = Request.from_wsgi_environment(environment, None)
+        self.assertEqual(environment["wsgi.input"].tell(), 0)
+        self.assertEqual(request.body, "bod")
+
+    def test_iter_body_and_readinto(self):
+        request = Request.from_wsgi_environment(make_environment(), None)
+        self.assertEqual(list(request.iter_body(3)), ["bod", "y"])
+        self.assertRaises(RuntimeError, getattr, request, "body")
+
+        request = LazyRequest.from_wsgi_environment(make_environment(), None)
+        buffer = bytearray(3)
+        self.assertEqual(request.readinto(buffer), 3)
+        self.assertEqual(str(buffer), "bod")
+        self.assertEqual(request.readinto(buffer), 1)
+        self.assertEqual(request.readinto(buffer), 0)
+
+        request = Request()
+        request.body = "body"
+        self.assertEqual("".join(request.iter_body(1)), "body")
+        self.assertEqual(request.body, "body")
+
+    def test_chunked(self):
+        environment = make_environment(
+            HTTP_TRANSFER_ENCODING="chunked",
+            **{"wsgi.input": StringIO("3;ext=1\r\nbod\r\n"
+                                      "1\r\ny\r\n0\r\nX-Trailer: 1\r\n\r\n")})
+        environment.pop("CONTENT_LENGTH")
+        request = Request.from_wsgi_environment(environment, None)
+        self.assertEqual(request.body, "body")
+
+        environment["wsgi.input"] = StringIO("zz\r\n")
+        request = Request.from_wsgi_environment(environment, None)
+        self.assertRaises(InvalidRequestBodyError, getattr, request, "body")
+
+        # 负数的 chunk size 不能被当作 "读取剩余的全部数据"
+        environment["wsgi.input"] = StringIO("-1\r\nbody\r\n0\r\n\r\n")
+        request = Request.from_wsgi_environment(environment, None)
+        self.assertRaises(InvalidRequestBodyError,
+                          next, request.iter_body(2))
+
+    def test_max_body_size(self):
+        request = Request.from_wsgi_environment(make_environment(), None, 3)
+        self.assertRaises(RequestEntityTooLargeError, getattr, request, "body")
+
+        environment = make_environment(
+            HTTP_TRANSFER_ENCODING="chunked",
+            **{"wsgi.input": StringIO("2\r\nbo\r\n2\r\ndy\r\n0\r\n\r\n")})
+        request = Request.from_wsgi_environment(environment, None, 3)
+        chunks = request.iter_body(2)
+        self.assertEqual(next(chunks), "bo")
+        self.assertRaises(RequestEntityTooLargeError, next, chunks)
+
+
+class TestRequestForm(unittest.TestCase):
+    def test_urlencoded(self):
+        request = Request.from_wsgi_environment(make_environment(
+            CONTENT_TYPE="application/x-www-form-urlencoded",
+            CONTENT_LENGTH="11",
+            **{"wsgi.input": StringIO("a=3&c=x+y&d")}), None)
+        self.assertEqual(request.get_arguments("a"), ["1", "2", "3"])
+        self.assertEqual(request.get_argument("a"), "1")
+        self.assertEqual(request.get_argument("c"), "x y")
+        self.assertRaises(MissingArgumentError, request.get_argument, "d")
+        self.assertIs(request.form, request.form)
+        self.assertEqual(request.files, {})
+
+    def test_multipart(self):
+        body = "--b\r\n" \
+               "Content-Disposition: form-data; name=\"c\"\r\n\r\n" \
+               "field\r\n" \
+               "--b\r\n" \
+               "Content-Disposition: form-data; name=\"f\"; " \
+               "filename=\"f.txt\"\r\n\r\n" \
+               "file\r\n" \
+               "--b--\r\n"
+        request = LazyRequest.from_wsgi_environment(make_environment(
+            CONTENT_TYPE="multipart/form-data; boundary=b",
+            CONTENT_LENGTH=str(len(body)),
+            **{"wsgi.input": StringIO(body)}), None)
+        self.assertEqual(request.get_argument("c"), "field")
+        self.assertRaises(MissingArgumentError, request.get_argument, "f")
+        self.assertEqual(request.files["f"].file.read(), "file")
+        request.close()
+
+    def test_query_string_does_not_parse_body(self):
+        environment = make_environment(
+            CONTENT_TYPE="application/x-www-form-urlencoded")
+        request = LazyRequest.from_wsgi_environment(environment, None)
+        self.assertEqual(request.get_argument("a"), "1")
+        self.assertEqual(environment["wsgi.input"].tell(), 0)
@@ -0,0 +1,109 @@
+# coding: utf8
+
+import unittest
+import json
+import datetime
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.mvc import *
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class SubModel(Model):
+    pass
+
+
+def baseline_default(obj):
+    # 以前的 JsonView 使用的 default
+    if isinstance(obj, Model):
+        return obj.as_map()
+    if isinstance(obj, datetime.date):
+        return obj.strftime("%Y-%m-%d")
+    if isinstance(obj, datetime.time):
+        return obj.strftime("%H:%M:%S")
+    raise TypeError("%r is not JSON serializable" % obj)
+
+
+@rest_controller
+class JsonController(object):
+    pass
+
+
+class OptInConfigurer(DefaultDispatcherConfigurer):
+    encoder = StdlibJsonEncoder()
+
+    @property
+    def json_encoder(self):
+        return self.encoder
+
+
+class TestJsonEncoder(unittest.TestCase):
+    def test_encode(self):
+        model = SubModel()
+        model.add_attribute("datetime",
+                            datetime.datetime(2018, 1, 2, 3, 4, 5, 6))
+        model.add_attribute("date", datetime.date(2018, 1, 2))
+        model.add_attribute("time", datetime.time(3, 4, 5, 6))
+        inner = Model()
+        inner.add_attribute("list", [1, "a", None])
+        model.add_attribute("inner", inner)
+        encoded = JsonViewResolver("json").get_view(None, 200).render(model)
+        self.assertEqual(json.loads(encoded), {
+            "datetime": "2018-01-02",
+            "date": "2018-01-02",
+            "time": "03:04:05",
+            "inner": {"list": [1, "a", None]}})
+
+    def test_default_output_is_unchanged(self):
+        model = Model()
+        model.add_attribute("datetime",
+                            datetime.datetime(2018, 1, 2, 3, 4, 5, 6))
+        model.add_attribute("date", datetime.date(2018, 1, 2))
+        model.add_attribute("time", datetime.time(3, 4, 5, 6))
+        model.add_attribute("text", u"a/b\u4e2d\"")
+        model.add_attribute("values", [1, 2.5, None, True, {"k": "v"}])
+        expected = json.dumps(model, default=baseline_default)
+        self.assertEqual(
+            JsonViewResolver().get_view(None, 200).render(model), expected)
+        self.assertEqual(
+            "".join(get_json_encoder().iterencode(model)), expected)
+
+    def test_dispatcher_encoder(self):
+        application = DispatcherApplication(
+            ApplicationContext([JsonController]))
+        # 默认使用标准库 json，其它后端需要通过 configurer 显式指定
+        self.assertIsInstance(application.view_resolver.encoder,
+                              StdlibJsonEncoder)
+        application.configurer = OptInConfigurer()
+        self.assertIs(application.view_resolver.encoder,
+                      OptInConfigurer.encoder)
+
+    def test_register_converter(self):
+        encoder = get_json_encoder()
+        self.assertRaises(TypeError, encoder.encode, Point(1, 2))
+        register_json_converter(Point, lambda p: [p.x, p.y])
+        self.assertEqual(encoder.encode({"p": Point(1, 2)}), '{"p": [1, 2]}')
+
+    def test_backend_selection(self):
+        self.assertIsInstance(get_json_encoder("json"), StdlibJsonEncoder)
+        self.assertIsInstance(JsonViewResolver().encoder, JsonEncoder)
+        encoder = StdlibJsonEncoder()
+        self.assertIs(JsonViewResolver(encoder).encoder, encoder)
+        self.assertRaises(ValueError, get_json_encoder, "absent")
+
+    def test_iterencode(self):
+        model = Model()
+        model.add_attribute("rows", [{"id": i, "tags": ("a", [1])}
+                                     for i in range(100)])
+        model.add_attribute("nested", {1: Model(), None: [], "s": "x"})
+        encoder = get_json_encoder("json")
+        encoder.BATCH_SIZE = 4
+        chunks = list(encoder.iterencode(model, chunk_size=256))
+        self.assertTrue(len(chunks) > 1)
+        self.assertTrue(all(len(chunk) < 512 for chunk in chunks))
+        self.assertEqual("".join(chunks), encoder.encode(model))
@@ -0,0 +1,78 @@
+# coding: utf8
+
+import unittest
+import hashlib
+from StringIO import StringIO
+
+from summermvc.mvc import *
+
+BOUNDARY = "form_boundary"
+BODY = "preamble\r\n" \
+       "--{0}\r\n" \
+       "Content-Disposition: form-data; name=\"field\"\r\n\r\n" \
+       "value\r\n" \
+       "--{0}\r\n" \
+       "Content-Disposition: form-data; name=\"file\"; " \
+       "filename=\"file.txt\"\r\n" \
+       "Content-Type: text/plain\r\n\r\n" \
+       "\r\nthis\r\nis --{0}\r\nfile.txt\r\n\r\n" \
+       "--{0}--\r\n".format(BOUNDARY)
+
+
+class TestMultipartParser(unittest.TestCase):
+    def test_parse(self):
+        for chunk_size in [1, 2, 7, 64, 4096]:
+            parser = MultipartParser(BODY, BOUNDARY, chunk_size=chunk_size)
+            files = parser.files
+            self.assertEqual(sorted(files), ["field", "file"])
+            self.assertEqual(files["field"].content, "value")
+            self.assertIsNone(files["field"].filename)
+            part = files["file"]
+            self.assertEqual(part["filename"], "file.txt")
+            self.assertEqual(part.content_type, "text/plain")
+            self.assertEqual(
+                part.file.read(),
+                "\r\nthis\r\nis --%s\r\nfile.txt\r\n" % BOUNDARY)
+            self.assertEqual(part.size, 25 + len(BOUNDARY))
+            parser.close()
+
+    def test_stream_and_spool(self):
+        request = Request.from_wsgi_environment({
+            "PATH_INFO": "/",
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": "multipart/form-data; boundary=\"%s\"" % BOUNDARY,
+            "CONTENT_LENGTH": str(len(BODY)),
+            "wsgi.input": StringIO(BODY),
+        }, None)
+        with MultipartParser.from_request(request, spool_size=8) as parser:
+            part = parser.files["file"]
+            field = parser.files["field"]
+            # 超过 spool_size 的部分写入临时文件，其余的保留在内存中
+            self.assertGreater(part.size, 8)
+            self.assertLessEqual(field.size, 8)
+            self.assertEqual(
+                part.file.read(),
+                "\r\nthis\r\nis --%s\r\nfile.txt\r\n" % BOUNDARY)
+            self.assertEqual(field.file.read(), "value")
+            self.assertTrue(part.content.startswith("\r\nthis"))
+
+    def test_incomplete_body(self):
+        self.assertRaises(InvalidRequestBodyError, MultipartParser,
+                          BODY[:-20], BOUNDARY)
+        self.assertRaises(InvalidRequestBodyError, MultipartParser,
+                          BODY[:-20], BOUNDARY, zero_copy=True)
+
+    def test_zero_copy(self):
+        streamed = MultipartParser(BODY, BOUNDARY).files
+        files = MultipartParser(BODY, BOUNDARY, zero_copy=True).files
+        self.assertEqual(sorted(files), sorted(streamed))
+        for name, part in files.iteritems():
+            self.assertIsInstance(part, MultipartBufferPart)
+            self.assertEqual(part.headers, streamed[name].headers)
+            self.assertEqual(part.content, streamed[name].content)
+            self.assertEqual(part.size, streamed[name].size)
+            self.assertEqual(part.file.read(), part.content)
+            self.assertEqual(hashlib.md5(part.view).hexdigest(),
+                             hashlib.md5(part.content).hexdigest())
+        self.assertRaises(TypeError, MultipartParser,
+                          StringIO(BODY), BOUNDARY, zero_copy=True)
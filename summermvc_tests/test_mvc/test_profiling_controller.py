@@ -0,0 +1,61 @@
+import unittest
+import json
+import threading
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.profiling import profiling, get_default_profiler
+from summermvc.mvc import *
+from summermvc_tests.test_mvc.test_dispatcher import call
+
+
+@component
+class ProfiledService(object):
+    def greet(self, name):
+        return "hello " + name
+
+
+@profiling(r"ProfiledService .*")
+@component
+class ServiceProfiler(object):
+    pass
+
+
+class TestProfilingController(unittest.TestCase):
+    def test_export(self):
+        get_default_profiler().reset()
+        ctx = ApplicationContext(
+            [ProfilingController, ProfiledService, ServiceProfiler])
+        application = DispatcherApplication(ctx)
+        ctx.get_bean("ProfiledService").greet("tim")
+
+        result = call(application, "/_profiling")
+        self.assertEqual(result["status"], "200 OK")
+        stats = json.loads(result["body"])["methods"]["ProfiledService greet"]
+        self.assertEqual(stats["calls"], 1)
+        self.assertEqual(stats["exceptions"], 0)
+
+        call(application, "/_profiling", method="DELETE")
+        result = call(application, "/_profiling")
+        self.assertEqual(json.loads(result["body"]), {"methods": {}})
+
+    def test_reset_threads(self):
+        get_default_profiler().reset()
+        ctx = ApplicationContext(
+            [ProfilingController, ProfiledService, ServiceProfiler])
+        application = DispatcherApplication(ctx)
+        service = ctx.get_bean("ProfiledService")
+        thread = threading.Thread(target=service.greet, args=("tim", ))
+        thread.start()
+        thread.join()
+        service.greet("tim")
+
+        result = call(application, "/_profiling")
+        stats = json.loads(result["body"])["methods"]["ProfiledService greet"]
+        self.assertEqual(stats["calls"], 2)
+
+        call(application, "/_profiling", method="DELETE")
+        service.greet("tim")
+        result = call(application, "/_profiling")
+        stats = json.loads(result["body"])["methods"]["ProfiledService greet"]
+        self.assertEqual(stats["calls"], 1)
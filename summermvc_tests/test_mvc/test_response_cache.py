@@ -0,0 +1,124 @@
+# coding: utf8
+
+import unittest
+import json
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.lru_cache import LRUCache
+from summermvc.mvc import *
+from summermvc_tests.test_mvc.test_dispatcher import call
+from summermvc_tests.clock import Clock
+
+
+class TestLRUCacheTTL(unittest.TestCase):
+    def test_ttl(self):
+        clock = Clock()
+        cache = LRUCache(2, ttl=10, timer=clock)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=20)
+        clock.now = 15
+        self.assertIsNone(cache.get("a"))
+        self.assertNotIn("a", cache)
+        self.assertEqual(cache.get("b"), 2)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+
+@rest_controller
+class CacheableController(object):
+    calls = 0
+
+    @cacheable(60, vary=["arg_lang"])
+    @request_mapping("/cached")
+    def cached(self, model, arg_lang="en", arg_other=""):
+        CacheableController.calls = CacheableController.calls + 1
+        model.add_attribute("calls", CacheableController.calls)
+        model.add_attribute("lang", arg_lang)
+
+    @request_mapping("/cookie")
+    @cacheable(60)
+    def cookie(self, response, model):
+        response.set_cookie("session", "abc")
+        model.add_attribute("cookie", True)
+
+
+@component
+class CountingInterceptor(HandlerInterceptor):
+    pre_handles = 0
+
+    def pre_handle(self, request, response, model_and_view):
+        CountingInterceptor.pre_handles = CountingInterceptor.pre_handles + 1
+
+    def post_handle(self, request, response, model_and_view):
+        pass
+
+    def path_pattern(self):
+        return "/"
+
+    def get_order(self):
+        return 0
+
+
+@component
+class TokenInterceptor(HandlerInterceptor):
+    def pre_handle(self, request, response, model_and_view):
+        if request.get_header_or_default("Token", None) != "secret":
+            response.set_status(HTTPStatus.Unauthorized)
+            raise InterceptError("invalid token")
+
+    def post_handle(self, request, response, model_and_view):
+        pass
+
+    def path_pattern(self):
+        return "/"
+
+    def get_order(self):
+        return 0
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.application = DispatcherApplication(
+            ApplicationContext([CacheableController, CountingInterceptor]))
+
+    def test_cache_hit(self):
+        CacheableController.calls = CountingInterceptor.pre_handles = 0
+        first = call(self.application, "/cached", query_string="other=1")
+        second = call(self.application, "/cached", query_string="other=2")
+        self.assertEqual(first["body"], second["body"])
+        self.assertEqual(first["headers"], second["headers"])
+        # 命中缓存时不执行 handler，但是仍然执行拦截器的 pre handle 链
+        self.assertEqual(CacheableController.calls, 1)
+        self.assertEqual(CountingInterceptor.pre_handles, 2)
+
+        result = call(self.application, "/cached", query_string="lang=fr")
+        self.assertEqual(json.loads(result["body"]),
+                         {"calls": 2, "lang": "fr"})
+        call(self.application, "/cached", method="POST")
+        self.assertEqual(CacheableController.calls, 3)
+
+        stats = self.application.response_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_responses_with_cookies_are_not_cached(self):
+        call(self.application, "/cookie")
+        call(self.application, "/cookie")
+        self.assertEqual(self.application.response_cache.stats()["size"], 0)
+
+    def test_rejecting_interceptor(self):
+        application = DispatcherApplication(
+            ApplicationContext([CacheableController, TokenInterceptor]))
+        result = call(application, "/cached", headers={"Token": "secret"})
+        self.assertEqual(result["status"], "200 OK")
+        # 缓存中已经有响应，没有通过认证的请求仍然被拒绝
+        result = call(application, "/cached")
+        self.assertEqual(result["status"], "401 Unauthorized")
+        self.assertNotIn("calls", json.loads(result["body"]))
+        result = call(application, "/cached", headers={"Token": "secret"})
+        self.assertEqual(result["status"], "200 OK")
+        self.assertEqual(application.response_cache.stats()["hits"], 2)
+
+    def test_invalid_arguments(self):
+        self.assertRaises(RuntimeError, cacheable, 0)
+        self.assertRaises(RuntimeError, cacheable, 1, ["path_var_id"])
+        self.assertRaises(RuntimeError, cacheable, 1, ["arg_"])
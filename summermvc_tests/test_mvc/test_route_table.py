@@ -0,0 +1,207 @@
+# coding: utf8
+
+import unittest
+
+from summermvc.decorator import *
+from summermvc.application_context import ApplicationContext
+from summermvc.mvc import *
+
+
+@rest_controller
+@request_mapping("/user")
+class UserController(object):
+    @request_mapping("/get")
+    def get_user(self):
+        pass
+
+    @request_mapping("/get", method=RequestMethod.POST)
+    def post_user(self):
+        pass
+
+    @request_mapping(r"/(\d+)/(?P<field>\w+)")
+    def get_field(self):
+        pass
+
+    @request_mapping("/upload", consumes="multipart/form-data")
+    def upload(self):
+        pass
+
+    @exception_handler(r"/(\d+)/.*", ValueError)
+    def handle_value_error(self):
+        pass
+
+
+@rest_controller
+class AnotherController(object):
+    @request_mapping("/another")
+    def another(self):
+        pass
+
+
+METHODS = [RequestMethod.GET, RequestMethod.POST, "FOO"]
+
+
+@rest_controller
+class MethodController(object):
+    @request_mapping("/method", method=RequestMethod.GET)
+    def get(self):
+        pass
+
+    @request_mapping("/method", method=RequestMethod.POST)
+    def post(self):
+        pass
+
+
+@rest_controller
+class ConsumesController(object):
+    @request_mapping("/consumes", method=RequestMethod.GET)
+    def get(self):
+        pass
+
+    @request_mapping("/consumes", method=RequestMethod.PUT,
+                     consumes="application/json")
+    def put(self):
+        pass
+
+
+def make_request(ctx, uri, method="GET", content_type=None):
+    request = Request()
+    request.application_context = ctx
+    request.uri = uri
+    request.request_method = method
+    request.content_type = content_type
+    return request
+
+
+class TestRouteTable(unittest.TestCase):
+    def setUp(self):
+        self.ctx = ApplicationContext([UserController])
+        self.mapping = RequestMappingHandlerMapping()
+
+    def get_handler(self, *args, **kwargs):
+        return self.mapping.get_handler(
+            make_request(self.ctx, *args, **kwargs))
+
+    def test_method_less_route(self):
+        handler = self.get_handler("/user/get")
+        self.assertEqual(handler.page_handler.__name__, "get_user")
+
+    def test_method_specific_route_wins(self):
+        handler = self.get_handler("/user/get", RequestMethod.POST)
+        self.assertEqual(handler.page_handler.__name__, "post_user")
+
+    def test_matches_and_exception_handlers(self):
+        handler = self.get_handler("/user/12/name")
+        self.assertEqual(handler.page_handler.__name__, "get_field")
+        self.assertEqual(handler.matches,
+                         {"1": "12", "2": "name", "field": "name"})
+        exception_handler, matches = handler.exception_handlers[ValueError]
+        self.assertEqual(exception_handler.__name__, "handle_value_error")
+        self.assertEqual(matches, {"1": "12"})
+
+    def test_consumes(self):
+        self.assertIsNone(self.get_handler("/user/upload"))
+        handler = self.get_handler("/user/upload",
+                                   content_type="multipart/form-data")
+        self.assertEqual(handler.page_handler.__name__, "upload")
+
+    def test_no_handler(self):
+        self.assertIsNone(self.get_handler("/user/get/more"))
+
+    def test_method_not_allowed(self):
+        self.assertIsNone(self.get_handler("/another", RequestMethod.PUT))
+        self.ctx.add_bean(MethodController)
+        with self.assertRaises(MethodNotAllowedError) as cm:
+            self.get_handler("/method", RequestMethod.PUT)
+        self.assertEqual(cm.exception.allowed_methods,
+                         {RequestMethod.GET, RequestMethod.POST})
+        # 没有指定请求方法的路由允许所有的请求方法
+        self.assertEqual(
+            self.get_handler("/user/get",
+                             RequestMethod.PUT).page_handler.__name__,
+            "get_user")
+
+    def test_method_not_allowed_with_consumes(self):
+        self.ctx.add_bean(ConsumesController)
+        # uri 允许 PUT，只是 Content-Type 不被接受，不应该返回 405
+        self.assertIsNone(
+            self.get_handler("/consumes", RequestMethod.PUT, "text/plain"))
+        with self.assertRaises(MethodNotAllowedError) as cm:
+            self.get_handler("/consumes", RequestMethod.DELETE)
+        self.assertEqual(cm.exception.allowed_methods,
+                         {RequestMethod.GET, RequestMethod.PUT})
+
+    def test_find_allowed_methods(self):
+        self.ctx.add_bean(MethodController)
+        route_table = self.mapping.get_route_table(self.ctx)
+        # 只匹配不允许该请求方法的 pattern
+        self.assertEqual(
+            route_table.find_allowed_methods("/method", RequestMethod.GET),
+            set())
+        self.assertEqual(
+            route_table.find_allowed_methods("/method", RequestMethod.PUT),
+            {RequestMethod.GET, RequestMethod.POST})
+        self.assertEqual(
+            route_table.find_allowed_methods("/user/get", RequestMethod.PUT),
+            set())
+
+    def test_route_table_is_built_once(self):
+        route_table = self.mapping.get_route_table(self.ctx)
+        self.assertIs(route_table, self.mapping.get_route_table(self.ctx))
+        self.assertIs(route_table,
+                      RequestMappingHandlerMapping().get_route_table(self.ctx))
+
+    def test_add_bean_invalidates_route_table(self):
+        route_table = self.mapping.get_route_table(self.ctx)
+        self.assertIsNone(self.get_handler("/another"))
+        self.ctx.add_bean(AnotherController)
+        self.assertIsNot(route_table, self.mapping.get_route_table(self.ctx))
+        handler = self.get_handler("/another")
+        self.assertEqual(handler.page_handler.__name__, "another")
+
+
+class TestRadixRouteTable(TestRouteTable):
+    def setUp(self):
+        self.ctx = ApplicationContext([UserController])
+        self.mapping = RadixTreeHandlerMapping()
+
+    def test_route_table_is_built_once(self):
+        route_table = self.mapping.get_route_table(self.ctx)
+        self.assertIsInstance(route_table, RadixRouteTable)
+        self.assertIs(route_table, self.mapping.get_route_table(self.ctx))
+
+    def test_candidates(self):
+        route_table = self.mapping.get_route_table(self.ctx)
+
+        def candidates(uri):
+            return set(r.attr_name
+                       for method in METHODS
+                       for r in route_table.iter_routes(uri, method))
+        self.assertEqual(candidates("/user/get"),
+                         {"get_user", "post_user", "get_field"})
+        self.assertEqual(candidates("/user/12/name"), {"get_field"})
+        self.assertEqual(candidates("/other/get"), set())
+
+
+class TestCombinedRegexRouteTable(TestRouteTable):
+    def setUp(self):
+        self.ctx = ApplicationContext([UserController])
+        self.mapping = CombinedRegexHandlerMapping()
+
+    def test_route_table_is_built_once(self):
+        route_table = self.mapping.get_route_table(self.ctx)
+        self.assertIsInstance(route_table, CombinedRegexRouteTable)
+        self.assertIs(route_table, self.mapping.get_route_table(self.ctx))
+
+    def test_same_result_as_linear_scan(self):
+        linear = RequestMappingHandlerMapping().get_route_table(self.ctx)
+        combined = self.mapping.get_route_table(self.ctx)
+        for uri in ["/user/get", "/user/1/name", "/user/upload", "/user/x"]:
+            for method in METHODS:
+                for content_type in [None, "multipart/form-data"]:
+                    request = make_request(self.ctx, uri, method, content_type)
+                    expected, expected_matches = linear.find_route(request)
+                    route, matches = combined.find_route(request)
+                    self.assertEqual(expected and expected.attr_name,
+                                     route and route.attr_name)
+                    self.assertEqual(expected_matches, matches)
@@ -0,0 +1,70 @@
+# coding: utf8
+
+import unittest
+
+from summermvc.mvc import *
+from summermvc.mvc import urlencoded_entity
+from summermvc.mvc.urlencoded_entity import _decode
+
+
+class TestURLEncodedEntityParser(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(parse_urlencoded("a=1&a=2&b=&c"),
+                         {"a": ["1", "2"], "b": [""]})
+        self.assertEqual(parse_urlencoded("a+b=x+y%2B&%61=3"),
+                         {"a b": ["x y+"], "a": ["3"]})
+        self.assertEqual(parse_urlencoded(""), {})
+        self.assertEqual(Request.parse_query_string("q=a+b"),
+                         {"q": ["a b"]})
+
+    def test_limits(self):
+        self.assertRaises(FormLimitExceededError,
+                          parse_urlencoded, "a=1&b=2&c=3", max_fields=2)
+        self.assertRaises(FormLimitExceededError,
+                          parse_urlencoded, "abc=1", max_key_length=2)
+        self.assertEqual(parse_urlencoded("a=1&b=2", max_fields=2),
+                         {"a": ["1"], "b": ["2"]})
+
+    def test_lazy(self):
+        body = "a=1&%61=2&b=x+y&c%20d=%7E"
+        for lazy in [False, True]:
+            parser = URLEncodedEntityParser(body, lazy=lazy)
+            self.assertEqual(parser.get_arguments("a"), ["1", "2"])
+            self.assertEqual(parser.get_argument("b"), "x y")
+            self.assertEqual(parser.get_argument("c d"), "~")
+            self.assertRaises(MissingArgumentError,
+                              parser.get_argument, "e")
+            self.assertEqual(sorted(parser.arguments.keys()),
+                             ["a", "b", "c d"])
+
+    def test_lazy_arguments_is_a_mapping(self):
+        body = "a=1&%61=2&b=x+y&c%20d=%7E"
+        arguments = URLEncodedEntityParser(body, lazy=True).arguments
+        # 与 parse_urlencoded 的结果可以互换使用
+        self.assertEqual(arguments, parse_urlencoded(body))
+        self.assertEqual(dict(arguments), parse_urlencoded(body))
+        self.assertEqual(len(arguments), 3)
+        self.assertEqual(arguments["b"], ["x y"])
+        self.assertRaises(KeyError, arguments.__getitem__, "e")
+        self.assertIn("c d", arguments)
+        self.assertNotIn("e", arguments)
+        self.assertEqual(sorted(arguments.items()),
+                         [("a", ["1", "2"]), ("b", ["x y"]), ("c d", ["~"])])
+
+    def test_decode_on_access(self):
+        decoded = []
+
+        def decode(string, *args):
+            decoded.append(string)
+            return _decode(string, *args)
+
+        urlencoded_entity._decode = decode
+        try:
+            parser = URLEncodedEntityParser("a=%41&b=%42", lazy=True)
+            self.assertEqual(decoded, [])
+            self.assertEqual(parser.get_argument("a"), "A")
+            self.assertEqual(parser.get_argument("a"), "A")
+        finally:
+            urlencoded_entity._decode = _decode
+        # 只有被访问过的字段才会被解码，并且只解码一次
+        self.assertEqual(decoded, ["%41"])